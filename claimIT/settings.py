@@ -146,6 +146,72 @@ REST_FRAMEWORK = {
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='https://claimit.onrender.com,http://localhost:3000', cast=lambda v: [s.strip() for s in v.split(',')])
 CSRF_TRUSTED_ORIGINS = config('CSRF_TRUSTED_ORIGINS', default='https://claimit.onrender.com,https://claimit-backend-ss4k.onrender.com', cast=lambda v: [s.strip() for s in v.split(',')])
 
+# FEMA disaster updates refresh
+# Disaster updates are refreshed in the background instead of on each request.
+FEMA_API_URL = config('FEMA_API_URL', default='https://www.fema.gov/api/open/v2/DisasterDeclarationsSummaries')
+FEMA_REFRESH_INTERVAL = config('FEMA_REFRESH_INTERVAL', default=1800, cast=int)  # seconds
+FEMA_SCHEDULER_ENABLED = config('FEMA_SCHEDULER_ENABLED', default=True, cast=bool)
+FEMA_FETCH_CONCURRENCY = config('FEMA_FETCH_CONCURRENCY', default=8, cast=int)  # requests in flight
+FEMA_RATE_LIMIT = config('FEMA_RATE_LIMIT', default=10, cast=float)  # requests per second per host
+FEMA_SYNC_PAGE_SIZE = config('FEMA_SYNC_PAGE_SIZE', default=1000, cast=int)  # records per sync request, at most 1000
+# Users are notified of new declarations in their state that are at most this many days old
+DISASTER_NOTIFICATION_MAX_AGE = config('DISASTER_NOTIFICATION_MAX_AGE', default=30, cast=int)
+
+# Notification event streams
+# Events reach the streams of other server processes through Redis pub/sub when REDIS_URL is set
+NOTIFICATION_STREAM_HEARTBEAT = config('NOTIFICATION_STREAM_HEARTBEAT', default=25, cast=int)  # seconds between keepalives
+NOTIFICATION_STREAM_RETRY = config('NOTIFICATION_STREAM_RETRY', default=5000, cast=int)  # reconnect delay for clients, in ms
+NOTIFICATION_STREAM_TOKEN_MAX_AGE = config('NOTIFICATION_STREAM_TOKEN_MAX_AGE', default=60, cast=int)  # seconds a stream token can open a stream
+
+# Cache
+# Use a shared Redis cache when REDIS_URL is set so every worker sees invalidations;
+# otherwise each process keeps its own in-memory cache.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'claimit',
+        }
+    }
+# Disaster update lists are keyed by dataset version, so they never go stale
+DISASTER_UPDATES_CACHE_TIMEOUT = config('DISASTER_UPDATES_CACHE_TIMEOUT', default=3600, cast=int)  # seconds
+# Claim stats are invalidated on claim writes; the timeout bounds staleness without a shared cache
+CLAIM_STATS_CACHE_TIMEOUT = config('CLAIM_STATS_CACHE_TIMEOUT', default=300, cast=int)  # seconds
+
+# Bulk claim intake
+CLAIM_BULK_BATCH_SIZE = config('CLAIM_BULK_BATCH_SIZE', default=500, cast=int)  # claims per transaction
+CLAIM_BULK_MAX_CLAIMS = config('CLAIM_BULK_MAX_CLAIMS', default=5000, cast=int)  # claims per request
+# Claim numbers each process reserves at a time when Postgres sequences are not available
+CLAIM_NUMBER_BLOCK_SIZE = config('CLAIM_NUMBER_BLOCK_SIZE', default=100, cast=int)
+
+# Chunked claim document uploads
+# Parts are staged on local disk, so every worker must see the same directory
+CLAIM_UPLOAD_PART_SIZE = config('CLAIM_UPLOAD_PART_SIZE', default=1024 * 1024, cast=int)  # bytes
+CLAIM_UPLOAD_TEMP_DIR = config('CLAIM_UPLOAD_TEMP_DIR', default=os.path.join(BASE_DIR, 'upload_parts'))
+CLAIM_UPLOAD_EXPIRY = config('CLAIM_UPLOAD_EXPIRY', default=24 * 3600, cast=int)  # seconds before unfinished uploads are removed
+
+# Thumbnails of claim documents, by label and longest side in pixels
+DOCUMENT_PREVIEW_SIZES = {'small': 160, 'medium': 480, 'large': 1024}
+# Threads per process for background tasks such as thumbnail generation
+BACKGROUND_WORKERS = config('BACKGROUND_WORKERS', default=2, cast=int)
+
+# Claim approval and payout prediction
+# A pickled model bundle, see claimIT_backend/ml/model.py; claims are not scored without one
+CLAIM_MODEL_PATH = config('CLAIM_MODEL_PATH', default=os.path.join(BASE_DIR, 'ml_models', 'claim_model.pkl'))
+CLAIM_SCORING_BATCH_SIZE = config('CLAIM_SCORING_BATCH_SIZE', default=64, cast=int)  # claims per model call
+CLAIM_SCORING_MAX_WAIT = config('CLAIM_SCORING_MAX_WAIT', default=2, cast=float)  # milliseconds a claim waits for others to batch with
+
+# Notifications inserted per transaction by notification jobs
+NOTIFICATION_JOB_BATCH_SIZE = config('NOTIFICATION_JOB_BATCH_SIZE', default=1000, cast=int)
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -155,8 +221,14 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 
 # Media files
-MEDIA_URL = '/media/'
+# Media is served by an authenticated view that checks ownership (see claimIT_backend.views.MediaView)
+MEDIA_URL = '/api/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# 'django' serves files from Python; 'nginx' (X-Accel-Redirect) or 'sendfile' (X-Sendfile)
+# hand the transfer to the front server after the ownership check
+MEDIA_SERVE_BACKEND = config('MEDIA_SERVE_BACKEND', default='django')
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+MEDIA_URL_MAX_AGE = config('MEDIA_URL_MAX_AGE', default=3600, cast=int)  # seconds a signed media URL stays valid
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
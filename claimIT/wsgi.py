@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'claimIT.settings')
 
 application = get_wsgi_application()
+
+# Keep FEMA disaster updates fresh in the background for this server process
+from claimIT_backend.utils.fema_scheduler import start_scheduler  # noqa: E402
+
+start_scheduler()
+
+# Load the claim model once per worker, before the first claim is scored
+from claimIT_backend.ml.model import get_model  # noqa: E402
+
+get_model()
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from claimIT_backend.utils.fema_client import get_client
+from claimIT_backend.utils.fema_scraper import backfill_fema_disasters
+
+
+class Command(BaseCommand):
+    help = "Backfill the full FEMA disaster declarations history, resuming from the last checkpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=1000,
+                            help="Records requested from FEMA per page")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Records written to the database per batch")
+        parser.add_argument('--max-pages', type=int, default=None,
+                            help="Stop after this many pages (resume later from the checkpoint)")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the saved checkpoint and start from the first page")
+
+    def handle(self, *args, **options):
+        checkpoint = backfill_fema_disasters(
+            page_size=options['page_size'],
+            batch_size=options['batch_size'],
+            max_pages=options['max_pages'],
+            restart=options['restart'],
+        )
+        if checkpoint.completed_at:
+            self.stdout.write(self.style.SUCCESS(
+                f"Backfill complete: {checkpoint.records_synced} records"
+            ))
+        else:
+            self.stdout.write(
+                f"Backfill paused at offset {checkpoint.next_skip}: {checkpoint.records_synced} records so far"
+            )
+        self.stdout.write(f"FEMA client: {get_client().metrics.as_dict()}")
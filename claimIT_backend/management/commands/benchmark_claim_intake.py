@@ -0,0 +1,67 @@
+import random
+import time
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from claimIT_backend.models import Claim, ClaimDocument
+from claimIT_backend.utils.claim_intake import create_claims
+
+
+class Command(BaseCommand):
+    help = "Measure claim intake throughput in claims/second, one claim at a time and in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--claims', type=int, default=2000,
+                            help="Number of synthetic claims to create per run")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Claims per transaction for the bulk run")
+        parser.add_argument('--documents', type=int, default=0,
+                            help="Small documents attached to each claim")
+
+    def handle(self, *args, **options):
+        count = options['claims']
+        results = {}
+        for label, batch_size in (('one at a time', 1), ('bulk', options['batch_size'])):
+            elapsed = self.run(count, batch_size, options['documents'])
+            results[label] = count / elapsed
+            self.stdout.write(f"{label}: {count} claims in {elapsed:.2f}s = {results[label]:.0f} claims/s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Bulk intake is {results['bulk'] / results['one at a time']:.1f}x faster"
+        ))
+
+    def run(self, count, batch_size, documents):
+        """Create `count` claims for a throwaway user, then roll everything back."""
+        random.seed(0)
+        stored_files = []
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username=f'benchmark-{time.time_ns()}')
+                items = [self.make_claim(documents) for _ in range(count)]
+                start = time.perf_counter()
+                if batch_size == 1:
+                    for item in items:
+                        create_claims(user, [item])
+                else:
+                    create_claims(user, items, batch_size=batch_size)
+                elapsed = time.perf_counter() - start
+                stored_files = list(
+                    ClaimDocument.objects.filter(claim__user=user).values_list('file', flat=True)
+                )
+                transaction.set_rollback(True)
+        finally:
+            # Rolling back does not remove files written to storage
+            for name in stored_files:
+                ClaimDocument._meta.get_field('file').storage.delete(name)
+        return elapsed
+
+    def make_claim(self, documents):
+        return {
+            'disaster_type': random.choice(Claim.DISASTER_CHOICES)[0],
+            'property_type': random.choice(Claim.PROPERTY_TYPE_CHOICES)[0],
+            'description': 'Synthetic claim created by benchmark_claim_intake',
+            'estimated_loss': round(random.uniform(500, 250000), 2),
+            'documents': [
+                ContentFile(b'%PDF-1.4 benchmark', name=f'document{i}.pdf') for i in range(documents)
+            ],
+        }
@@ -0,0 +1,184 @@
+import json
+import random
+import resource
+import threading
+import time
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from claimIT_backend.ml.batcher import MicroBatcher
+from claimIT_backend.ml.features import materialize_claim_features
+from claimIT_backend.ml.model import get_model
+from claimIT_backend.ml.scoring import rescore_claims, score_batch, score_claims
+from claimIT_backend.models import Claim, UserProfile
+
+SCENARIOS = ['single', 'micro_batched', 'bulk']
+STATES = ['CA', 'TX', 'FL', 'NY', 'LA', 'WA']
+# Metrics where a larger value is a regression; throughput is the other way round
+LATENCY_METRICS = ['p50_ms', 'p95_ms', 'p99_ms']
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure claim scoring throughput, p50/p95/p99 latency and peak memory on synthetic claims: "
+        "one claim per call, micro-batched concurrent calls and a bulk rescore. "
+        "With --baseline, fail if any result is worse than the stored one by more than --tolerance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--claims', type=int, default=2000, help="Synthetic claims to score per scenario")
+        parser.add_argument('--single', type=int, default=200, help="Claims scored one call at a time")
+        parser.add_argument('--concurrency', type=int, default=16, help="Threads submitting claims to the micro-batcher")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Claims per chunk of the bulk rescore")
+        parser.add_argument('--workers', type=int, default=0, help="Processes of the bulk rescore")
+        parser.add_argument(
+            '--scenarios', default=','.join(SCENARIOS), help=f"Comma-separated scenarios to run, of {', '.join(SCENARIOS)}"
+        )
+        parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+        parser.add_argument('--save-baseline', help="Write the results as JSON to this path")
+        parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown against the baseline, e.g. 0.25 for 25%%")
+
+    def handle(self, *args, **options):
+        scenarios = [s.strip() for s in options['scenarios'].split(',') if s.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        model = get_model()
+        if model is None:
+            raise CommandError(f"No claim model at {settings.CLAIM_MODEL_PATH}")
+
+        # Committed and deleted afterwards: the micro-batcher scores on its own connection
+        user = self.create_claims(options['claims'])
+        try:
+            claim_ids = list(Claim.objects.filter(user=user).order_by('pk').values_list('pk', flat=True))
+            results = {'model': model.version, 'claims': len(claim_ids), 'scenarios': {}}
+            for scenario in scenarios:
+                result = getattr(self, f'run_{scenario}')(claim_ids, options)
+                results['scenarios'][scenario] = result
+                self.stdout.write(
+                    f"{scenario}: {result['throughput']:.0f} claims/s, p50 {result['p50_ms']:.2f}ms, "
+                    f"p95 {result['p95_ms']:.2f}ms, p99 {result['p99_ms']:.2f}ms"
+                )
+        finally:
+            user.delete()
+        results['peak_rss_mb'] = peak_rss_mb()
+        self.stdout.write(f"Peak RSS: {results['peak_rss_mb']:.0f} MB")
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Saved results to {options['save_baseline']}")
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare_to_baseline(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError("Scoring regressed against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regression against {options['baseline']}"))
+
+    def create_claims(self, count):
+        """Create a throwaway user with `count` synthetic claims and their stored features."""
+        random.seed(0)
+        user = User.objects.create_user(username=f'benchmark-{time.time_ns()}')
+        UserProfile.objects.create(
+            user=user, street_address='1 Benchmark Way', city='Springfield', state=random.choice(STATES), postal_code='00000'
+        )
+        claims = Claim.objects.bulk_create([
+            Claim(
+                user=user,
+                disaster_type=random.choice(Claim.DISASTER_CHOICES)[0],
+                property_type=random.choice(Claim.PROPERTY_TYPE_CHOICES)[0],
+                description='Synthetic claim created by benchmark_scoring ' + 'x' * random.randint(0, 400),
+                estimated_loss=round(random.uniform(500, 250000), 2),
+            )
+            for _ in range(count)
+        ])
+        # bulk_create does not send post_save, so store the features the way intake does
+        materialize_claim_features(Claim.objects.filter(pk__in=[claim.pk for claim in claims]))
+        return user
+
+    def run_single(self, claim_ids, options):
+        claim_ids = claim_ids[:options['single']]
+        latencies = []
+        start = time.perf_counter()
+        for pk in claim_ids:
+            t = time.perf_counter()
+            score_claims([pk])
+            latencies.append(time.perf_counter() - t)
+        return summarize(latencies, len(claim_ids), time.perf_counter() - start)
+
+    def run_micro_batched(self, claim_ids, options):
+        batcher = MicroBatcher(
+            score_batch,
+            max_batch_size=settings.CLAIM_SCORING_BATCH_SIZE,
+            max_wait=settings.CLAIM_SCORING_MAX_WAIT / 1000,
+        )
+        latencies = []
+        lock = threading.Lock()
+
+        def submit_all(ids):
+            for pk in ids:
+                t = time.perf_counter()
+                batcher.submit(pk).result()
+                with lock:
+                    latencies.append(time.perf_counter() - t)
+
+        concurrency = options['concurrency']
+        threads = [threading.Thread(target=submit_all, args=(claim_ids[i::concurrency],)) for i in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(latencies, len(claim_ids), time.perf_counter() - start)
+
+    def run_bulk(self, claim_ids, options):
+        # Latency of a bulk rescore is the time to score and write one chunk
+        latencies = []
+        last = start = time.perf_counter()
+        def progress(done, total):
+            nonlocal last
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+
+        scored = rescore_claims(
+            chunk_size=options['chunk_size'], workers=options['workers'], include_closed=True, force=True,
+            progress=progress, claims=Claim.objects.filter(pk__in=claim_ids),
+        )
+        return summarize(latencies, scored, time.perf_counter() - start)
+
+
+def summarize(latencies, count, elapsed):
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99]).tolist() if latencies else (0, 0, 0)
+    return {'throughput': count / elapsed if elapsed else 0, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux; forked rescore workers count as children
+    usage = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return usage / 1024
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Return a line per result worse than `baseline` by more than `tolerance`:
+    lower throughput, higher latency or higher peak memory.
+    """
+    regressions = []
+    for scenario, expected in baseline.get('scenarios', {}).items():
+        actual = results['scenarios'].get(scenario)
+        if actual is None:
+            continue
+        if actual['throughput'] < expected['throughput'] * (1 - tolerance):
+            regressions.append(
+                f"{scenario} throughput {actual['throughput']:.0f} claims/s, baseline {expected['throughput']:.0f}"
+            )
+        for metric in LATENCY_METRICS:
+            if actual[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(f"{scenario} {metric} {actual[metric]:.2f}, baseline {expected[metric]:.2f}")
+    if 'peak_rss_mb' in baseline and results['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"peak RSS {results['peak_rss_mb']:.0f} MB, baseline {baseline['peak_rss_mb']:.0f} MB")
+    return regressions
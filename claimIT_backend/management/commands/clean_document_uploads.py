@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from claimIT_backend.utils.document_uploads import clean_expired_uploads
+
+
+class Command(BaseCommand):
+    help = "Remove chunked document uploads that were never committed, and their staged parts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=settings.CLAIM_UPLOAD_EXPIRY,
+                            help="Remove uploads started more than this many seconds ago")
+
+    def handle(self, *args, **options):
+        count = clean_expired_uploads(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {count} expired uploads"))
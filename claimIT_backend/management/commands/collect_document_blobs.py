@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from claimIT_backend.storage import document_storage
+
+
+class Command(BaseCommand):
+    help = "Delete stored document files that no claim document references"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=3600,
+                            help="Keep untracked files younger than this many seconds, as their upload may still be in progress")
+
+    def handle(self, *args, **options):
+        deleted = document_storage.collect_all(grace=options['grace'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unreferenced files"))
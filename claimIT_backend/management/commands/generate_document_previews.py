@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from claimIT_backend.models import ClaimDocument
+from claimIT_backend.utils.previews import generate_previews
+
+
+class Command(BaseCommand):
+    help = "Generate missing thumbnails for claim documents, e.g. for documents uploaded before previews existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Check every document, not only those without previews")
+
+    def handle(self, *args, **options):
+        documents = ClaimDocument.objects.exclude(file='')
+        if not options['all']:
+            documents = documents.filter(previews={})
+        start = time.perf_counter()
+        generated = skipped = 0
+        for document in documents.iterator(chunk_size=200):
+            if generate_previews(document):
+                generated += 1
+            else:
+                skipped += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated previews for {generated} documents in {time.perf_counter() - start:.1f}s "
+            f"({skipped} without a preview)"
+        ))
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from claimIT_backend.ml.features import FEATURE_SCHEMA_VERSION, materialize_claim_features
+from claimIT_backend.models import Claim, ClaimFeatures
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the model features of claims that have none for the current feature schema, "
+        "and delete rows of other schema versions. Run after changing how features are computed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Claims computed and written at a time")
+        parser.add_argument('--all', action='store_true', help="Recompute the features of every claim")
+        parser.add_argument('--keep-old', action='store_true', help="Keep rows of other schema versions")
+
+    def handle(self, *args, **options):
+        claims = Claim.objects.all()
+        if not options['all']:
+            claims = claims.exclude(feature_rows__schema_version=FEATURE_SCHEMA_VERSION)
+        start = time.perf_counter()
+        stored = materialize_claim_features(claims, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored features of {stored} claims (schema {FEATURE_SCHEMA_VERSION}) in {time.perf_counter() - start:.1f}s"
+        ))
+        if not options['keep_old']:
+            deleted, _ = ClaimFeatures.objects.exclude(schema_version=FEATURE_SCHEMA_VERSION).delete()
+            self.stdout.write(f"Deleted {deleted} rows of other schema versions")
@@ -0,0 +1,37 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from claimIT_backend.utils.fema_client import get_client
+from claimIT_backend.utils.fema_scheduler import refresh_states
+
+
+class Command(BaseCommand):
+    help = "Refresh disaster updates from FEMA for every tracked state that is due"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--state', action='append', dest='states',
+                            help="State code to refresh (repeatable). Defaults to every state a user lives in.")
+        parser.add_argument('--force', action='store_true',
+                            help="Refresh even if the state was refreshed within the interval")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running and refresh on a fixed interval")
+        parser.add_argument('--interval', type=int, default=settings.FEMA_REFRESH_INTERVAL,
+                            help="Refresh interval in seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            refreshed = refresh_states(
+                states=options['states'],
+                interval=options['interval'],
+                force=options['force'],
+            )
+            if refreshed:
+                self.stdout.write(self.style.SUCCESS(f"Refreshed {', '.join(refreshed)}"))
+            else:
+                self.stdout.write("No states due for refresh")
+            self.stdout.write(f"FEMA client: {get_client().metrics.as_dict()}")
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,39 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from claimIT_backend.ml.model import get_model
+from claimIT_backend.ml.scoring import rescore_claims
+
+
+class Command(BaseCommand):
+    help = (
+        "Score open claims with the installed model, e.g. after deploying a new model version. "
+        "Claims already scored by this version are skipped, so an interrupted run can simply be restarted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Claims read, scored and written at a time")
+        parser.add_argument('--workers', type=int, default=0, help="Score chunks in this many processes")
+        parser.add_argument('--all', action='store_true', help="Also score approved, rejected and settled claims")
+        parser.add_argument('--force', action='store_true', help="Also score claims this model version already scored")
+
+    def handle(self, *args, **options):
+        model = get_model()
+        if model is None:
+            raise CommandError(f"No claim model at {settings.CLAIM_MODEL_PATH}")
+        self.stdout.write(f"Scoring claims with model {model.version}")
+
+        start = time.perf_counter()
+        def progress(done, total):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{done}/{total} claims ({done / elapsed:.0f} rows/s)")
+
+        scored = rescore_claims(
+            chunk_size=options['chunk_size'], workers=options['workers'],
+            include_closed=options['all'], force=options['force'], progress=progress,
+        )
+        elapsed = time.perf_counter() - start
+        rate = scored / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {scored} claims with model {model.version} in {elapsed:.1f}s ({rate:.0f} rows/s)"
+        ))
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from claimIT_backend.models import NotificationJob
+from claimIT_backend.utils.notification_jobs import run_notification_job
+
+
+class Command(BaseCommand):
+    help = "Send notification jobs that have not finished, e.g. after a server restart interrupted them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', help="Only send the job with this id")
+        parser.add_argument('--retry-failed', action='store_true', help="Also retry failed jobs")
+        parser.add_argument('--batch-size', type=int, help="Notifications inserted per transaction")
+
+    def handle(self, *args, **options):
+        statuses = ['pending', 'running'] + (['failed'] if options['retry_failed'] else [])
+        jobs = NotificationJob.objects.filter(status__in=statuses).order_by('created_at')
+        if options['job']:
+            jobs = NotificationJob.objects.filter(pk=options['job'])
+        for job_id in jobs.values_list('pk', flat=True):
+            start = time.perf_counter()
+            job = run_notification_job(job_id, batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - start
+            message = f"Job {job.pk}: {job.status}, {job.sent}/{job.total} sent in {elapsed:.1f}s"
+            if job.status == 'failed':
+                self.stdout.write(self.style.ERROR(f"{message}: {job.error}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(message))
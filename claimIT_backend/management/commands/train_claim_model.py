@@ -0,0 +1,54 @@
+import os
+import resource
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from claimIT_backend.ml.training import train_claim_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Train the claim approval and payout models on a CSV of past claims and save the bundle "
+        "the server loads. The CSV needs the columns of claimIT_backend/ml/features.py plus "
+        "`approved` (0 or 1) and `payout`. Needs pandas and xgboost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help="Training CSV")
+        parser.add_argument('--output', default=settings.CLAIM_MODEL_PATH, help="Where to write the model bundle")
+        parser.add_argument(
+            '--cache-dir',
+            help="Where encoded features are cached between runs (default: training_cache next to the output)",
+        )
+        parser.add_argument('--model-version', help="Model version stored with the predictions")
+        parser.add_argument('--chunk-size', type=int, default=500_000, help="CSV rows read at a time")
+        parser.add_argument('--max-rounds', type=int, default=1000, help="Most boosting rounds per model")
+        parser.add_argument('--early-stopping', type=int, default=50, help="Stop after this many rounds without improvement")
+        parser.add_argument('--validation', type=float, default=0.1, help="Share of rows held out for early stopping")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['csv']):
+            raise CommandError(f"No such file: {options['csv']}")
+        output = options['output']
+        cache_dir = options['cache_dir'] or os.path.join(os.path.dirname(os.path.abspath(output)), 'training_cache')
+
+        start = time.perf_counter()
+        try:
+            bundle = train_claim_model(
+                options['csv'], output, cache_dir, version=options['model_version'],
+                chunk_size=options['chunk_size'], num_boost_round=options['max_rounds'],
+                early_stopping_rounds=options['early_stopping'], validation_fraction=options['validation'],
+                seed=options['seed'], log=self.stdout.write,
+            )
+        except ImportError as e:
+            raise CommandError(f"{e}. Install the training dependencies with: pip install -r requirements.txt")
+        except ValueError as e:
+            raise CommandError(str(e))
+        # ru_maxrss is in kilobytes on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved model {bundle['version']} trained on {bundle['rows']} rows to {output} "
+            f"in {time.perf_counter() - start:.1f}s (peak memory {peak:.0f} MB)"
+        ))
+        self.stdout.write("Restart the workers and run rescore_claims to use it")
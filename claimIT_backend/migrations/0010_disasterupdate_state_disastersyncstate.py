@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0009_disasterupdate_declaration_display'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisasterSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(help_text='State code (e.g., CA for California)', max_length=2, unique=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, help_text='When the state was last refreshed from FEMA', null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='disasterupdate',
+            name='state',
+            field=models.CharField(blank=True, db_index=True, help_text='State code of the declaration (e.g., CA)', max_length=2),
+        ),
+    ]
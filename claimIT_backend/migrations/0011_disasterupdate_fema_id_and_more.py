@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0010_disasterupdate_state_disastersyncstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disastersyncstate',
+            name='last_refresh',
+            field=models.DateTimeField(blank=True, help_text='Newest FEMA lastRefresh stored for the state', null=True),
+        ),
+        migrations.AddField(
+            model_name='disasterupdate',
+            name='disaster_number',
+            field=models.IntegerField(blank=True, db_index=True, help_text='FEMA disaster number', null=True),
+        ),
+        migrations.AddField(
+            model_name='disasterupdate',
+            name='fema_id',
+            field=models.CharField(blank=True, help_text='FEMA record id', max_length=64, null=True, unique=True),
+        ),
+    ]
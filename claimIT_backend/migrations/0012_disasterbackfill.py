@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0011_disasterupdate_fema_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisasterBackfill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='default', max_length=50, unique=True)),
+                ('next_skip', models.PositiveIntegerField(default=0, help_text='Offset of the next FEMA page to fetch')),
+                ('records_synced', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0012_disasterbackfill'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disastersyncstate',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, help_text='When disaster updates for the state last changed', null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0013_disastersyncstate_changed_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='disasterupdate',
+            name='state',
+            field=models.CharField(blank=True, help_text='State code of the declaration (e.g., CA)', max_length=2),
+        ),
+        migrations.AddIndex(
+            model_name='disasterupdate',
+            index=models.Index(fields=['-updated_at', '-id'], name='disaster_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disasterupdate',
+            index=models.Index(fields=['state', '-updated_at', '-id'], name='disaster_state_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disasterupdate',
+            index=models.Index(fields=['state', 'disaster_type', '-updated_at', '-id'], name='disaster_state_type_idx'),
+        ),
+    ]
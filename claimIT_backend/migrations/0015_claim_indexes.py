@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 17:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0014_disasterupdate_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='claim_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['user', 'status', '-created_at', '-id'], name='claim_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['user', 'disaster_type', '-created_at', '-id'], name='claim_user_disaster_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0015_claim_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimNumberSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 17:18
+
+import claimIT_backend.models
+import claimIT_backend.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0017_documentupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='claimdocument',
+            name='filename',
+            field=models.CharField(blank=True, help_text='Name of the file as uploaded', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='claimdocument',
+            name='file',
+            field=models.FileField(storage=claimIT_backend.storage.get_document_storage, upload_to=claimIT_backend.models.user_claim_directory_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'png', 'jpg', 'jpeg', 'gif', 'zip']), claimIT_backend.models.validate_document_size]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0018_content_addressed_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claimdocument',
+            name='previews',
+            field=models.JSONField(blank=True, default=dict, help_text='Preview image names by size label'),
+        ),
+    ]
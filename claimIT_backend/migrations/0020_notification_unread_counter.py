@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_unread_notifications(apps, schema_editor):
+    Notification = apps.get_model('claimIT_backend', 'Notification')
+    UserProfile = apps.get_model('claimIT_backend', 'UserProfile')
+    unread = (
+        Notification.objects.filter(user_id=OuterRef('user_id'), read=False)
+        .order_by().values('user_id').annotate(count=Count('pk')).values('count')
+    )
+    UserProfile.objects.update(unread_notifications=Coalesce(Subquery(unread), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0019_claimdocument_previews'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read', False)), fields=['user'], name='notification_unread_idx'),
+        ),
+        migrations.RunPython(count_unread_notifications, migrations.RunPython.noop),
+    ]
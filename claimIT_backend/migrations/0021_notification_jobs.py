@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 17:30
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0020_notification_unread_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=100)),
+                ('message', models.TextField()),
+                ('type', models.CharField(choices=[('success', 'Success'), ('warning', 'Warning'), ('info', 'Information'), ('danger', 'Danger')], default='info', max_length=10)),
+                ('filters', models.JSONField(blank=True, default=dict, help_text='state, postal_code_prefix and has_open_claims')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('total', models.PositiveIntegerField(blank=True, help_text='Number of matching users, once counted', null=True)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('last_user_id', models.PositiveIntegerField(default=0, help_text='Recipients are sent to in id order; resume after this one')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['state', 'postal_code'], name='profile_state_postal_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationjob',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 17:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0021_notification_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disasterupdate',
+            name='declaration_date',
+            field=models.DateTimeField(blank=True, help_text='Date FEMA declared the disaster', null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='disaster_update',
+            field=models.ForeignKey(blank=True, help_text='Declaration this notification announced, if any', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='claimIT_backend.disasterupdate'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('disaster_update__isnull', False)), fields=('user', 'disaster_update'), name='notification_user_disaster_uniq'),
+        ),
+    ]
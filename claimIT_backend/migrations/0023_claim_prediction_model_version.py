@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0022_disaster_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claim',
+            name='prediction_model_version',
+            field=models.CharField(blank=True, help_text='Model version that made the predictions', max_length=50, null=True),
+        ),
+    ]
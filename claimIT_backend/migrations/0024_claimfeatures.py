@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 17:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0023_claim_prediction_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimFeatures',
+            fields=[
+                ('pk', models.CompositePrimaryKey('claim_id', 'schema_version', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('schema_version', models.PositiveSmallIntegerField()),
+                ('disaster_type', models.CharField(max_length=50)),
+                ('property_type', models.CharField(max_length=50)),
+                ('state', models.CharField(blank=True, max_length=2)),
+                ('estimated_loss', models.FloatField()),
+                ('description_length', models.PositiveIntegerField()),
+                ('document_count', models.PositiveIntegerField()),
+                ('state_declarations', models.PositiveIntegerField(help_text="Recent FEMA declarations of the claim's disaster type in the state")),
+                ('state_severity', models.PositiveSmallIntegerField(help_text='Highest known severity of recent FEMA declarations in the state, 0 if none')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('claim', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feature_rows', to='claimIT_backend.claim')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['schema_version', 'state'], name='claim_features_state_idx')],
+            },
+        ),
+    ]
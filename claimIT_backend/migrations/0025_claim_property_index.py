@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 18:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0024_claimfeatures'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['user', 'property_type', '-created_at', '-id'], name='claim_user_property_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claimIT_backend', '0025_claim_property_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disastersyncstate',
+            name='last_refresh_id',
+            field=models.CharField(blank=True, default='', help_text='FEMA id of the last record synced at last_refresh', max_length=64),
+        ),
+    ]
@@ -0,0 +1,60 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Groups items submitted from many threads into batches for one handler call.
+
+    A batch is closed when it holds `max_batch_size` items or `max_wait`
+    seconds after its first item arrived, whichever comes first, so a lone
+    item waits at most `max_wait` and a burst of concurrent items costs one
+    vectorized call instead of one call each. `handler(items)` returns one
+    result per item, delivered through the Future submit() returned.
+    """
+    def __init__(self, handler, max_batch_size=64, max_wait=0.002):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        self._ensure_thread()
+        return future
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='claimit-micro-batcher', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            items = [item for item, _ in batch]
+            try:
+                results = self.handler(items)
+            except Exception as e:
+                print(f"Error in micro-batch of {len(items)} items: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
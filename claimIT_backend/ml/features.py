@@ -0,0 +1,154 @@
+from datetime import timedelta
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Length
+from django.utils import timezone
+from ..models import Claim, ClaimDocument, ClaimFeatures, DisasterUpdate
+
+# Model inputs, in the order the models were trained on
+FEATURES = [
+    'disaster_type',
+    'property_type',
+    'state',
+    'estimated_loss',
+    'description_length',
+    'document_count',
+    'state_declarations',
+    'state_severity',
+]
+CATEGORICAL_FEATURES = ['disaster_type', 'property_type', 'state']
+# Bump when the way a feature is computed changes: stored rows of other versions are ignored and rebuilt
+FEATURE_SCHEMA_VERSION = 1
+# FEMA declarations in the owner's state within this window
+DECLARATION_WINDOW = timedelta(days=365)
+# DisasterUpdate severity of declaration types we have no level for
+UNKNOWN_SEVERITY = 4
+
+
+def claim_feature_rows(claim_ids):
+    """
+    Return the model features of claims as dicts with the `claim_id`.
+
+    Features are read from the stored ClaimFeatures rows in one query; claims
+    without a row for the current schema are computed and stored first.
+    """
+    claim_ids = list(claim_ids)
+    rows = list(stored_features(ClaimFeatures.objects.filter(claim_id__in=claim_ids)))
+    found = {row['claim_id'] for row in rows}
+    missing = [pk for pk in claim_ids if pk not in found]
+    if missing:
+        computed = list(claim_features(Claim.objects.filter(pk__in=missing).order_by()))
+        save_feature_rows(computed)
+        rows.extend(computed)
+    return rows
+
+def stored_features(feature_rows):
+    """
+    Return a values queryset of the current-schema features among `feature_rows`.
+    """
+    return feature_rows.filter(schema_version=FEATURE_SCHEMA_VERSION).values('claim_id', *FEATURES)
+
+def claim_features(claims):
+    """
+    Compute the model features of `claims` as a values queryset, with the `claim_id`.
+
+    Counts are correlated subqueries, so any number of claims is read in one
+    query, which can also be streamed with iterator().
+    """
+    documents = (
+        ClaimDocument.objects.filter(claim=OuterRef('pk'))
+        .order_by().values('claim').annotate(count=Count('pk')).values('count')
+    )
+    return (
+        claims.annotate(
+            claim_id=F('pk'),
+            state=Coalesce(F('user__userprofile__state'), Value('')),
+            description_length=Length('description'),
+            document_count=Coalesce(Subquery(documents, output_field=IntegerField()), zero()),
+            state_declarations=declaration_count(OuterRef('user__userprofile__state'), OuterRef('disaster_type')),
+            state_severity=state_severity(OuterRef('user__userprofile__state')),
+        ).values('claim_id', *FEATURES)
+    )
+
+def zero():
+    return Value(0, output_field=IntegerField())
+
+def recent_declarations(state):
+    return DisasterUpdate.objects.filter(state=state, declaration_date__gte=timezone.now() - DECLARATION_WINDOW).order_by()
+
+def declaration_count(state, disaster_type):
+    # Distinct disasters: FEMA sends one record per designated area
+    counts = (
+        recent_declarations(state).filter(disaster_type=disaster_type)
+        .values('state').annotate(count=Count('disaster_number', distinct=True)).values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), zero())
+
+def state_severity(state):
+    severities = (
+        recent_declarations(state).exclude(severity=UNKNOWN_SEVERITY)
+        .values('state').annotate(top=Max('severity')).values('top')
+    )
+    return Coalesce(Subquery(severities, output_field=IntegerField()), zero())
+
+def materialize_claim_features(claims, batch_size=1000):
+    """
+    Compute and store the features of `claims`, replacing their current rows.
+
+    Claims are streamed from one query and written with one upsert per
+    `batch_size` claims. Returns the number of claims stored.
+    """
+    stored = 0
+    batch = []
+    for row in claim_features(claims.order_by()).iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            save_feature_rows(batch)
+            stored += len(batch)
+            batch = []
+    if batch:
+        save_feature_rows(batch)
+        stored += len(batch)
+    return stored
+
+def save_feature_rows(rows):
+    ClaimFeatures.objects.bulk_create(
+        [ClaimFeatures(schema_version=FEATURE_SCHEMA_VERSION, **row) for row in rows],
+        update_conflicts=True,
+        unique_fields=['claim', 'schema_version'],
+        update_fields=FEATURES + ['computed_at'],
+    )
+
+def refresh_state_features(feature_rows):
+    """
+    Recompute the declaration features of `feature_rows` from their stored state,
+    with one UPDATE however many claims it touches.
+    """
+    return feature_rows.filter(schema_version=FEATURE_SCHEMA_VERSION).update(
+        state_declarations=declaration_count(OuterRef('state'), OuterRef('disaster_type')),
+        state_severity=state_severity(OuterRef('state')),
+        computed_at=timezone.now(),
+    )
+
+def refresh_declaration_features(states):
+    """
+    Refresh the stored features of claims in `states` after their FEMA declarations changed.
+    """
+    states = [s for s in states if s]
+    if states:
+        refresh_state_features(ClaimFeatures.objects.filter(state__in=states))
+
+def move_owner_features(user_id, state):
+    """
+    Refresh the stored features of a user's claims after their profile state changed.
+    """
+    rows = ClaimFeatures.objects.filter(claim__user_id=user_id, schema_version=FEATURE_SCHEMA_VERSION)
+    if rows.exclude(state=state).update(state=state):
+        refresh_state_features(rows)
+
+def add_document_count(claim_id, delta):
+    """
+    Add `delta` to the stored document count of a claim. Returns the number of rows updated.
+    """
+    return ClaimFeatures.objects.filter(claim_id=claim_id, schema_version=FEATURE_SCHEMA_VERSION).update(
+        document_count=Greatest(F('document_count') + delta, 0), computed_at=timezone.now()
+    )
@@ -0,0 +1,125 @@
+import os
+import pickle
+import threading
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from .features import CATEGORICAL_FEATURES, FEATURES
+
+# Largest values the Claim prediction columns can hold
+MAX_APPROVAL = 1.0
+MAX_LIMIT = 99999999.99
+
+
+class ClaimModel:
+    """
+    Approval and payout models for claims, loaded from a pickled bundle.
+
+    The bundle is a dict with:
+    - `version`: name of this model build
+    - `features`: input names, a subset of features.FEATURES in training order
+    - `encoders`: {feature: {category: code}} for categorical features
+    - `scaler`: optional {'mean': [...], 'scale': [...]} applied after encoding
+    - `approval_model`: predicts the approval probability, e.g. an XGBClassifier
+    - `limit_model`: predicts the payout, e.g. an XGBRegressor
+    Models only need predict() or predict_proba(); xgboost Boosters are also accepted.
+    """
+    def __init__(self, bundle):
+        self.version = bundle.get('version', 'unversioned')
+        self.features = list(bundle.get('features', FEATURES))
+        self.encoders = bundle.get('encoders', {})
+        scaler = bundle.get('scaler')
+        self.mean = np.asarray(scaler['mean'], dtype=np.float32) if scaler else None
+        self.scale = np.asarray(scaler['scale'], dtype=np.float32) if scaler else None
+        self.approval_model = single_threaded(bundle['approval_model'])
+        self.limit_model = single_threaded(bundle['limit_model'])
+
+    @classmethod
+    def load(cls, path):
+        # Bundles are pickles, so only load them from a path the deployment controls
+        with open(path, 'rb') as f:
+            return cls(pickle.load(f))
+
+    def vectorize(self, rows):
+        """
+        Turn feature dicts into a float32 matrix, with unknown categories as -1.
+        """
+        X = np.empty((len(rows), len(self.features)), dtype=np.float32)
+        for j, name in enumerate(self.features):
+            if name in CATEGORICAL_FEATURES:
+                codes = self.encoders.get(name, {})
+                X[:, j] = [codes.get(row[name], -1) for row in rows]
+            else:
+                X[:, j] = [float(row[name] or 0) for row in rows]
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        return X
+
+    def predict(self, rows):
+        """
+        Return (approval, limit) pairs as Decimals that fit the Claim columns, one per row.
+        """
+        if not rows:
+            return []
+        X = self.vectorize(rows)
+        # Clip in float64: float32 rounds the largest limit up past what the column holds
+        approvals = predict_values(self.approval_model, X, probability=True).astype(np.float64)
+        limits = predict_values(self.limit_model, X).astype(np.float64)
+        approvals = np.clip(approvals, 0, MAX_APPROVAL)
+        limits = np.clip(limits, 0, MAX_LIMIT)
+        return [
+            (Decimal(f'{approval:.2f}'), Decimal(f'{limit:.2f}'))
+            for approval, limit in zip(approvals.tolist(), limits.tolist())
+        ]
+
+
+def single_threaded(model):
+    # Batches are small and every worker process scores its own, so OpenMP
+    # threads cost more in start-up and contention than they save
+    if type(model).__name__ == 'Booster' and hasattr(model, 'set_param'):
+        model.set_param({'nthread': 1})
+    elif hasattr(model, 'get_params') and 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    return model
+
+def predict_values(model, X, probability=False):
+    if probability and hasattr(model, 'predict_proba'):
+        return np.asarray(model.predict_proba(X))[:, 1]
+    if type(model).__name__ == 'Booster':
+        import xgboost
+        return model.predict(xgboost.DMatrix(X))
+    return np.asarray(model.predict(X))
+
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Return the process-wide ClaimModel, loading it on first use, or None when
+    no model is installed at CLAIM_MODEL_PATH and claims are left unscored.
+    """
+    global _model, _model_loaded
+    with _model_lock:
+        if not _model_loaded:
+            path = settings.CLAIM_MODEL_PATH
+            if path and os.path.exists(path):
+                try:
+                    _model = ClaimModel.load(path)
+                    print(f"Loaded claim model {_model.version} from {path}")
+                except Exception as e:
+                    print(f"Error loading claim model from {path}: {e}")
+            else:
+                print(f"No claim model at {path}, claims will not be scored")
+            _model_loaded = True
+    return _model
+
+def reset_model():
+    """
+    Forget the loaded model, so the next get_model() reads CLAIM_MODEL_PATH again.
+    """
+    global _model, _model_loaded
+    with _model_lock:
+        _model = None
+        _model_loaded = False
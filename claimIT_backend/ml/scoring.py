@@ -0,0 +1,161 @@
+import multiprocessing
+import threading
+from collections import deque
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from ..models import Claim, ClaimFeatures
+from ..utils.background import run_in_background
+from .batcher import MicroBatcher
+from .features import FEATURE_SCHEMA_VERSION, claim_feature_rows, materialize_claim_features, stored_features
+from .model import get_model
+
+# VALUES columns are named column1, column2, ... by both PostgreSQL and SQLite
+SAVE_PREDICTIONS_SQL = """
+    UPDATE {table} SET predicted_approval = v.column2, predicted_limit = v.column3,
+                       prediction_model_version = %s
+    FROM (VALUES {values}) AS v
+    WHERE {table}.id = v.column1
+"""
+
+
+def score_claims(claim_ids):
+    """
+    Predict approval and payout for `claim_ids` and store them on the claims.
+
+    Stored features are read in one query, scored in one vectorized call and
+    written back with one bulk UPDATE. Returns {claim id: (approval, limit)}, empty
+    when no model is installed.
+    """
+    model = get_model()
+    if model is None or not claim_ids:
+        return {}
+    rows = claim_feature_rows(claim_ids)
+    predictions = dict(zip((row['claim_id'] for row in rows), model.predict(rows)))
+    save_predictions(predictions, model.version)
+    return predictions
+
+def save_predictions(predictions, version, batch_size=1000):
+    """
+    Store {claim id: (approval, limit)} predictions made by model `version`.
+
+    Each batch is one UPDATE joined to a VALUES list. bulk_update() builds a
+    CASE WHEN per row and column, which took seconds per few thousand claims.
+    """
+    table = connection.ops.quote_name(Claim._meta.db_table)
+    items = list(predictions.items())
+    with transaction.atomic(savepoint=False):
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    SAVE_PREDICTIONS_SQL.format(table=table, values=', '.join(['(%s, %s, %s)'] * len(batch))),
+                    [version] + [value for pk, (approval, limit) in batch for value in (pk, approval, limit)],
+                )
+
+def score_batch(claim_ids):
+    # Runs on the batcher's own thread, which holds its own database connection
+    close_old_connections()
+    try:
+        predictions = score_claims(claim_ids)
+    finally:
+        close_old_connections()
+    return [predictions.get(pk) for pk in claim_ids]
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_batcher():
+    """
+    Return the process-wide batcher that scores claims created by concurrent requests together.
+    """
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher(
+                score_batch,
+                max_batch_size=settings.CLAIM_SCORING_BATCH_SIZE,
+                max_wait=settings.CLAIM_SCORING_MAX_WAIT / 1000,
+            )
+    return _batcher
+
+def schedule_scoring(claim_ids):
+    """
+    Score claims once the current transaction commits, off the request thread.
+
+    Single claims go through the micro-batcher, so claims created at the same
+    time by different requests share one model call; bulk intakes are already
+    a batch and are scored on the background pool.
+    """
+    claim_ids = list(claim_ids)
+    if not claim_ids or get_model() is None:
+        return
+    if len(claim_ids) == 1:
+        transaction.on_commit(lambda: get_batcher().submit(claim_ids[0]))
+    else:
+        run_in_background(score_claims, claim_ids)
+
+def predict_chunk(rows):
+    # Runs in pool processes, which inherit the loaded model when forked
+    return dict(zip((row['claim_id'] for row in rows), get_model().predict(rows)))
+
+def rescore_claims(chunk_size=2000, workers=0, include_closed=False, force=False, progress=None, claims=None):
+    """
+    Score every open claim (or every claim) with the installed model and store the results.
+
+    Stored features are streamed from a server-side cursor `chunk_size` claims
+    at a time, after computing those missing, and each chunk is scored in one
+    vectorized call and written with one UPDATE. Claims already scored by this
+    model version are skipped unless `force` is set, so a rerun after an
+    interruption resumes where it stopped. With `workers`, chunks are scored
+    by that many forked processes while this one streams and writes.
+    `progress(done, total)` is called after each chunk. `claims` narrows the
+    claims considered. Returns the number of claims scored.
+    """
+    model = get_model()
+    if model is None:
+        raise RuntimeError(f"No claim model at {settings.CLAIM_MODEL_PATH}")
+    claims = Claim.objects.all() if claims is None else claims
+    if not include_closed:
+        claims = claims.filter(status__in=Claim.OPEN_STATUSES)
+    if not force:
+        claims = claims.exclude(prediction_model_version=model.version)
+    total = claims.count()
+    materialize_claim_features(claims.exclude(feature_rows__schema_version=FEATURE_SCHEMA_VERSION), chunk_size)
+    rows = stored_features(ClaimFeatures.objects.filter(claim__in=claims)).order_by('claim_id').iterator(chunk_size=chunk_size)
+
+    done = 0
+    def save(predictions):
+        nonlocal done
+        save_predictions(predictions, model.version)
+        done += len(predictions)
+        if progress:
+            progress(done, total)
+
+    if not workers:
+        for chunk in chunks(rows, chunk_size):
+            save(predict_chunk(chunk))
+        return done
+
+    # Fork, so workers start with the model loaded; they never touch the database
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        pending = deque()
+        for chunk in chunks(rows, chunk_size):
+            pending.append(pool.apply_async(predict_chunk, (chunk,)))
+            # Keep a bounded number of chunks in flight, so memory stays flat
+            if len(pending) >= workers * 2:
+                save(pending.popleft().get())
+        while pending:
+            save(pending.popleft().get())
+    return done
+
+def chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+from .features import CATEGORICAL_FEATURES, FEATURES
+
+# Training CSV columns besides the features: whether the claim was approved (0 or 1) and its payout
+APPROVAL_TARGET = 'approved'
+LIMIT_TARGET = 'payout'
+
+# From claims_prediction.ipynb, with histogram trees and a shallower depth
+DEFAULT_PARAMS = {
+    'tree_method': 'hist',
+    'max_bin': 256,
+    'max_depth': 8,
+    'learning_rate': 0.1,
+    'colsample_bytree': 0.3,
+    'alpha': 10,
+}
+
+
+class TrainingData:
+    """
+    Encoded training features and targets as memory-mapped .npy files, with
+    the encoders and scaler that produced them.
+    """
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        self.X = np.load(os.path.join(directory, 'X.npy'), mmap_mode='r')
+        self.approved = np.load(os.path.join(directory, 'approved.npy'), mmap_mode='r')
+        self.payout = np.load(os.path.join(directory, 'payout.npy'), mmap_mode='r')
+
+    @property
+    def encoders(self):
+        return self.meta['encoders']
+
+    @property
+    def scaler(self):
+        return self.meta['scaler']
+
+
+def csv_dtypes(features):
+    # Categories and float32 instead of object and float64 columns
+    dtypes = {name: 'category' if name in CATEGORICAL_FEATURES else 'float32' for name in features}
+    dtypes[APPROVAL_TARGET] = 'float32'
+    dtypes[LIMIT_TARGET] = 'float32'
+    return dtypes
+
+def read_chunks(csv_path, features, chunk_size):
+    import pandas as pd
+
+    columns = list(features) + [APPROVAL_TARGET, LIMIT_TARGET]
+    for chunk in pd.read_csv(csv_path, usecols=columns, dtype=csv_dtypes(features), chunksize=chunk_size):
+        yield chunk.dropna(subset=[APPROVAL_TARGET, LIMIT_TARGET])
+
+def csv_fingerprint(csv_path, features):
+    stat = os.stat(csv_path)
+    key = json.dumps([os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns, list(features)])
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+def encode_training_csv(csv_path, cache_dir, features=FEATURES, chunk_size=500_000, log=print):
+    """
+    Encode a training CSV into memory-mapped .npy files under `cache_dir` and return TrainingData.
+
+    The CSV is read twice, `chunk_size` rows at a time, so memory does not grow
+    with its length: the first pass collects categories and the moments of
+    numeric columns, the second writes the encoded, scaled float32 matrix
+    straight into the memory map. The result is cached per CSV and feature
+    list, so retraining on the same file skips the CSV entirely.
+    """
+    directory = os.path.join(cache_dir, csv_fingerprint(csv_path, features))
+    meta_path = os.path.join(directory, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            log(f"Using encoded features cached in {directory}")
+            return TrainingData(directory, json.load(f))
+
+    start = time.perf_counter()
+    rows = 0
+    categories = {name: set() for name in features if name in CATEGORICAL_FEATURES}
+    sums = {name: 0.0 for name in features if name not in CATEGORICAL_FEATURES}
+    squares = dict(sums)
+    for chunk in read_chunks(csv_path, features, chunk_size):
+        rows += len(chunk)
+        for name in categories:
+            categories[name].update(chunk[name].dropna().astype(str).unique())
+        for name in sums:
+            values = chunk[name].fillna(0).to_numpy(dtype=np.float64)
+            sums[name] += values.sum()
+            squares[name] += np.square(values).sum()
+    if not rows:
+        raise ValueError(f"{csv_path} has no rows with both targets")
+
+    encoders = {name: {value: code for code, value in enumerate(sorted(values))} for name, values in categories.items()}
+    # Categorical codes are left as they are, so unknown categories stay -1 when serving
+    mean = [sums[name] / rows if name in sums else 0.0 for name in features]
+    scale = [
+        float(np.sqrt(max(squares[name] / rows - (sums[name] / rows) ** 2, 0))) or 1.0 if name in sums else 1.0
+        for name in features
+    ]
+    scaler = {'mean': mean, 'scale': scale}
+
+    os.makedirs(directory, exist_ok=True)
+    X = np.lib.format.open_memmap(os.path.join(directory, 'X.npy'), mode='w+', dtype=np.float32, shape=(rows, len(features)))
+    approved = np.lib.format.open_memmap(os.path.join(directory, 'approved.npy'), mode='w+', dtype=np.float32, shape=(rows,))
+    payout = np.lib.format.open_memmap(os.path.join(directory, 'payout.npy'), mode='w+', dtype=np.float32, shape=(rows,))
+    mean_row = np.asarray(mean, dtype=np.float32)
+    scale_row = np.asarray(scale, dtype=np.float32)
+    offset = 0
+    for chunk in read_chunks(csv_path, features, chunk_size):
+        end = offset + len(chunk)
+        block = np.empty((len(chunk), len(features)), dtype=np.float32)
+        for j, name in enumerate(features):
+            if name in encoders:
+                codes = encoders[name]
+                block[:, j] = chunk[name].astype(str).map(codes).fillna(-1).to_numpy(dtype=np.float32)
+                block[chunk[name].isna().to_numpy(), j] = -1
+            else:
+                block[:, j] = chunk[name].fillna(0).to_numpy(dtype=np.float32)
+        X[offset:end] = (block - mean_row) / scale_row
+        approved[offset:end] = chunk[APPROVAL_TARGET].to_numpy()
+        payout[offset:end] = chunk[LIMIT_TARGET].to_numpy()
+        offset = end
+    for array in (X, approved, payout):
+        array.flush()
+    del X, approved, payout
+
+    meta = {'features': list(features), 'rows': rows, 'encoders': encoders, 'scaler': scaler, 'source': os.path.abspath(csv_path)}
+    # Written last, so an interrupted encoding is redone rather than half used
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    log(f"Encoded {rows} rows into {directory} in {time.perf_counter() - start:.1f}s")
+    return TrainingData(directory, meta)
+
+def memmap_matrix(xgboost, X, y, mask, batch_rows, ref=None, max_bin=256):
+    """
+    Build a QuantileDMatrix from the rows of `X` selected by `mask`, `batch_rows`
+    at a time, so the selected rows are never copied into one array.
+    """
+    class Batches(xgboost.DataIter):
+        def __init__(self):
+            self.start = 0
+            super().__init__()
+
+        def next(self, input_data):
+            if self.start >= len(X):
+                return False
+            rows = slice(self.start, self.start + batch_rows)
+            selected = mask[rows]
+            input_data(data=np.asarray(X[rows][selected]), label=np.asarray(y[rows][selected]))
+            self.start += batch_rows
+            return True
+
+        def reset(self):
+            self.start = 0
+
+    return xgboost.QuantileDMatrix(Batches(), ref=ref, max_bin=max_bin)
+
+def fit_booster(xgboost, data, y, valid, params, num_boost_round, early_stopping_rounds, batch_rows, log):
+    max_bin = params.get('max_bin', 256)
+    train = memmap_matrix(xgboost, data.X, y, ~valid, batch_rows, max_bin=max_bin)
+    evaluation = memmap_matrix(xgboost, data.X, y, valid, batch_rows, ref=train, max_bin=max_bin)
+    booster = xgboost.train(
+        params, train, num_boost_round=num_boost_round, evals=[(evaluation, 'valid')],
+        early_stopping_rounds=early_stopping_rounds, verbose_eval=False,
+    )
+    # Keep only the trees up to the best validation score
+    best_iteration, best_score = booster.best_iteration, booster.best_score
+    booster = booster[:best_iteration + 1]
+    log(f"{params['objective']}: {best_iteration + 1} trees, best {params['eval_metric']} {best_score:.4f}")
+    return booster, best_score
+
+def train_claim_model(csv_path, output_path, cache_dir, version=None, features=FEATURES, chunk_size=500_000,
+                      num_boost_round=1000, early_stopping_rounds=50, validation_fraction=0.1, seed=42,
+                      params=None, log=print):
+    """
+    Train the approval and payout models on a claims CSV and save a bundle that
+    ClaimModel loads, with the encoders and scaler used for training.
+
+    The CSV needs the feature columns plus `approved` and `payout`. Both models
+    are histogram-based XGBoost trained from the memory-mapped features, with
+    early stopping on a validation split drawn from `seed`, so the same CSV
+    and seed give the same model. Returns the bundle.
+    """
+    import xgboost
+
+    data = encode_training_csv(csv_path, cache_dir, features=features, chunk_size=chunk_size, log=log)
+    valid = np.random.default_rng(seed).random(len(data.X)) < validation_fraction
+    base = dict(DEFAULT_PARAMS, seed=seed, **(params or {}))
+    start = time.perf_counter()
+    approval_model, approval_logloss = fit_booster(
+        xgboost, data, data.approved, valid, dict(base, objective='binary:logistic', eval_metric='logloss'),
+        num_boost_round, early_stopping_rounds, chunk_size, log,
+    )
+    limit_model, limit_rmse = fit_booster(
+        xgboost, data, data.payout, valid, dict(base, objective='reg:squarederror', eval_metric='rmse'),
+        num_boost_round, early_stopping_rounds, chunk_size, log,
+    )
+    log(f"Trained both models in {time.perf_counter() - start:.1f}s")
+
+    trained_at = datetime.now(timezone.utc)
+    bundle = {
+        'version': version or f"xgb-{trained_at:%Y%m%d%H%M%S}",
+        'features': list(features),
+        'encoders': data.encoders,
+        'scaler': data.scaler,
+        'approval_model': approval_model,
+        'limit_model': limit_model,
+        'trained_at': trained_at.isoformat(),
+        'rows': data.meta['rows'],
+        'params': base,
+        'metrics': {'approval_logloss': approval_logloss, 'limit_rmse': limit_rmse},
+    }
+    save_bundle(bundle, output_path)
+    return bundle
+
+def save_bundle(bundle, path):
+    """
+    Write a model bundle atomically, so a worker never loads a half-written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -1,7 +1,10 @@
+import os
+import uuid
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
+from .storage import get_document_storage
 
 class UserProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
@@ -15,9 +18,17 @@ class UserProfile(models.Model):
     
     emergency_contact = models.CharField(max_length=100, null=True, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', null=True, blank=True)
+    # Kept in step with the user's notifications, see utils/notification_counts.py
+    unread_notifications = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Selecting the users of a state or postal code area for notification jobs
+            models.Index(fields=['state', 'postal_code'], name='profile_state_postal_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username}'s profile"
 
@@ -45,6 +56,8 @@ class Claim(models.Model):
         ('rejected', 'Rejected'),
         ('settled', 'Settled')
     ]
+    # Claims still being decided
+    OPEN_STATUSES = ('pending', 'under_review')
     
     DISASTER_CHOICES = [
         ('wildfire', 'Wildfire'),
@@ -70,6 +83,7 @@ class Claim(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     predicted_approval = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
     predicted_limit = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    prediction_model_version = models.CharField(max_length=50, null=True, blank=True, help_text="Model version that made the predictions")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -83,10 +97,59 @@ class Claim(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a user's claims, optionally filtered
+            models.Index(fields=['user', '-created_at', '-id'], name='claim_user_created_idx'),
+            models.Index(fields=['user', 'status', '-created_at', '-id'], name='claim_user_status_idx'),
+            models.Index(fields=['user', 'disaster_type', '-created_at', '-id'], name='claim_user_disaster_idx'),
+            models.Index(fields=['user', 'property_type', '-created_at', '-id'], name='claim_user_property_idx'),
+        ]
+
+class ClaimNumberSequence(models.Model):
+    """
+    Last claim sequence number handed out for a year.
+    """
+    year = models.PositiveIntegerField(primary_key=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+class ClaimFeatures(models.Model):
+    """
+    Model inputs of a claim, computed from the claim, its owner's profile and the
+    FEMA declarations of their state, so scoring reads one row per claim.
+
+    Kept up to date by ml/features.py when claims, documents, profiles or
+    declarations are written. Rows of other schema versions are ignored.
+    """
+    pk = models.CompositePrimaryKey('claim_id', 'schema_version')
+    claim = models.ForeignKey('Claim', related_name='feature_rows', on_delete=models.CASCADE)
+    schema_version = models.PositiveSmallIntegerField()
+    disaster_type = models.CharField(max_length=50)
+    property_type = models.CharField(max_length=50)
+    state = models.CharField(max_length=2, blank=True)
+    estimated_loss = models.FloatField()
+    description_length = models.PositiveIntegerField()
+    document_count = models.PositiveIntegerField()
+    state_declarations = models.PositiveIntegerField(help_text="Recent FEMA declarations of the claim's disaster type in the state")
+    state_severity = models.PositiveSmallIntegerField(help_text="Highest known severity of recent FEMA declarations in the state, 0 if none")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Refreshing the rows of a state after a FEMA sync
+            models.Index(fields=['schema_version', 'state'], name='claim_features_state_idx'),
+        ]
+
+    def __str__(self):
+        return f"Features of claim {self.claim_id} (schema {self.schema_version})"
+
+MAX_DOCUMENT_SIZE = 5 * 1024 * 1024  # 5MB
+DOCUMENT_EXTENSIONS = ['pdf','png','jpg','jpeg','gif','zip']
 
 def validate_document_size(file):
-    max_size = 5 * 1024 * 1024  # 5MB
-    if file.size > max_size:
+    if file.size > MAX_DOCUMENT_SIZE:
         raise ValidationError("Max file size is 5MB.")
 
 def user_claim_directory_path(instance, filename):
@@ -94,15 +157,64 @@ def user_claim_directory_path(instance, filename):
 
 class ClaimDocument(models.Model):
     claim = models.ForeignKey('Claim', related_name='claim_documents', on_delete=models.CASCADE)
+    # Stored under the SHA-256 of its content, so identical uploads share one file
     file = models.FileField(
         upload_to=user_claim_directory_path,
+        storage=get_document_storage,
         validators=[
-            FileExtensionValidator(allowed_extensions=['pdf','png','jpg','jpeg','gif','zip']),
+            FileExtensionValidator(allowed_extensions=DOCUMENT_EXTENSIONS),
             validate_document_size
         ]
     )
+    filename = models.CharField(max_length=255, blank=True, help_text="Name of the file as uploaded")
+    previews = models.JSONField(default=dict, blank=True, help_text="Preview image names by size label")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        if not self.filename and self.file:
+            self.filename = os.path.basename(self.file.name)
+        super().save(*args, **kwargs)
+
+class StoredBlob(models.Model):
+    """
+    A file in content-addressed document storage and the number of documents referencing it.
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
+
+class DocumentUpload(models.Model):
+    """
+    Resumable upload of one claim document, sent as fixed-size parts.
+    Parts are staged on disk until the upload is committed as a ClaimDocument.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='document_uploads')
+    claim = models.ForeignKey('Claim', related_name='document_uploads', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveIntegerField(help_text="Total size of the file in bytes")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Expected SHA-256 of the whole file, hex encoded")
+    part_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def part_count(self):
+        return max(1, -(-self.size // self.part_size))
+
+    def part_length(self, index):
+        """
+        Number of bytes part `index` must hold; only the last part may be shorter.
+        """
+        return min(self.part_size, self.size - index * self.part_size)
+
+    def __str__(self):
+        return f"{self.filename} ({self.size} bytes) for claim {self.claim_id}"
+
 class DisasterUpdate(models.Model):
     """
     Model for disaster updates from FEMA and other sources.
@@ -116,8 +228,11 @@ class DisasterUpdate(models.Model):
         ('other', 'Other')
     ]
     
+    fema_id = models.CharField(max_length=64, unique=True, null=True, blank=True, help_text="FEMA record id")
+    disaster_number = models.IntegerField(null=True, blank=True, db_index=True, help_text="FEMA disaster number")
     title = models.CharField(max_length=255)
     location = models.CharField(max_length=255, help_text="Designated area affected by the disaster")
+    state = models.CharField(max_length=2, blank=True, help_text="State code of the declaration (e.g., CA)")
     disaster_type = models.CharField(max_length=20, choices=DISASTER_TYPES, default='other')
     severity = models.IntegerField(choices=[(1, 'Low'), (2, 'Medium'), (3, 'High'), (4, 'Unknown')])
     declaration_type = models.CharField(max_length=10, blank=True, help_text="FEMA declaration type code (e.g., DR, FM, EM)")
@@ -126,13 +241,48 @@ class DisasterUpdate(models.Model):
     source = models.CharField(max_length=100, help_text="Source of the update (e.g., FEMA, local government)")
     url = models.URLField(null=True, blank=True)
     updated_at = models.DateTimeField(help_text="Last refresh date from FEMA")
+    declaration_date = models.DateTimeField(null=True, blank=True, help_text="Date FEMA declared the disaster")
     
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Keyset pagination over all states, and within a state / disaster type
+            models.Index(fields=['-updated_at', '-id'], name='disaster_updated_idx'),
+            models.Index(fields=['state', '-updated_at', '-id'], name='disaster_state_updated_idx'),
+            models.Index(fields=['state', 'disaster_type', '-updated_at', '-id'], name='disaster_state_type_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.location}) - {self.get_disaster_type_display()}"
 
+class DisasterSyncState(models.Model):
+    """
+    Tracks when disaster updates for a state were last refreshed from FEMA.
+    """
+    state = models.CharField(max_length=2, unique=True, help_text="State code (e.g., CA for California)")
+    last_synced_at = models.DateTimeField(null=True, blank=True, help_text="When the state was last refreshed from FEMA")
+    # (last_refresh, last_refresh_id) is the position of the last record synced, in FEMA's (lastRefresh, id) order
+    last_refresh = models.DateTimeField(null=True, blank=True, help_text="Newest FEMA lastRefresh stored for the state")
+    last_refresh_id = models.CharField(max_length=64, blank=True, default='', help_text="FEMA id of the last record synced at last_refresh")
+    changed_at = models.DateTimeField(null=True, blank=True, help_text="When disaster updates for the state last changed")
+
+    def __str__(self):
+        return f"{self.state} synced at {self.last_synced_at}"
+
+class DisasterBackfill(models.Model):
+    """
+    Checkpoint of a paged backfill of the full FEMA declarations history.
+    """
+    name = models.CharField(max_length=50, unique=True, default='default')
+    next_skip = models.PositiveIntegerField(default=0, help_text="Offset of the next FEMA page to fetch")
+    records_synced = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Backfill {self.name} at offset {self.next_skip}"
+
 class Notification(models.Model):
     """
     Model for storing user notifications
@@ -150,9 +300,56 @@ class Notification(models.Model):
     type = models.CharField(max_length=10, choices=NOTIFICATION_TYPES, default='info')
     read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    disaster_update = models.ForeignKey(
+        'DisasterUpdate', on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications',
+        help_text="Declaration this notification announced, if any"
+    )
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Only unread rows are indexed, so counting them stays cheap as history grows
+            models.Index(fields=['user'], condition=models.Q(read=False), name='notification_unread_idx'),
+        ]
+        constraints = [
+            # A declaration is announced to each user once, however many syncs see it
+            models.UniqueConstraint(
+                fields=['user', 'disaster_update'], condition=models.Q(disaster_update__isnull=False),
+                name='notification_user_disaster_uniq'
+            ),
+        ]
         
     def __str__(self):
-        return f"{self.title} - {self.user.username}"
\ No newline at end of file
+        return f"{self.title} - {self.user.username}"
+
+class NotificationJob(models.Model):
+    """
+    A notification sent to every user matching `filters`, created in batches in the background.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    title = models.CharField(max_length=100)
+    message = models.TextField()
+    type = models.CharField(max_length=10, choices=Notification.NOTIFICATION_TYPES, default='info')
+    filters = models.JSONField(default=dict, blank=True, help_text="state, postal_code_prefix and has_open_claims")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(null=True, blank=True, help_text="Number of matching users, once counted")
+    sent = models.PositiveIntegerField(default=0)
+    last_user_id = models.PositiveIntegerField(default=0, help_text="Recipients are sent to in id order; resume after this one")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.title} ({self.status}, {self.sent}/{self.total})"
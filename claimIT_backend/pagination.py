@@ -0,0 +1,117 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique ordering such as ('-updated_at', '-id').
+
+    The cursor holds the ordering values of the last row of a page, and the next
+    page is fetched with a range condition on them instead of an OFFSET. With a
+    matching index every page costs the same however deep the client scrolls.
+    Views can set `keyset_ordering` to choose the ordering fields.
+    """
+    page_size = 10
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = getattr(view, 'keyset_ordering', self.ordering)
+
+        queryset = queryset.order_by(*ordering)
+        position = self.decode_cursor(request, len(ordering))
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(ordering, position))
+            except (ValidationError, ValueError, TypeError):
+                # A cursor value the field cannot hold, e.g. a date that is not one
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to know whether there is a next page
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self.get_position(rows[-1], ordering) if self.has_next else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def after(self, ordering, position):
+        """
+        Build the condition selecting rows that sort after `position`, e.g.
+        updated_at <= t AND (updated_at < t OR (updated_at = t AND id < i))
+        for ('-updated_at', '-id').
+
+        The bound on the leading column is redundant, but without it PostgreSQL
+        cannot start an index range scan at the cursor and filters from the top.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            if isinstance(value, (list, dict)):
+                raise TypeError(f"Cursor value for {field} is not a scalar")
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        return bound & condition
+
+    def get_position(self, obj, ordering):
+        position = []
+        for field in ordering:
+            value = getattr(obj, field.lstrip('-'))
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, length):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != length:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        return self.encode_cursor(self.next_position) if self.has_next else None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -1,8 +1,35 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, DisasterUpdate, Claim, ClaimDocument, Notification
+from django.conf import settings
+from .models import (
+    UserProfile, DisasterUpdate, Claim, ClaimDocument, DocumentUpload, Notification, NotificationJob,
+    DOCUMENT_EXTENSIONS, MAX_DOCUMENT_SIZE
+)
+from .utils.claim_intake import create_claims
+from .utils.document_uploads import received_parts
+from .utils.media import signed_media_url
+import os
 import re
 
+class SignedMediaMixin:
+    """
+    Renders a file field as a signed URL, so the requesting user can load the
+    file in the browser without sending an Authorization header.
+    """
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return value.url
+        return signed_media_url(value.name, request.user.id, request)
+
+class SignedMediaField(SignedMediaMixin, serializers.FileField):
+    pass
+
+class SignedImageField(SignedMediaMixin, serializers.ImageField):
+    pass
+
 class UserSerializer(serializers.ModelSerializer):
     """
     Serializer for User model.
@@ -30,6 +57,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
     """
     user = UserSerializer(read_only=True)
     full_address = serializers.ReadOnlyField()
+    profile_picture = SignedImageField(required=False, allow_null=True)
 
     class Meta:
         model = UserProfile
@@ -91,6 +119,7 @@ class DisasterUpdateSerializer(serializers.ModelSerializer):
             'id', 
             'title', 
             'location', 
+            'state',
             'disaster_type', 
             'severity', 
             'declaration_type',
@@ -108,9 +137,22 @@ class DisasterUpdateSerializer(serializers.ModelSerializer):
 
 class ClaimDocumentSerializer(serializers.ModelSerializer):
     """Serializer for uploaded claim documents"""
+    file = SignedMediaField(read_only=True)
+    previews = serializers.SerializerMethodField()
+
     class Meta:
         model = ClaimDocument
-        fields = ['id', 'file', 'uploaded_at']
+        fields = ['id', 'file', 'filename', 'previews', 'uploaded_at']
+
+    def get_previews(self, obj):
+        """Return the URL of each thumbnail size, empty until they have been generated"""
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return {label: obj.file.storage.url(name) for label, name in (obj.previews or {}).items()}
+        return {
+            label: signed_media_url(name, request.user.id, request)
+            for label, name in (obj.previews or {}).items()
+        }
 
 class ClaimSerializer(serializers.ModelSerializer):
     # Expect list of files under 'documents' key
@@ -125,26 +167,71 @@ class ClaimSerializer(serializers.ModelSerializer):
     class Meta:
         model = Claim
         fields = '__all__'
-        read_only_fields = ['user', 'created_at', 'updated_at', 'predicted_approval', 'predicted_limit', 'claim_number', 'insurance_policy_number']
+        read_only_fields = ['user', 'created_at', 'updated_at', 'predicted_approval', 'predicted_limit', 'prediction_model_version', 'claim_number', 'insurance_policy_number']
         
     def create(self, validated_data):
-        # Extract files and remove from data
-        
-        document_files = validated_data.pop('documents', [])
-        # Associate user and create claim
+        # Identifiers are allocated before the insert, and the claim and its
+        # documents are written in one transaction
+        user = validated_data.pop('user', None) or self.context['request'].user
+        return create_claims(user, [validated_data])[0]
+
+class ClaimBulkSerializer(serializers.Serializer):
+    """
+    Serializer for creating many claims in one request.
+    """
+    claims = ClaimSerializer(many=True, allow_empty=False)
+
+    def validate_claims(self, value):
+        max_claims = settings.CLAIM_BULK_MAX_CLAIMS
+        if len(value) > max_claims:
+            raise serializers.ValidationError(f"At most {max_claims} claims can be created per request.")
+        return value
+
+    def create(self, validated_data):
+        return create_claims(self.context['request'].user, validated_data['claims'])
+
+class DocumentUploadSerializer(serializers.ModelSerializer):
+    """
+    Serializer for chunked claim document uploads.
+    """
+    part_count = serializers.IntegerField(read_only=True)
+    received_parts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DocumentUpload
+        fields = ['id', 'claim', 'filename', 'size', 'sha256', 'part_size', 'part_count', 'received_parts', 'created_at']
+        read_only_fields = ['id', 'part_size', 'created_at']
+
+    def get_received_parts(self, obj):
+        return received_parts(obj)
+
+    def validate_claim(self, value):
+        if value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Claim not found.")
+        return value
+
+    def validate_filename(self, value):
+        value = os.path.basename(value)
+        extension = os.path.splitext(value)[1].lower().lstrip('.')
+        if extension not in DOCUMENT_EXTENSIONS:
+            raise serializers.ValidationError(f"Allowed file types: {', '.join(DOCUMENT_EXTENSIONS)}.")
+        return value
+
+    def validate_size(self, value):
+        # Reject oversized files before a single byte is uploaded
+        if not 0 < value <= MAX_DOCUMENT_SIZE:
+            raise serializers.ValidationError("Max file size is 5MB.")
+        return value
+
+    def validate_sha256(self, value):
+        if value and not re.fullmatch(r'[0-9a-fA-F]{64}', value):
+            raise serializers.ValidationError("Must be a hex encoded SHA-256 digest.")
+        return value.lower()
+
+    def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        claim = super().create(validated_data)
-        # Save each uploaded file
-        for f in document_files:
-            ClaimDocument.objects.create(claim=claim, file=f)
-        # Build and save identifiers
-        from datetime import date
-        year = date.today().year
-        suffix = claim.id
-        claim.claim_number = f"CLM-{year}{suffix}"
-        claim.insurance_policy_number = f"POL{year}{suffix}"
-        claim.save()
-        return claim
+        validated_data['part_size'] = settings.CLAIM_UPLOAD_PART_SIZE
+        return super().create(validated_data)
 
 class NotificationSerializer(serializers.ModelSerializer):
     """
@@ -159,4 +246,37 @@ class NotificationSerializer(serializers.ModelSerializer):
     
     def get_created_at_formatted(self, obj):
         """Return formatted date for frontend display"""
-        return obj.created_at.strftime('%Y-%m-%d')
\ No newline at end of file
+        return obj.created_at.strftime('%Y-%m-%d')
+
+class NotificationJobFiltersSerializer(serializers.Serializer):
+    """
+    Users a notification job is sent to. Filters are combined; none means every active user.
+    """
+    state = serializers.CharField(max_length=2, required=False, help_text="State code (e.g., CA)")
+    postal_code_prefix = serializers.CharField(max_length=20, required=False)
+    has_open_claims = serializers.BooleanField(required=False, help_text="Only users with pending or under review claims")
+
+    def validate_state(self, value):
+        return value.upper()
+
+class NotificationJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for notification jobs and their progress.
+    """
+    filters = NotificationJobFiltersSerializer(required=False)
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = NotificationJob
+        fields = [
+            'id', 'title', 'message', 'type', 'filters', 'status', 'total', 'sent', 'progress',
+            'error', 'created_at', 'started_at', 'completed_at',
+        ]
+        read_only_fields = ['status', 'total', 'sent', 'error', 'started_at', 'completed_at']
+
+    def get_progress(self, obj):
+        """Share of recipients notified, from 0 to 1, once they have been counted"""
+        if obj.total is None:
+            return None
+        return round(obj.sent / obj.total, 4) if obj.total else 1.0
+
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .ml.features import add_document_count, materialize_claim_features, move_owner_features
+from .ml.scoring import schedule_scoring
+from .models import Claim, ClaimDocument, Notification, UserProfile
+from .serializers import NotificationSerializer
+from .storage import document_storage
+from .utils.background import run_in_background
+from .utils.claim_stats import claim_stats_cache_key
+from .utils.notification_counts import add_unread_count, recount_unread
+from .utils.notification_events import publish_event, publish_unread_count
+from .utils.previews import generate_document_previews
+
+
+@receiver([post_save, post_delete], sender=Claim)
+def invalidate_claim_stats(sender, instance, **kwargs):
+    """Drop the cached claim statistics of the claim's owner"""
+    cache.delete(claim_stats_cache_key(instance.user_id))
+
+# Claim fields the model features are computed from
+FEATURE_SOURCE_FIELDS = {'user', 'user_id', 'disaster_type', 'property_type', 'estimated_loss', 'description'}
+
+@receiver(post_save, sender=Claim)
+def store_claim_features(sender, instance, update_fields=None, **kwargs):
+    """Recompute the claim's stored model features when their inputs may have changed"""
+    if update_fields is None or FEATURE_SOURCE_FIELDS & set(update_fields):
+        materialize_claim_features(Claim.objects.filter(pk=instance.pk))
+
+@receiver(post_save, sender=Claim)
+def score_new_claim(sender, instance, created, **kwargs):
+    """Predict approval and payout for the new claim after commit"""
+    if created:
+        schedule_scoring([instance.pk])
+
+@receiver(post_delete, sender=ClaimDocument)
+def release_document_file(sender, instance, **kwargs):
+    """Drop the document's reference to its stored file, deleting the file if it was the last"""
+    if instance.file:
+        document_storage.release(instance.file.name)
+
+@receiver(post_save, sender=ClaimDocument)
+def schedule_document_previews(sender, instance, created, **kwargs):
+    """Render the new document's thumbnails in the background"""
+    if created and instance.file:
+        run_in_background(generate_document_previews, instance.pk)
+
+@receiver(post_save, sender=ClaimDocument)
+def count_claim_document(sender, instance, created, **kwargs):
+    """Add the new document to its claim's stored document count and rescore the claim"""
+    if created:
+        add_document_count(instance.claim_id, 1)
+        schedule_scoring([instance.claim_id])
+
+@receiver(post_delete, sender=ClaimDocument)
+def uncount_claim_document(sender, instance, **kwargs):
+    """Remove the deleted document from its claim's stored document count and rescore the claim"""
+    # No row is left to update when the document goes with its claim
+    if add_document_count(instance.claim_id, -1):
+        schedule_scoring([instance.claim_id])
+
+@receiver(post_save, sender=UserProfile)
+def move_claim_features(sender, instance, update_fields=None, **kwargs):
+    """Refresh the stored features of the owner's claims when their state changes"""
+    if update_fields is None or 'state' in update_fields:
+        move_owner_features(instance.user_id, instance.state)
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the owner's unread counter in step with the saved notification"""
+    if created:
+        if not instance.read:
+            add_unread_count(instance.user_id, 1)
+    elif update_fields is None or 'read' in update_fields:
+        # The flag may have changed, and its previous value is not known here
+        recount_unread([instance.user_id])
+
+@receiver(post_save, sender=Notification)
+def push_notification_event(sender, instance, created, **kwargs):
+    """Push new notifications and unread count changes to the user's open event streams"""
+    def publish():
+        if created:
+            publish_event(instance.user_id, 'notification', NotificationSerializer(instance).data)
+        publish_unread_count(instance.user_id)
+    transaction.on_commit(publish)
+
+@receiver(post_delete, sender=Notification)
+def push_unread_count(sender, instance, **kwargs):
+    """Update and push the unread count after a notification is deleted"""
+    if not instance.read:
+        add_unread_count(instance.user_id, -1)
+    transaction.on_commit(lambda: publish_unread_count(instance.user_id))
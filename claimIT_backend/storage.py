@@ -0,0 +1,138 @@
+import hashlib
+import os
+import time
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that names every file after the SHA-256 of its content.
+
+    Saving content that is already stored only adds a reference to the
+    existing file, so the same policy PDF attached to several claims is kept
+    once. References are counted in StoredBlob, and a file is deleted when the
+    last document referencing it is deleted.
+    """
+    prefix = 'blobs'
+
+    def blob_name(self, digest, name):
+        # Keep the extension, so the file is served with the right content type
+        extension = os.path.splitext(name)[1].lower()
+        return f'{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+    def derivative_name(self, name, label, extension='.jpg'):
+        """
+        Name of a file derived from `name`, such as a thumbnail, stored next to it.
+        """
+        return f'{os.path.splitext(name)[0]}_{label}{extension}'
+
+    def save_derivative(self, name, content):
+        """
+        Store a derived file under exactly `name`, without hashing or reference counting.
+        """
+        return super()._save(name, content)
+
+    def get_available_name(self, name, max_length=None):
+        # Equal names mean equal content, so an existing name is reused rather than suffixed
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        name = self.blob_name(digest.hexdigest(), name)
+
+        with transaction.atomic():
+            # Take the reference first: it locks the blob row, so a concurrent
+            # collect() cannot delete the file between the check and the reuse
+            self.reference(name, digest.hexdigest(), size)
+            if not self.exists(name):
+                super()._save(name, content)
+        return name
+
+    def reference(self, name, sha256=None, size=None):
+        """
+        Count one more document referencing the stored file `name`.
+        """
+        from .models import StoredBlob
+
+        updated = StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+        if not updated:
+            blob, created = StoredBlob.objects.get_or_create(
+                name=name, defaults={'sha256': sha256, 'size': size, 'refcount': 1}
+            )
+            if not created:
+                StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+    def release(self, name):
+        """
+        Drop one reference to `name`, and delete the file after commit if it was the last.
+        Files stored before content addressing have no StoredBlob row and are left alone.
+        """
+        from .models import StoredBlob
+
+        updated = StoredBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+        if updated:
+            transaction.on_commit(lambda: self.collect(name))
+
+    def collect(self, name):
+        """
+        Delete `name` and its StoredBlob row if no document references it.
+        Returns True if the file was deleted.
+        """
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name, refcount=0).first()
+            if blob is None:
+                return False
+            # Delete the file while the row is locked, so a concurrent save waits and writes it again
+            self.delete(name)
+            self.delete_derivatives(name)
+            blob.delete()
+        return True
+
+    def delete_derivatives(self, name):
+        directory, filename = os.path.split(name)
+        prefix = os.path.splitext(filename)[0] + '_'
+        try:
+            _, files = self.listdir(directory)
+        except FileNotFoundError:
+            return
+        for derived in files:
+            if derived.startswith(prefix):
+                self.delete(f'{directory}/{derived}')
+
+    def collect_all(self, grace=3600):
+        """
+        Delete every unreferenced file: blobs whose last reference is gone, and
+        files left without a StoredBlob row by rolled back transactions once
+        they are older than `grace` seconds. Returns the number of files deleted.
+        """
+        from .models import StoredBlob
+
+        unreferenced = list(StoredBlob.objects.filter(refcount=0).values_list('name', flat=True))
+        deleted = sum(self.collect(name) for name in unreferenced)
+        root = self.path(self.prefix)
+        cutoff = time.time() - grace
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.location).replace(os.sep, '/')
+                # Derived files belong to the blob named by the digest before the underscore
+                digest = os.path.splitext(filename)[0].split('_')[0]
+                if os.path.getmtime(path) < cutoff and not StoredBlob.objects.filter(sha256=digest).exists():
+                    self.delete(name)
+                    deleted += 1
+        return deleted
+
+
+# Names are derived from content, so a file that already exists may be written over with the same bytes
+document_storage = ContentAddressedStorage(allow_overwrite=True)
+
+def get_document_storage():
+    return document_storage
@@ -1,3 +1,1419 @@
-from django.test import TestCase
+import asyncio
+import base64
+import hashlib
+import importlib.util
+import io
+import json
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import call, patch
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import numpy as np
+from PIL import Image
+from asgiref.sync import sync_to_async
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .ml.batcher import MicroBatcher
+from .ml.features import FEATURE_SCHEMA_VERSION, FEATURES, claim_feature_rows
+from .ml.model import get_model, reset_model
+from .ml.scoring import score_claims
+from .models import (
+    Claim, ClaimDocument, ClaimFeatures, DisasterBackfill, DisasterSyncState, DisasterUpdate, DocumentUpload, Notification, NotificationJob,
+    StoredBlob, UserProfile
+)
+from .storage import document_storage
+from .utils.fema_client import MAX_VALIDATORS, FemaClient
+from .utils.previews import generate_previews
+from .utils.document_uploads import UploadError, commit_upload
+from .utils.identifiers import BlockAllocator, SequenceAllocator, allocate_claim_identifiers, get_allocator
+from .utils.notification_counts import recount_unread
+from .utils.notification_jobs import run_notification_job
+from .utils.fema_scheduler import FemaRefreshScheduler, claim_refresh, refresh_states, sync_states
+from .utils.fema_scraper import (
+    backfill_fema_disasters, delete_legacy_updates, format_fema_datetime, parse_fema_datetime, sync_cache_key,
+    sync_query_url, upsert_disaster_updates
+)
+
+TEST_DATA_DIR = Path(__file__).resolve().parent / 'test_data'
+
+
+class StubFemaServer:
+    """
+    Local HTTP server that pages through recorded FEMA declarations the way the
+    OpenFEMA API does with $top/$skip, or with lastRefresh/id filters.
+    `before_request(count)` is called with the number of requests received so far.
+    """
+    def __init__(self, records, delay=0, before_request=None):
+        self.records = sorted(records, key=lambda rec: rec['id'])
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                server.requests.append(params)
+                if before_request:
+                    before_request(len(server.requests))
+                top = int(params.get('$top', ['1000'])[0])
+                skip = int(params.get('$skip', ['0'])[0])
+                filters = params.get('$filter', [''])[0]
+                states = re.findall(r"state eq '(\w+)'", filters)
+                records = [rec for rec in server.records if not states or rec['state'] in states]
+                after = re.search(r"lastRefresh gt '([^']+)' or \(lastRefresh eq '[^']+' and id gt '([^']+)'\)", filters)
+                since = re.search(r"lastRefresh ge '([^']+)'", filters)
+                if after:
+                    records = [rec for rec in records if (rec['lastRefresh'], rec['id']) > after.groups()]
+                elif since:
+                    records = [rec for rec in records if rec['lastRefresh'] >= since.group(1)]
+                if params.get('$orderby', [''])[0].startswith('lastRefresh'):
+                    records.sort(key=lambda rec: (rec['lastRefresh'], rec['id']))
+                time.sleep(delay)
+                body = json.dumps({
+                    'metadata': {'skip': skip, 'top': top, 'entityname': 'DisasterDeclarationsSummaries'},
+                    'DisasterDeclarationsSummaries': records[skip:skip + top],
+                }).encode()
+                etag = f'"{hashlib.sha256(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/api/open/v2/DisasterDeclarationsSummaries'
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FemaBackfillTests(TestCase):
+    def setUp(self):
+        with open(TEST_DATA_DIR / 'fema_declarations.json') as f:
+            self.records = json.load(f)
+
+    def test_backfill_pages_through_full_history(self):
+        with StubFemaServer(self.records) as stub, override_settings(FEMA_API_URL=stub.url):
+            checkpoint = backfill_fema_disasters(page_size=2, batch_size=1)
+
+        self.assertIsNotNone(checkpoint.completed_at)
+        self.assertEqual(checkpoint.records_synced, len(self.records))
+        self.assertEqual([int(r['$skip'][0]) if '$skip' in r else 0 for r in stub.requests], [0, 2, 4])
+        self.assertEqual(
+            set(DisasterUpdate.objects.values_list('fema_id', flat=True)),
+            {rec['id'] for rec in self.records},
+        )
+
+    def test_backfill_refreshes_claim_features_once(self):
+        with StubFemaServer(self.records) as stub, override_settings(FEMA_API_URL=stub.url), \
+                patch('claimIT_backend.utils.fema_scraper.refresh_declaration_features') as refresh:
+            backfill_fema_disasters(page_size=2, batch_size=1)
+        refresh.assert_called_once_with({rec['state'] for rec in self.records})
+
+    def test_backfill_resumes_from_checkpoint(self):
+        with StubFemaServer(self.records) as stub, override_settings(FEMA_API_URL=stub.url):
+            checkpoint = backfill_fema_disasters(page_size=2, max_pages=1)
+            self.assertIsNone(checkpoint.completed_at)
+            self.assertEqual(checkpoint.next_skip, 2)
+            self.assertEqual(DisasterUpdate.objects.count(), 2)
+
+            checkpoint = backfill_fema_disasters(page_size=2)
+
+        self.assertIsNotNone(checkpoint.completed_at)
+        self.assertEqual(DisasterBackfill.objects.get().next_skip, len(self.records))
+        self.assertEqual(DisasterUpdate.objects.count(), len(self.records))
+        # The first page is not fetched again when resuming
+        self.assertEqual(len(stub.requests), 3)
+
+
+class FemaClientTests(TestCase):
+    def test_unchanged_response_is_a_conditional_cache_hit(self):
+        with open(TEST_DATA_DIR / 'fema_declarations.json') as f:
+            records = json.load(f)
+        client = FemaClient()
+        with StubFemaServer(records) as stub:
+            url = f'{stub.url}?$top=2'
+            first = client.get_json(url)
+            second = client.get_json(url)
+
+        self.assertEqual(len(first['DisasterDeclarationsSummaries']), 2)
+        self.assertIsNone(second)
+        metrics = client.metrics.as_dict()
+        self.assertEqual(metrics['requests'], 2)
+        self.assertEqual(metrics['cache_hits'], 1)
+        self.assertGreater(metrics['bytes_received'], 0)
+
+
+    def test_syncs_from_a_moving_watermark_share_validators(self):
+        with open(TEST_DATA_DIR / 'fema_declarations.json') as f:
+            records = json.load(f)
+        client = FemaClient()
+        with StubFemaServer(records) as stub, override_settings(FEMA_API_URL=stub.url):
+            since = parse_fema_datetime('2025-01-01T00:00:00.000Z')
+            key = sync_cache_key(['CA'])
+            first = client.get_json(sync_query_url(['CA'], since=since), cache_key=key)
+            second = client.get_json(sync_query_url(['CA'], since=since + timedelta(hours=1)), cache_key=key)
+
+        self.assertEqual(len(first['DisasterDeclarationsSummaries']), 2)
+        self.assertIsNone(second)
+        self.assertEqual(list(client._validators), [key])
+
+    def test_validators_are_bounded(self):
+        client = FemaClient()
+        response = SimpleNamespace(headers={'ETag': '"tag"'})
+        for i in range(MAX_VALIDATORS + 10):
+            client._remember_validators(f'https://example.com/{i}', response)
+        self.assertEqual(len(client._validators), MAX_VALIDATORS)
+        self.assertNotIn('https://example.com/0', client._validators)
+
+class FemaConcurrentSyncTests(TestCase):
+    def test_states_are_fetched_concurrently_and_written_together(self):
+        with open(TEST_DATA_DIR / 'fema_declarations.json') as f:
+            records = json.load(f)
+        states = ['CA', 'FL', 'TX', 'VT', 'NY', 'WA', 'OR', 'NV', 'AZ', 'CO']
+        delay = 0.3
+        with StubFemaServer(records, delay=delay) as stub, override_settings(
+            FEMA_API_URL=stub.url, FEMA_FETCH_CONCURRENCY=10, FEMA_RATE_LIMIT=0
+        ):
+            start = time.perf_counter()
+            changed = sync_states(states)
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(stub.requests), len(states))
+        # Serial fetching would take len(states) * delay
+        self.assertLess(elapsed, 4 * delay)
+        self.assertEqual(len(changed), len(records))
+        self.assertEqual(
+            DisasterSyncState.objects.exclude(last_refresh=None).count(),
+            len({rec['state'] for rec in records}),
+        )
+
+
+    def test_sync_pages_through_every_refreshed_record(self):
+        with open(TEST_DATA_DIR / 'fema_declarations.json') as f:
+            template = json.load(f)[0]
+        records = [
+            dict(template, id=f'ca-{i}', lastRefresh=f'2025-02-0{i + 1}T00:00:00.000Z') for i in range(5)
+        ]
+        with StubFemaServer(records) as stub, override_settings(FEMA_API_URL=stub.url, FEMA_SYNC_PAGE_SIZE=2):
+            changed = sync_states(['CA'])
+
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual(len(changed), 5)
+        self.assertEqual(DisasterUpdate.objects.filter(state='CA').count(), 5)
+        sync_state = DisasterSyncState.objects.get(state='CA')
+        self.assertEqual(format_fema_datetime(sync_state.last_refresh), '2025-02-05T00:00:00.000Z')
+        self.assertEqual(sync_state.last_refresh_id, 'ca-4')
+
+    def test_sync_keeps_records_refreshed_while_paging(self):
+        with open(TEST_DATA_DIR / 'fema_declarations.json') as f:
+            template = json.load(f)[0]
+        records = [
+            dict(template, id=f'ca-{i}', lastRefresh=f'2025-02-0{i + 1}T00:00:00.000Z') for i in range(5)
+        ]
+
+        def refresh_first_record(count):
+            # FEMA refreshes a record we have paged past, which moves it to the end
+            if count == 2:
+                records[0]['lastRefresh'] = '2025-02-09T00:00:00.000Z'
+
+        with StubFemaServer(records, before_request=refresh_first_record) as stub, \
+                override_settings(FEMA_API_URL=stub.url, FEMA_SYNC_PAGE_SIZE=2):
+            sync_states(['CA'])
+            # Records FEMA commits later at the watermark's lastRefresh are still picked up
+            stub.records.append(dict(template, id='ca-5', lastRefresh='2025-02-09T00:00:00.000Z'))
+            sync_states(['CA'])
+
+        self.assertEqual(
+            set(DisasterUpdate.objects.filter(state='CA').values_list('fema_id', flat=True)),
+            {f'ca-{i}' for i in range(6)},
+        )
+        self.assertEqual(
+            format_fema_datetime(DisasterUpdate.objects.get(fema_id='ca-0').updated_at), '2025-02-09T00:00:00.000Z'
+        )
+        self.assertEqual(DisasterSyncState.objects.get(state='CA').last_refresh_id, 'ca-5')
+
+class FemaRefreshSchedulerTests(TestCase):
+    def setUp(self):
+        for name, state in [('ana', 'CA'), ('ben', 'TX')]:
+            user = User.objects.create_user(username=name, password='secret-pass')
+            UserProfile.objects.create(
+                user=user, street_address='1 Main St', city='Somewhere', state=state, postal_code='90001'
+            )
+
+    def test_only_one_claimant_refreshes_a_state_per_interval(self):
+        self.assertTrue(claim_refresh('CA', interval=600))
+        self.assertFalse(claim_refresh('CA', interval=600))
+        DisasterSyncState.objects.filter(state='CA').update(last_synced_at=timezone.now() - timedelta(seconds=601))
+        self.assertTrue(claim_refresh('CA', interval=600))
+        self.assertFalse(claim_refresh('CA', interval=600))
+
+    def test_a_tick_syncs_only_due_states(self):
+        DisasterSyncState.objects.create(state='TX', last_synced_at=timezone.now())
+        DisasterSyncState.objects.create(state='CA', last_synced_at=timezone.now() - timedelta(hours=2))
+        scheduler = FemaRefreshScheduler(interval=3600)
+        # Stop after the first tick; the test transaction must keep its connection
+        with patch('claimIT_backend.utils.fema_scheduler.sync_states', side_effect=lambda states: scheduler.stop()) as sync, \
+                patch('claimIT_backend.utils.fema_scheduler.close_old_connections'):
+            scheduler.run()
+        sync.assert_called_once_with(['CA'])
+
+    def test_refresh_command_skips_states_that_are_not_due(self):
+        out = io.StringIO()
+        with patch('claimIT_backend.utils.fema_scheduler.sync_states') as sync:
+            call_command('refresh_disaster_updates', states=['ca'], stdout=out)
+            call_command('refresh_disaster_updates', states=['ca'], stdout=out)
+            call_command('refresh_disaster_updates', states=['ca'], force=True, stdout=out)
+        self.assertEqual(sync.call_args_list, [call(['CA']), call(['CA'])])
+        self.assertEqual(out.getvalue().count('Refreshed CA'), 2)
+        self.assertIn('No states due for refresh', out.getvalue())
+
+class DisasterUpdateListTests(TestCase):
+    def setUp(self):
+        with open(TEST_DATA_DIR / 'fema_declarations.json') as f:
+            self.records = json.load(f)
+        self.user = User.objects.create_user(username='ca-user', password='secret-pass')
+        UserProfile.objects.create(
+            user=self.user, street_address='1 Main St', city='Los Angeles', state='CA', postal_code='90001'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_revalidated_with_etag(self):
+        upsert_disaster_updates(self.records)
+        response = self.client.get('/api/disaster-updates/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({u['state'] for u in response.json()['results']}, {'CA'})
+        etag = response['ETag']
+
+        response = self.client.get('/api/disaster-updates/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # A sync that writes rows for the state changes the version
+        changed = dict(self.records[0], lastRefresh='2025-02-01T00:00:00.000Z')
+        upsert_disaster_updates([changed])
+        response = self.client.get('/api/disaster-updates/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_version_follows_lowercase_profile_states_and_legacy_deletes(self):
+        UserProfile.objects.filter(user=self.user).update(state='ca')
+        upsert_disaster_updates(self.records)
+        DisasterUpdate.objects.create(
+            title='Old flood', location='Napa', state='CA', disaster_type='flood', severity=3,
+            updated_at=timezone.now(),
+        )
+        etag = self.client.get('/api/disaster-updates/')['ETag']
+        self.assertFalse(etag.endswith('-0"'))
+
+        delete_legacy_updates(['CA'])
+        response = self.client.get('/api/disaster-updates/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Old flood', {u['title'] for u in response.json()['results']})
+
+    def test_list_is_filtered_and_keyset_paginated(self):
+        upsert_disaster_updates(self.records)
+        response = self.client.get('/api/disaster-updates/', {'state': 'ca', 'page_size': 1})
+        first = response.json()
+        self.assertEqual(len(first['results']), 1)
+        self.assertIsNotNone(first['next'])
+
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+        self.assertGreater(first['results'][0]['updated_at'], second['results'][0]['updated_at'])
+
+        response = self.client.get('/api/disaster-updates/', {'state': 'CA', 'declaration_type': 'fm'})
+        self.assertEqual([u['declaration_type'] for u in response.json()['results']], ['FM'])
+
+        response = self.client.get('/api/disaster-updates/', {'state': 'FL', 'updated_after': '2024-12-01'})
+        self.assertEqual(len(response.json()['results']), 1)
+        response = self.client.get('/api/disaster-updates/', {'updated_after': 'not-a-date'})
+        self.assertEqual(response.status_code, 400)
+
+        # Retrieve is not limited to the listed page
+        other = DisasterUpdate.objects.get(state='VT')
+        self.assertEqual(self.client.get(f'/api/disaster-updates/{other.id}/').status_code, 200)
+
+    def test_cursor_bounds_the_leading_column_and_rejects_bad_values(self):
+        upsert_disaster_updates(self.records)
+        first = self.client.get('/api/disaster-updates/', {'page_size': 1}).json()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(first['next']).status_code, 200)
+        page_query = next(q['sql'] for q in queries.captured_queries if 'FROM "claimIT_backend_disasterupdate"' in q['sql'])
+        self.assertIn('"updated_at" <=', page_query)
+
+        for position in (['not-a-date', 1], ['2025-01-01T00:00:00+00:00', 'x'], [[1], 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = self.client.get('/api/disaster-updates/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, position)
+
+
+class QueryCountTests(TestCase):
+    """
+    Guards against N+1 queries: every list endpoint must issue the same number
+    of queries however many rows it returns.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='secret-pass', is_staff=True)
+        UserProfile.objects.create(
+            user=self.user, street_address='1 Main St', city='Los Angeles', state='CA', postal_code='90001'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertConstantQueries(self, url, add_rows):
+        add_rows(1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as few:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        add_rows(5)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(few), len(many),
+            f"{url} issues more queries as rows are added:\n" + "\n".join(q['sql'] for q in many.captured_queries),
+        )
+
+    def test_claims(self):
+        def add_claims(count):
+            for _ in range(count):
+                claim = Claim.objects.create(
+                    user=self.user, disaster_type='flood', property_type='house',
+                    description='Water damage', estimated_loss='1000.00',
+                )
+                ClaimDocument.objects.bulk_create([
+                    ClaimDocument(claim=claim, file=f'user_{self.user.id}/claims/{claim.id}/photo{i}.jpg')
+                    for i in range(2)
+                ])
+        self.assertConstantQueries('/api/claims/', add_claims)
+
+    def test_notifications(self):
+        def add_notifications(count):
+            Notification.objects.bulk_create([
+                Notification(user=self.user, title='Update', message='Your claim was updated')
+                for _ in range(count)
+            ])
+        self.assertConstantQueries('/api/notifications/', add_notifications)
+
+    def test_user_profiles(self):
+        def add_profiles(count):
+            for _ in range(count):
+                user = User.objects.create_user(username=f'user{User.objects.count()}', password='secret-pass')
+                UserProfile.objects.create(
+                    user=user, street_address='2 Oak Ave', city='Austin', state='TX', postal_code='73301'
+                )
+        self.assertConstantQueries('/api/user-profiles/', add_profiles)
+
+    def test_disaster_updates(self):
+        def add_updates(count):
+            start = DisasterUpdate.objects.count()
+            upsert_disaster_updates([
+                {'id': f'record-{start + i}', 'state': 'CA', 'declarationTitle': 'FLOODING',
+                 'designatedArea': 'Napa (County)', 'incidentType': 'Flood', 'declarationType': 'DR'}
+                for i in range(count)
+            ])
+        self.assertConstantQueries('/api/disaster-updates/', add_updates)
+
+
+class ClaimStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='stats-user', password='secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def create_claim(self, **kwargs):
+        fields = {
+            'user': self.user, 'disaster_type': 'flood', 'property_type': 'house',
+            'description': 'Water damage', 'estimated_loss': '1000.00',
+        }
+        fields.update(kwargs)
+        return Claim.objects.create(**fields)
+
+    def test_stats_are_aggregated_cached_and_invalidated(self):
+        self.create_claim()
+        self.create_claim(status='approved', estimated_loss='3000.00')
+        self.create_claim(disaster_type='wildfire', property_type='automobile', estimated_loss='500.50')
+
+        with CaptureQueriesContext(connection) as queries:
+            stats = self.client.get('/api/claims/stats/').json()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(stats['total_claims'], 3)
+        self.assertEqual(stats['total_estimated_loss'], '4500.50')
+        self.assertEqual(stats['average_estimated_loss'], '1500.17')
+        self.assertEqual(stats['by_status']['pending'], 2)
+        self.assertEqual(stats['by_status']['approved'], 1)
+        self.assertEqual(stats['by_disaster_type']['wildfire'], 1)
+        self.assertEqual(stats['by_property_type']['house'], 2)
+        self.assertEqual(sum(month['count'] for month in stats['monthly']), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/claims/stats/')
+        self.assertEqual(len(queries), 0)
+
+        self.create_claim(estimated_loss='99.50')
+        self.assertEqual(self.client.get('/api/claims/stats/').json()['total_claims'], 4)
+
+
+class BulkClaimIntakeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user(username='partner', password='secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def claim_payload(self, **kwargs):
+        payload = {
+            'disaster_type': 'hurricane', 'property_type': 'business',
+            'description': 'Roof torn off', 'estimated_loss': '25000.00',
+        }
+        payload.update(kwargs)
+        return payload
+
+    def test_bulk_json_intake_assigns_identifiers_on_insert(self):
+        claims = [self.claim_payload(estimated_loss=f'{1000 + i}.00') for i in range(5)]
+        with override_settings(CLAIM_BULK_BATCH_SIZE=2):
+            response = self.client.post('/api/claims/bulk/', {'claims': claims}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 5)
+        numbers = list(Claim.objects.values_list('claim_number', flat=True))
+        self.assertEqual(len(set(numbers)), 5)
+        self.assertTrue(all(re.fullmatch(r'CLM-\d{4}-\d{6}', n) for n in numbers))
+        self.assertFalse(Claim.objects.filter(insurance_policy_number=None).exists())
+
+    def test_bulk_intake_reports_claims_committed_before_a_failed_batch(self):
+        claims = [self.claim_payload(estimated_loss=f'{1000 + i}.00') for i in range(5)]
+        with override_settings(CLAIM_BULK_BATCH_SIZE=2), patch(
+            'claimIT_backend.utils.claim_intake.materialize_claim_features', side_effect=[2, DatabaseError('lost')]
+        ):
+            response = self.client.post('/api/claims/bulk/', {'claims': claims}, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        body = response.json()
+        self.assertEqual(body['created'], 2)
+        self.assertEqual(body['failed'], {'start': 2, 'end': 5})
+        self.assertEqual(
+            sorted(c['id'] for c in body['claims']), sorted(Claim.objects.values_list('id', flat=True))
+        )
+
+    def test_bulk_intake_is_all_or_nothing_on_invalid_claims(self):
+        claims = [self.claim_payload(), self.claim_payload(disaster_type='meteor')]
+        response = self.client.post('/api/claims/bulk/', {'claims': claims}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Claim.objects.exists())
+
+    def test_bulk_multipart_intake_attaches_documents(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            response = self.client.post('/api/claims/bulk/', {
+                'claims': json.dumps([self.claim_payload(), self.claim_payload()]),
+                'documents.1': [
+                    SimpleUploadedFile('roof.jpg', b'jpeg-bytes', content_type='image/jpeg'),
+                    SimpleUploadedFile('policy.pdf', b'%PDF-1.4', content_type='application/pdf'),
+                ],
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        first, second = [c['id'] for c in response.json()['claims']]
+        self.assertEqual(ClaimDocument.objects.filter(claim_id=first).count(), 0)
+        self.assertEqual(ClaimDocument.objects.filter(claim_id=second).count(), 2)
+
+
+class ClaimNumberAllocatorTests(TestCase):
+    def test_numbers_are_unambiguous(self):
+        claim_number, policy_number = allocate_claim_identifiers(1, year=2025)[0]
+        self.assertRegex(claim_number, r'^CLM-2025-\d{6,}$')
+        self.assertRegex(policy_number, r'^POL-2025-\d{6,}$')
+
+    def test_blocks_of_different_workers_do_not_overlap(self):
+        workers = [BlockAllocator(block_size=5) for _ in range(3)]
+        numbers = []
+        for _ in range(4):
+            for worker in workers:
+                with self.captureOnCommitCallbacks(execute=True):
+                    numbers.extend(worker.allocate(3, 2025))
+        self.assertEqual(len(numbers), 36)
+        self.assertEqual(len(set(numbers)), 36)
+
+    def test_block_reserved_in_rolled_back_transaction_is_dropped(self):
+        worker = BlockAllocator(block_size=10)
+        with transaction.atomic():
+            rolled_back = worker.allocate(2, 2025)
+            transaction.set_rollback(True)
+        # The reservation was rolled back too, so the numbers are handed out again
+        self.assertEqual(worker.allocate(2, 2025), rolled_back)
+
+    def test_sequence_created_in_rolled_back_transaction_is_not_cached(self):
+        allocator = SequenceAllocator()
+        cursor = SimpleNamespace(execute=lambda sql: None)
+        with transaction.atomic():
+            allocator.ensure_sequence(cursor, 2025)
+            transaction.set_rollback(True)
+        self.assertNotIn(2025, allocator._created)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            allocator.ensure_sequence(cursor, 2025)
+        self.assertIn(2025, allocator._created)
+
+    @skipUnless(connection.vendor == 'postgresql', "Claim number sequences are Postgres only")
+    def test_sequence_allocation_after_rolled_back_first_allocation(self):
+        allocator = SequenceAllocator()
+        with transaction.atomic():
+            allocator.allocate(2, 2031)
+            transaction.set_rollback(True)
+        # The sequence was rolled back with the transaction and is created again
+        self.assertEqual(len(set(allocator.allocate(2, 2031))), 2)
+
+        with transaction.atomic():
+            allocator.allocate(1, 2032)
+            transaction.set_rollback(True)
+        # Even a stale cache entry recovers from the missing sequence
+        allocator.remember(2032)
+        self.assertEqual(len(allocator.allocate(1, 2032)), 1)
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ClaimNumberConcurrencyTests(TransactionTestCase):
+    workers = 8
+    rounds = 25
+
+    def allocate_many(self, allocator):
+        numbers = []
+        try:
+            for i in range(self.rounds):
+                with transaction.atomic():
+                    numbers.extend(allocator.allocate(1 + i % 4, 2025))
+        finally:
+            connections.close_all()
+        return numbers
+
+    def test_concurrent_workers_never_share_a_number(self):
+        # One allocator per thread stands in for separate gunicorn workers, plus
+        # threads sharing the process-wide allocator
+        allocators = [BlockAllocator(block_size=7) for _ in range(self.workers)]
+        if connection.vendor == 'postgresql':
+            allocators = [get_allocator()] * self.workers
+        allocators += [get_allocator()] * self.workers
+        with ThreadPoolExecutor(max_workers=len(allocators)) as pool:
+            results = list(pool.map(self.allocate_many, allocators))
+
+        numbers = [n for result in results for n in result]
+        self.assertEqual(len(numbers), len(allocators) * sum(1 + i % 4 for i in range(self.rounds)))
+        self.assertEqual(len(set(numbers)), len(numbers))
+
+
+class DocumentUploadTests(TestCase):
+    content = b'%PDF-1.4 ' + bytes(range(256)) * 3
+
+    def setUp(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        storage = override_settings(
+            MEDIA_ROOT=f'{temp_dir}/media', CLAIM_UPLOAD_TEMP_DIR=f'{temp_dir}/parts', CLAIM_UPLOAD_PART_SIZE=256,
+        )
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        self.user = User.objects.create_user(username='uploader', password='secret-pass')
+        self.claim = Claim.objects.create(
+            user=self.user, disaster_type='flood', property_type='house',
+            description='Water damage', estimated_loss='1000.00',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start_upload(self, **kwargs):
+        payload = {
+            'claim': self.claim.id, 'filename': 'estimate.pdf', 'size': len(self.content),
+            'sha256': hashlib.sha256(self.content).hexdigest(),
+        }
+        payload.update(kwargs)
+        return self.client.post('/api/document-uploads/', payload, format='json')
+
+    def put_part(self, upload_id, index, body, **headers):
+        return self.client.put(
+            f'/api/document-uploads/{upload_id}/parts/{index}/', body,
+            content_type='application/octet-stream', **headers,
+        )
+
+    def test_parts_resume_out_of_order_and_commit_to_a_document(self):
+        upload = self.start_upload().json()
+        self.assertEqual((upload['part_size'], upload['part_count']), (256, 4))
+        parts = [self.content[i:i + 256] for i in range(0, len(self.content), 256)]
+
+        for index in (3, 0, 2):
+            response = self.put_part(upload['id'], index, parts[index],
+                                     HTTP_X_PART_SHA256=hashlib.sha256(parts[index]).hexdigest())
+            self.assertEqual(response.status_code, 200)
+        status = self.client.get(f"/api/document-uploads/{upload['id']}/").json()
+        self.assertEqual(status['received_parts'], [0, 2, 3])
+        self.assertEqual(self.client.post(f"/api/document-uploads/{upload['id']}/commit/").status_code, 400)
+
+        self.put_part(upload['id'], 1, parts[1])
+        response = self.client.post(f"/api/document-uploads/{upload['id']}/commit/")
+        self.assertEqual(response.status_code, 201)
+
+        document = ClaimDocument.objects.get(claim=self.claim)
+        with document.file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(DocumentUpload.objects.exists())
+
+    def test_concurrent_commits_create_one_document(self):
+        upload_id = self.start_upload().json()['id']
+        for index in range(4):
+            self.put_part(upload_id, index, self.content[index * 256:(index + 1) * 256])
+        upload = DocumentUpload.objects.get(pk=upload_id)
+        stale = DocumentUpload.objects.get(pk=upload_id)
+
+        # The parts stay on disk until the first commit's transaction ends, as for a concurrent request
+        commit_upload(upload)
+        with self.assertRaisesMessage(UploadError, "already committed"):
+            commit_upload(stale)
+        self.assertEqual(ClaimDocument.objects.filter(claim=self.claim).count(), 1)
+
+    def test_parts_are_checked_as_they_arrive(self):
+        upload_id = self.start_upload().json()['id']
+        self.assertEqual(self.put_part(upload_id, 0, self.content[:300]).status_code, 400)
+        self.assertEqual(self.put_part(upload_id, 0, self.content[:100]).status_code, 400)
+        self.assertEqual(self.put_part(upload_id, 4, b'').status_code, 400)
+        response = self.put_part(upload_id, 0, self.content[:256], HTTP_X_PART_SHA256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(f'/api/document-uploads/{upload_id}/').json()['received_parts'], [])
+
+    def test_whole_file_hash_is_checked_on_commit(self):
+        upload_id = self.start_upload(sha256='a' * 64).json()['id']
+        for index in range(4):
+            self.put_part(upload_id, index, self.content[index * 256:(index + 1) * 256])
+        self.assertEqual(self.client.post(f'/api/document-uploads/{upload_id}/commit/').status_code, 400)
+        self.assertFalse(ClaimDocument.objects.exists())
+
+    def test_uploads_are_validated_before_any_bytes_are_sent(self):
+        self.assertEqual(self.start_upload(size=5 * 1024 * 1024 + 1).status_code, 400)
+        self.assertEqual(self.start_upload(filename='payload.exe').status_code, 400)
+        other = User.objects.create_user(username='someone-else')
+        other_claim = Claim.objects.create(
+            user=other, disaster_type='flood', property_type='house',
+            description='Not yours', estimated_loss='1.00',
+        )
+        self.assertEqual(self.start_upload(claim=other_claim.id).status_code, 400)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage = override_settings(MEDIA_ROOT=media_root)
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        self.user = User.objects.create_user(username='deduper', password='secret-pass')
+        self.claims = [
+            Claim.objects.create(
+                user=self.user, disaster_type='flood', property_type='house',
+                description='Water damage', estimated_loss='1000.00',
+            )
+            for _ in range(2)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def attach(self, claim, content, name='policy.pdf'):
+        return ClaimDocument.objects.create(claim=claim, file=SimpleUploadedFile(name, content))
+
+    def test_identical_files_are_stored_once_and_collected_with_the_last_reference(self):
+        first = self.attach(self.claims[0], b'%PDF-1.4 policy')
+        second = self.attach(self.claims[1], b'%PDF-1.4 policy', name='copy.pdf')
+        other = self.attach(self.claims[1], b'%PDF-1.4 other')
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual((first.filename, second.filename), ('policy.pdf', 'copy.pdf'))
+        self.assertNotEqual(first.file.name, other.file.name)
+        self.assertEqual(StoredBlob.objects.get(name=first.file.name).refcount, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(document_storage.exists(second.file.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.claims[1].delete()
+        self.assertFalse(document_storage.exists(second.file.name))
+        self.assertFalse(document_storage.exists(other.file.name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_known_file_is_attached_without_uploading_it_again(self):
+        content = b'%PDF-1.4 policy'
+        self.attach(self.claims[0], content)
+        response = self.client.post('/api/document-uploads/', {
+            'claim': self.claims[1].id, 'filename': 'policy.pdf', 'size': len(content),
+            'sha256': hashlib.sha256(content).hexdigest(),
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['document']['filename'], 'policy.pdf')
+        self.assertFalse(DocumentUpload.objects.exists())
+        self.assertEqual(StoredBlob.objects.get().refcount, 2)
+
+    def test_files_of_other_users_are_not_attached_by_hash(self):
+        content = b'%PDF-1.4 someone else'
+        other = User.objects.create_user(username='other-owner')
+        self.attach(Claim.objects.create(
+            user=other, disaster_type='flood', property_type='house', description='x', estimated_loss='1.00',
+        ), content)
+        response = self.client.post('/api/document-uploads/', {
+            'claim': self.claims[0].id, 'filename': 'policy.pdf', 'size': len(content),
+            'sha256': hashlib.sha256(content).hexdigest(),
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('document', response.json())
+        self.assertEqual(StoredBlob.objects.get().refcount, 1)
+
+
+class DocumentPreviewTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage = override_settings(MEDIA_ROOT=media_root)
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        self.user = User.objects.create_user(username='photographer', password='secret-pass')
+        self.claim = Claim.objects.create(
+            user=self.user, disaster_type='flood', property_type='house',
+            description='Water damage', estimated_loss='1000.00',
+        )
+
+    def attach(self, name, content):
+        return ClaimDocument.objects.create(claim=self.claim, file=SimpleUploadedFile(name, content))
+
+    def image_bytes(self, size, mode='RGB', fmt='PNG'):
+        buffer = io.BytesIO()
+        Image.new(mode, size, 'red').save(buffer, fmt)
+        return buffer.getvalue()
+
+    def test_image_previews_are_scaled_stored_and_serialized(self):
+        document = self.attach('roof.png', self.image_bytes((2000, 1000), mode='RGBA'))
+        names = generate_previews(document)
+
+        self.assertEqual(set(names), {'small', 'medium', 'large'})
+        storage = document.file.storage
+        for label, longest in (('small', 160), ('medium', 480), ('large', 1024)):
+            with storage.open(names[label]) as f, Image.open(f) as preview:
+                self.assertEqual((preview.format, max(preview.size)), ('JPEG', longest))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get(f'/api/claims/{self.claim.id}/').json()
+        self.assertIn(f"/api/media/{names['small']}?token=", data['claim_documents'][0]['previews']['small'])
+
+    def test_previews_are_shared_by_documents_with_the_same_file(self):
+        content = self.image_bytes((800, 600), fmt='JPEG')
+        first = generate_previews(self.attach('a.jpg', content))
+        second = self.attach('b.jpg', content)
+        with self.assertNumQueries(1):
+            self.assertEqual(generate_previews(second), first)
+
+    def test_documents_without_a_preview_are_skipped(self):
+        self.assertEqual(generate_previews(self.attach('photos.zip', b'PK\x03\x04')), {})
+        self.assertEqual(generate_previews(self.attach('broken.png', b'not an image')), {})
+
+    @skipUnless(importlib.util.find_spec('pymupdf') or shutil.which('pdftoppm'), "no PDF renderer installed")
+    def test_pdf_preview_renders_the_first_page(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (850, 1100), 'white').save(buffer, 'PDF')
+        names = generate_previews(self.attach('estimate.pdf', buffer.getvalue()))
+        with self.claim.claim_documents.get().file.storage.open(names['large']) as f, Image.open(f) as preview:
+            self.assertEqual(max(preview.size), 1024)
+
+
+class MediaViewTests(TestCase):
+    content = b'%PDF-1.4 ' + b'0123456789' * 10
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage = override_settings(MEDIA_ROOT=media_root, MEDIA_SERVE_BACKEND='django')
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        self.user = User.objects.create_user(username='owner', password='secret-pass')
+        claim = Claim.objects.create(
+            user=self.user, disaster_type='flood', property_type='house',
+            description='Water damage', estimated_loss='1000.00',
+        )
+        self.document = ClaimDocument.objects.create(
+            claim=claim, file=SimpleUploadedFile('estimate.pdf', self.content)
+        )
+        self.url = f'/api/media/{self.document.file.name}'
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_owner_gets_the_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('estimate.pdf', response['Content-Disposition'])
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=9-18')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), b'0123456789')
+        self.assertEqual(response['Content-Range'], f'bytes 9-18/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(self.body(response), b'6789')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=500-').status_code, 416)
+        # A stale If-Range gets the whole file
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_users_and_anonymous_requests_are_refused(self):
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='intruder'))
+        self.assertEqual(other.get(self.url).status_code, 404)
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+        self.assertEqual(APIClient().get(self.url + '?token=forged').status_code, 404)
+        self.assertEqual(self.client.get('/api/media/../../etc/passwd').status_code, 404)
+
+    def test_signed_url_from_the_api_works_without_a_token_header(self):
+        data = self.client.get(f'/api/claims/{self.document.claim_id}/').json()
+        url = data['claim_documents'][0]['file']
+        response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+
+    @override_settings(MEDIA_SERVE_BACKEND='nginx')
+    def test_transfer_is_handed_to_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.document.file.name}')
+        self.assertEqual(response.content, b'')
+
+
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='listener', password='secret-pass')
+        Notification.objects.create(user=self.user, title='Welcome', message='Hello')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.token = client.post('/api/notifications/stream_token/').json()['token']
+
+    def notify(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(user=self.user, **kwargs)
+
+    def mark_all_read(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post('/api/notifications/mark_all_as_read/')
+
+    async def next_event(self, stream):
+        while True:
+            chunk = (await asyncio.wait_for(anext(stream), 5)).decode()
+            if chunk.startswith('event:'):
+                event, data = chunk.strip().split('\n')
+                return event.split(': ', 1)[1], json.loads(data.split(': ', 1)[1])
+
+    async def test_stream_pushes_new_notifications_and_unread_counts(self):
+        response = await self.async_client.get('/api/notifications/stream/', {'token': self.token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await self.next_event(stream), ('unread_count', {'count': 1}))
+
+        await sync_to_async(self.notify)(title='Claim approved', message='Your claim was approved', type='success')
+        event, data = await self.next_event(stream)
+        self.assertEqual((event, data['title']), ('notification', 'Claim approved'))
+        self.assertEqual(await self.next_event(stream), ('unread_count', {'count': 2}))
+
+        await sync_to_async(self.mark_all_read)()
+        self.assertEqual(await self.next_event(stream), ('unread_count', {'count': 0}))
+        await stream.aclose()
+
+    async def test_stream_requires_a_valid_token(self):
+        response = await self.async_client.get('/api/notifications/stream/', {'token': 'not-a-token'})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/api/notifications/stream/')
+        self.assertEqual(response.status_code, 401)
+        # Access tokens are not accepted in the URL, where they would be logged
+        access_token = str(AccessToken.for_user(self.user))
+        response = await self.async_client.get('/api/notifications/stream/', {'token': access_token})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_tokens_expire(self):
+        with override_settings(NOTIFICATION_STREAM_TOKEN_MAX_AGE=0):
+            await asyncio.sleep(1)
+            response = await self.async_client.get('/api/notifications/stream/', {'token': self.token})
+        self.assertEqual(response.status_code, 401)
+
+
+class UnreadNotificationCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='secret-pass')
+        self.profile = UserProfile.objects.create(
+            user=self.user, street_address='1 Main St', city='Los Angeles', state='CA', postal_code='90001'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, count=1, **kwargs):
+        return [
+            Notification.objects.create(user=self.user, title='Update', message='Claim updated', **kwargs)
+            for _ in range(count)
+        ]
+
+    def counter(self):
+        self.profile.refresh_from_db()
+        return self.profile.unread_notifications
+
+    def unread_count(self):
+        return self.client.get('/api/notifications/unread_count/').json()['count']
+
+    def test_counter_follows_creates_reads_and_deletes(self):
+        first, second, third = self.notify(3)
+        self.notify(read=True)
+        self.assertEqual(self.counter(), 3)
+
+        self.client.patch(f'/api/notifications/{first.id}/mark_as_read/')
+        self.client.patch(f'/api/notifications/{first.id}/mark_as_read/')
+        self.assertEqual(self.counter(), 2)
+
+        second.delete()
+        self.assertEqual(self.counter(), 1)
+        third.read = True
+        third.save()
+        self.assertEqual(self.counter(), 0)
+
+        self.notify(2)
+        self.client.post('/api/notifications/mark_all_as_read/')
+        self.assertEqual(self.counter(), 0)
+
+    def test_unread_count_reads_the_counter(self):
+        self.notify(5)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.unread_count(), 5)
+        self.assertFalse(any('claimIT_backend_notification' in q['sql'] for q in queries.captured_queries))
+
+    def test_recount_repairs_counters_after_bulk_changes(self):
+        Notification.objects.bulk_create([
+            Notification(user=self.user, title='Update', message='Claim updated') for _ in range(4)
+        ])
+        self.assertEqual(self.counter(), 0)
+        recount_unread([self.user.id])
+        self.assertEqual(self.counter(), 4)
+
+
+class NotificationJobTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='secret-pass', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.users = {}
+        for name, state, postal_code in [('ana', 'CA', '90001'), ('ben', 'CA', '94105'),
+                                         ('cy', 'CA', '90210'), ('dee', 'TX', '73301')]:
+            user = User.objects.create_user(username=name, password='secret-pass')
+            UserProfile.objects.create(
+                user=user, street_address='1 Main St', city='Somewhere', state=state, postal_code=postal_code
+            )
+            self.users[name] = user
+        Claim.objects.create(
+            user=self.users['cy'], disaster_type='wildfire', property_type='house',
+            description='Smoke damage', estimated_loss='5000.00',
+        )
+
+    def start_job(self, **filters):
+        response = self.client.post('/api/notification-jobs/', {
+            'title': 'Disaster declared', 'message': 'A wildfire was declared in your area', 'type': 'warning',
+            'filters': filters,
+        }, format='json')
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def recipients(self):
+        return set(Notification.objects.values_list('user__username', flat=True))
+
+    def test_job_notifies_matching_users_in_batches(self):
+        job = self.start_job(state='ca', postal_code_prefix='90')
+        self.assertEqual(job['status'], 'pending')
+
+        with CaptureQueriesContext(connection) as queries:
+            run_notification_job(job['id'], batch_size=1)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "claimIT_backend_notification"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(self.recipients(), {'ana', 'cy'})
+        self.assertEqual(UserProfile.objects.get(user=self.users['ana']).unread_notifications, 1)
+
+        job = self.client.get(f"/api/notification-jobs/{job['id']}/").json()
+        self.assertEqual((job['status'], job['sent'], job['total'], job['progress']), ('completed', 2, 2, 1.0))
+
+    def test_job_filters_on_open_claims_and_resumes_after_the_last_user(self):
+        job = self.start_job(state='CA', has_open_claims=True)
+        self.assertEqual(run_notification_job(job['id']).sent, 1)
+        self.assertEqual(self.recipients(), {'cy'})
+
+        job = self.start_job()
+        NotificationJob.objects.filter(pk=job['id']).update(status='running', last_user_id=self.users['ben'].id)
+        run_notification_job(job['id'])
+        self.assertEqual(Notification.objects.filter(title='Disaster declared').count(), 1 + 2)
+
+    def test_only_admins_can_start_jobs(self):
+        client = APIClient()
+        client.force_authenticate(self.users['ana'])
+        response = client.post('/api/notification-jobs/', {'title': 'Hi', 'message': 'Hello'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class DisasterNotificationTests(TestCase):
+    def setUp(self):
+        for name, state, active in [('ana', 'CA', True), ('ben', 'CA', True), ('cy', 'CA', False), ('dee', 'TX', True)]:
+            user = User.objects.create_user(username=name, password='secret-pass', is_active=active)
+            UserProfile.objects.create(
+                user=user, street_address='1 Main St', city='Somewhere', state=state, postal_code='90001'
+            )
+
+    def record(self, fema_id, area, state='CA', number=4900, declared=None):
+        declared = declared or timezone.now() - timedelta(days=1)
+        return {
+            'id': fema_id, 'disasterNumber': number, 'state': state, 'declarationTitle': 'WILDFIRES',
+            'designatedArea': area, 'incidentType': 'Fire', 'declarationType': 'DR',
+            'declarationDate': format_fema_datetime(declared), 'lastRefresh': format_fema_datetime(timezone.now()),
+        }
+
+    def notified(self):
+        return sorted(Notification.objects.values_list('user__username', flat=True))
+
+    def test_users_in_the_state_are_notified_once_per_disaster(self):
+        records = [
+            self.record('ca-1', 'Napa (County)'),
+            self.record('ca-2', 'Sonoma (County)'),
+            self.record('tx-1', 'Travis (County)', state='TX', number=4800, declared=timezone.now() - timedelta(days=400)),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            upsert_disaster_updates(records, notify=True)
+        inserts = [q for q in queries.captured_queries if q['sql'].lstrip().startswith('INSERT INTO "claimIT_backend_notification"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.notified(), ['ana', 'ben'])
+        notification = Notification.objects.get(user__username='ana')
+        self.assertEqual(notification.type, 'warning')
+        self.assertIn('WILDFIRES', notification.message)
+        self.assertEqual(UserProfile.objects.get(user__username='ana').unread_notifications, 1)
+
+        # More designated areas of the same disaster, and a resync, announce nothing new
+        upsert_disaster_updates([self.record('ca-3', 'Lake (County)')], notify=True)
+        upsert_disaster_updates(records + [self.record('ca-4', 'Marin (County)')], notify=True)
+        self.assertEqual(self.notified(), ['ana', 'ben'])
+
+    def test_backfills_do_not_notify(self):
+        upsert_disaster_updates([self.record('ca-1', 'Napa (County)')])
+        self.assertEqual(self.notified(), [])
+
+
+class LinearTestModel:
+    """
+    Picklable stand-in for a trained model: a weighted sum of the inputs.
+    """
+    def __init__(self, weights, probability=False):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.probability = probability
+
+    def predict(self, X):
+        return X @ self.weights
+
+    def predict_proba(self, X):
+        p = 1 / (1 + np.exp(-(X @ self.weights)))
+        return np.column_stack([1 - p, p])
+
+
+class ClaimScoringTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='scored', password='secret-pass')
+        UserProfile.objects.create(
+            user=self.user, street_address='1 Main St', city='Los Angeles', state='CA', postal_code='90001'
+        )
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir, ignore_errors=True)
+        path = Path(self.model_dir) / 'claim_model.pkl'
+        # Approval rises with documents; the limit is 80% of the estimated loss
+        with open(path, 'wb') as f:
+            pickle.dump({
+                'version': 'test-1',
+                'features': ['disaster_type', 'estimated_loss', 'document_count'],
+                'encoders': {'disaster_type': {'flood': 0, 'wildfire': 1}},
+                'approval_model': LinearTestModel([0, 0, 1]),
+                'limit_model': LinearTestModel([0, 0.8, 0]),
+            }, f)
+        settings_override = override_settings(CLAIM_MODEL_PATH=str(path))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_model()
+        self.addCleanup(reset_model)
+
+    def create_claim(self, documents=0, loss='1000.00'):
+        claim = Claim.objects.create(
+            user=self.user, disaster_type='flood', property_type='house',
+            description='Water damage', estimated_loss=loss,
+        )
+        for i in range(documents):
+            ClaimDocument.objects.create(claim=claim, file=f'user_{self.user.id}/claims/{claim.id}/photo{i}.jpg')
+        return claim
+
+    def test_claims_are_scored_with_one_query_per_step(self):
+        claims = [self.create_claim(documents=i) for i in range(3)]
+        with self.assertNumQueries(2):
+            predictions = score_claims([claim.id for claim in claims])
+        self.assertEqual(predictions[claims[0].id], (Decimal('0.50'), Decimal('800.00')))
+        claims[2].refresh_from_db()
+        self.assertEqual(claims[2].predicted_approval, Decimal('0.88'))
+        self.assertEqual(claims[2].predicted_limit, Decimal('800.00'))
+
+    def test_predictions_fit_the_claim_columns(self):
+        claim = self.create_claim(loss='99999999.00')
+        model = get_model()
+        rows = [{'disaster_type': 'hail', 'estimated_loss': 10 ** 12, 'document_count': 50}]
+        self.assertEqual(model.predict(rows), [(Decimal('1.00'), Decimal('99999999.99'))])
+        self.assertEqual(model.vectorize(rows)[0, 0], -1)
+        score_claims([claim.id])
+
+    def test_claims_are_left_unscored_without_a_model(self):
+        claim = self.create_claim()
+        with override_settings(CLAIM_MODEL_PATH=str(Path(self.model_dir) / 'missing.pkl')):
+            reset_model()
+            self.assertEqual(score_claims([claim.id]), {})
+        claim.refresh_from_db()
+        self.assertIsNone(claim.predicted_approval)
+
+    def test_rescoring_streams_chunks_and_resumes_by_model_version(self):
+        claims = [self.create_claim(documents=1) for _ in range(5)]
+        Claim.objects.filter(pk=claims[0].pk).update(status='settled')
+        # Already scored by this version before an interruption
+        Claim.objects.filter(pk=claims[1].pk).update(prediction_model_version='test-1', predicted_limit='1.00')
+
+        out = io.StringIO()
+        call_command('rescore_claims', chunk_size=2, stdout=out)
+        self.assertIn('Scored 3 claims with model test-1', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        scored = dict(Claim.objects.values_list('pk', 'predicted_limit'))
+        self.assertIsNone(scored[claims[0].pk])
+        self.assertEqual(scored[claims[1].pk], Decimal('1.00'))
+        self.assertEqual(scored[claims[4].pk], Decimal('800.00'))
+
+        out = io.StringIO()
+        call_command('rescore_claims', chunk_size=2, workers=2, all=True, force=True, stdout=out)
+        self.assertIn('Scored 5 claims', out.getvalue())
+        self.assertEqual(Claim.objects.filter(predicted_limit=Decimal('800.00'), prediction_model_version='test-1').count(), 5)
+
+    def test_micro_batcher_groups_concurrent_submissions(self):
+        calls = []
+        def handler(items):
+            calls.append(len(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(handler, max_batch_size=8, max_wait=0.05)
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            futures = list(pool.map(batcher.submit, range(20)))
+        self.assertEqual([future.result(timeout=5) for future in futures], [i * 2 for i in range(20)])
+        self.assertEqual(sum(calls), 20)
+        self.assertLess(len(calls), 20)
+        self.assertLessEqual(max(calls), 8)
+
+    def test_scoring_benchmark_fails_on_regression(self):
+        baseline_path = Path(self.model_dir) / 'baseline.json'
+        out = io.StringIO()
+        # The micro-batcher scores on its own connection, which cannot see the test transaction
+        options = {'claims': 20, 'single': 5, 'chunk_size': 5, 'scenarios': 'single,bulk', 'stdout': out}
+        call_command('benchmark_scoring', save_baseline=str(baseline_path), **options)
+        self.assertIn('bulk: ', out.getvalue())
+        self.assertEqual(Claim.objects.count(), 0)
+
+        baseline = json.loads(baseline_path.read_text())
+        self.assertEqual(baseline['claims'], 20)
+        self.assertEqual(set(baseline['scenarios']['single']), {'throughput', 'p50_ms', 'p95_ms', 'p99_ms'})
+        baseline['scenarios']['bulk']['throughput'] *= 1000
+        baseline_path.write_text(json.dumps(baseline))
+        with self.assertRaisesMessage(CommandError, 'bulk throughput'):
+            call_command('benchmark_scoring', baseline=str(baseline_path), **options)
+
+    @skipUnless(importlib.util.find_spec('pandas') and importlib.util.find_spec('xgboost'), "pandas and xgboost not installed")
+    def test_trained_bundle_is_served_and_encoding_is_cached(self):
+        rng = np.random.default_rng(0)
+        csv_path = Path(self.model_dir) / 'claims.csv'
+        with open(csv_path, 'w') as f:
+            f.write(','.join(FEATURES + ['approved', 'payout']) + '\n')
+            for i in range(600):
+                loss = float(rng.uniform(1000, 100000))
+                approved = int(loss < 50000)
+                f.write(f"{['flood', 'wildfire'][i % 2]},house,CA,{loss:.2f},100,{i % 4},3,2,{approved},{loss * 0.8 * approved:.2f}\n")
+        output = Path(self.model_dir) / 'trained.pkl'
+
+        out = io.StringIO()
+        options = {'output': str(output), 'chunk_size': 128, 'max_rounds': 30, 'early_stopping': 5, 'stdout': out}
+        call_command('train_claim_model', str(csv_path), model_version='trained-1', **options)
+        self.assertIn('Encoded 600 rows', out.getvalue())
+        call_command('train_claim_model', str(csv_path), model_version='trained-2', **options)
+        self.assertIn('Using encoded features cached', out.getvalue())
+
+        with override_settings(CLAIM_MODEL_PATH=str(output)):
+            reset_model()
+            model = get_model()
+            self.assertEqual(model.version, 'trained-2')
+            (low_approval, _), (high_approval, _) = model.predict([
+                {'disaster_type': 'flood', 'property_type': 'house', 'state': 'CA', 'estimated_loss': loss,
+                 'description_length': 100, 'document_count': 1, 'state_declarations': 3, 'state_severity': 2}
+                for loss in (90000, 10000)
+            ])
+        self.assertLess(low_approval, high_approval)
+
+
+class ClaimFeatureStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='featured', password='secret-pass')
+        self.profile = UserProfile.objects.create(
+            user=self.user, street_address='1 Main St', city='Los Angeles', state='CA', postal_code='90001'
+        )
+
+    def declare(self, fema_id, state='CA', number=4900, declaration_type='DR'):
+        upsert_disaster_updates([{
+            'id': fema_id, 'disasterNumber': number, 'state': state, 'declarationTitle': 'WILDFIRES',
+            'designatedArea': 'Napa (County)', 'incidentType': 'Fire', 'declarationType': declaration_type,
+            'declarationDate': format_fema_datetime(timezone.now() - timedelta(days=1)),
+            'lastRefresh': format_fema_datetime(timezone.now()),
+        }])
+
+    def refresh(self):
+        with patch('claimIT_backend.utils.fema_scheduler.sync_states'):
+            refresh_states(force=True)
+
+    def stored(self, claim):
+        return ClaimFeatures.objects.filter(claim=claim, schema_version=FEATURE_SCHEMA_VERSION).values(*FEATURES).get()
+
+    def test_features_are_stored_on_claim_and_document_writes(self):
+        self.declare('ca-1', declaration_type='FM')
+        claim = Claim.objects.create(
+            user=self.user, disaster_type='wildfire', property_type='house',
+            description='Burnt roof', estimated_loss='25000.00',
+        )
+        self.assertEqual(self.stored(claim), {
+            'disaster_type': 'wildfire', 'property_type': 'house', 'state': 'CA', 'estimated_loss': 25000.0,
+            'description_length': 10, 'document_count': 0, 'state_declarations': 1, 'state_severity': 2,
+        })
+        document = ClaimDocument.objects.create(claim=claim, file=f'user_{self.user.id}/claims/{claim.id}/roof.jpg')
+        ClaimDocument.objects.create(claim=claim, file=f'user_{self.user.id}/claims/{claim.id}/attic.jpg')
+        document.delete()
+        self.assertEqual(self.stored(claim)['document_count'], 1)
+
+        claim.estimated_loss = '30000.00'
+        claim.save()
+        self.assertEqual(self.stored(claim)['estimated_loss'], 30000.0)
+        claim.status = 'under_review'
+        with self.assertNumQueries(1):
+            claim.save(update_fields=['status'])
+
+    def test_document_writes_rescore_the_claim(self):
+        claim = Claim.objects.create(
+            user=self.user, disaster_type='wildfire', property_type='house',
+            description='Burnt roof', estimated_loss='25000.00',
+        )
+        with patch('claimIT_backend.signals.schedule_scoring') as schedule:
+            document = ClaimDocument.objects.create(claim=claim, file=f'user_{self.user.id}/claims/{claim.id}/roof.jpg')
+            ClaimDocument.objects.create(claim=claim, file=f'user_{self.user.id}/claims/{claim.id}/attic.jpg')
+            document.delete()
+            self.assertEqual(schedule.call_args_list, [call([claim.pk])] * 3)
+
+            schedule.reset_mock()
+            claim.delete()
+            schedule.assert_not_called()
+
+    def test_fema_refreshes_and_moves_refresh_stored_features(self):
+        claim = Claim.objects.create(
+            user=self.user, disaster_type='wildfire', property_type='house',
+            description='Burnt roof', estimated_loss='25000.00',
+        )
+        self.assertEqual(self.stored(claim)['state_declarations'], 0)
+        self.declare('ca-1')
+        self.declare('ca-2', number=4901, declaration_type='FM')
+        self.declare('tx-1', state='TX', number=4800)
+        self.assertEqual(self.stored(claim)['state_declarations'], 0)
+        self.refresh()
+        self.assertEqual(self.stored(claim)['state_declarations'], 2)
+        self.assertEqual(self.stored(claim)['state_severity'], 3)
+
+        self.profile.state = 'TX'
+        self.profile.save()
+        self.assertEqual(self.stored(claim)['state'], 'TX')
+        self.assertEqual(self.stored(claim)['state_declarations'], 1)
+
+    def test_scheduled_refresh_ages_out_old_declarations(self):
+        claim = Claim.objects.create(
+            user=self.user, disaster_type='wildfire', property_type='house',
+            description='Burnt roof', estimated_loss='25000.00',
+        )
+        self.declare('ca-1')
+        self.refresh()
+        self.assertEqual(self.stored(claim)['state_declarations'], 1)
+
+        later = timezone.now() + timedelta(days=400)
+        with patch('claimIT_backend.utils.fema_scheduler.sync_states') as sync, \
+                patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(refresh_states(), ['CA'])
+        sync.assert_called_once_with(['CA'])
+        self.assertEqual(self.stored(claim)['state_declarations'], 0)
+        self.assertEqual(self.stored(claim)['state_severity'], 0)
+
+    def test_rows_of_other_schema_versions_are_rebuilt_on_read(self):
+        claim = Claim.objects.create(
+            user=self.user, disaster_type='flood', property_type='house',
+            description='Water damage', estimated_loss='1000.00',
+        )
+        ClaimFeatures.objects.filter(claim=claim).update(schema_version=FEATURE_SCHEMA_VERSION + 1, document_count=9)
+        [row] = claim_feature_rows([claim.pk])
+        self.assertEqual(row['claim_id'], claim.pk)
+        self.assertEqual(row['document_count'], 0)
+        self.assertEqual(ClaimFeatures.objects.filter(claim=claim).count(), 2)
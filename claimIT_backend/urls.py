@@ -7,22 +7,29 @@ from .views import (
     UserProfileViewSet,
     DisasterUpdateViewSet,
     ClaimViewSet,
+    DocumentUploadViewSet,
+    MediaView,
+    notification_stream,
     NotificationViewSet,
+    NotificationJobViewSet,
     CustomTokenObtainPairView
 )
 from rest_framework_simplejwt.views import TokenRefreshView
-from django.conf import settings
-from django.conf.urls.static import static
 
 # Create a router for our viewsets
 router = DefaultRouter()
 router.register(r'user-profiles', UserProfileViewSet, basename='user-profiles')
 router.register(r'claims', ClaimViewSet)
 router.register(r'disaster-updates', DisasterUpdateViewSet)
+router.register(r'document-uploads', DocumentUploadViewSet, basename='document-uploads')
 router.register(r'notifications', NotificationViewSet, basename='notifications')
+router.register(r'notification-jobs', NotificationJobViewSet, basename='notification-jobs')
 
 # Define the URL patterns
 urlpatterns = [
+    # Server-sent notification events; listed before the router so 'stream' is not taken for an id
+    path('notifications/stream/', notification_stream, name='notification-stream'),
+
     # API endpoints
     path('', include(router.urls)),
     
@@ -31,4 +38,7 @@ urlpatterns = [
     path('auth/login/', CustomTokenObtainPairView.as_view(), name='login'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/logout/', LogoutView.as_view({'post': 'create'}), name='logout'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+
+    # Uploaded files, served after an ownership check
+    path('media/<path:name>', MediaView.as_view(), name='media'),
+]
\ No newline at end of file
@@ -0,0 +1,37 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """
+    Return the process-wide pool that runs background tasks.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix='claimit-background'
+            )
+    return _executor
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        print(f"Error in background task {func.__name__}: {e}")
+    finally:
+        close_old_connections()
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Run `func(*args, **kwargs)` on the background pool once the current
+    transaction commits, so the task sees the rows the request wrote and the
+    response does not wait for it.
+    """
+    transaction.on_commit(lambda: get_executor().submit(_run, func, args, kwargs))
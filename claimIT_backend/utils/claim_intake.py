@@ -0,0 +1,77 @@
+import os
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from ..ml.features import materialize_claim_features
+from ..ml.scoring import schedule_scoring
+from ..models import Claim, ClaimDocument
+from .claim_stats import claim_stats_cache_key
+from .background import run_in_background
+from .identifiers import allocate_claim_identifiers
+from .previews import generate_document_previews
+
+
+class PartialIntakeError(Exception):
+    """
+    Raised when a batch fails after earlier batches were committed.
+    `created` holds the committed claims and `failed` the index range of the claims that were not created.
+    """
+    def __init__(self, created, failed):
+        super().__init__(f"Claims {failed.start} to {failed.stop - 1} were not created.")
+        self.created = created
+        self.failed = failed
+
+
+def create_claims(user, items, batch_size=None):
+    """
+    Create claims and their documents for `user` from validated ClaimSerializer data.
+
+    Each batch reserves its claim and policy numbers up front, inserts its claims
+    with one bulk INSERT and their documents with another, and commits atomically.
+    Returns the created claims. If a batch fails after earlier ones committed,
+    raises PartialIntakeError with the committed claims, so callers can report them.
+    """
+    batch_size = batch_size or settings.CLAIM_BULK_BATCH_SIZE
+    created = []
+    try:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            try:
+                with transaction.atomic():
+                    claims = create_batch(user, batch)
+            except Exception as e:
+                if not created:
+                    raise
+                print(f"Error creating claims {start} to {start + len(batch) - 1}: {e}")
+                raise PartialIntakeError(created, range(start, len(items))) from e
+            created.extend(claims)
+    finally:
+        # bulk_create does not send post_save, so drop the owner's cached stats here
+        cache.delete(claim_stats_cache_key(user.id))
+    return created
+
+def create_batch(user, batch):
+    identifiers = allocate_claim_identifiers(len(batch))
+    claims = []
+    document_files = []
+    for data, (claim_number, policy_number) in zip(batch, identifiers):
+        data = dict(data)
+        document_files.append(data.pop('documents', []))
+        claims.append(Claim(
+            user=user,
+            claim_number=claim_number,
+            insurance_policy_number=policy_number,
+            **data
+        ))
+    Claim.objects.bulk_create(claims)
+    documents = ClaimDocument.objects.bulk_create([
+        ClaimDocument(claim=claim, file=f, filename=os.path.basename(f.name))
+        for claim, files in zip(claims, document_files)
+        for f in files
+    ])
+    # bulk_create does not send post_save, so store the features and schedule the thumbnails and scores here
+    materialize_claim_features(Claim.objects.filter(pk__in=[claim.pk for claim in claims]))
+    for document in documents:
+        run_in_background(generate_document_previews, document.pk)
+    schedule_scoring(claim.pk for claim in claims)
+    return claims
@@ -0,0 +1,52 @@
+from decimal import Decimal
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from ..models import Claim
+
+
+def claim_stats_cache_key(user_id):
+    return f"claim_stats:{user_id}"
+
+def compute_claim_stats(claims):
+    """
+    Aggregate claims by status, disaster type, property type and month.
+
+    The database groups by all four columns in a single query and the much
+    smaller grouped rows are rolled up here.
+    """
+    rows = (
+        claims.order_by()
+        .annotate(month=TruncMonth('created_at'))
+        .values('status', 'disaster_type', 'property_type', 'month')
+        .annotate(count=Count('id'), loss=Sum('estimated_loss'))
+    )
+    total_claims = 0
+    total_loss = Decimal('0.00')
+    by_status = {key: 0 for key, _ in Claim.STATUS_CHOICES}
+    by_disaster_type = {key: 0 for key, _ in Claim.DISASTER_CHOICES}
+    by_property_type = {key: 0 for key, _ in Claim.PROPERTY_TYPE_CHOICES}
+    monthly = {}
+    for row in rows:
+        loss = row['loss'] or Decimal('0.00')
+        total_claims += row['count']
+        total_loss += loss
+        by_status[row['status']] = by_status.get(row['status'], 0) + row['count']
+        by_disaster_type[row['disaster_type']] = by_disaster_type.get(row['disaster_type'], 0) + row['count']
+        by_property_type[row['property_type']] = by_property_type.get(row['property_type'], 0) + row['count']
+        month = row['month'].strftime('%Y-%m')
+        count, month_loss = monthly.get(month, (0, Decimal('0.00')))
+        monthly[month] = (count + row['count'], month_loss + loss)
+
+    average_loss = (total_loss / total_claims).quantize(Decimal('0.01')) if total_claims else Decimal('0.00')
+    return {
+        'total_claims': total_claims,
+        'total_estimated_loss': str(total_loss.quantize(Decimal('0.01'))),
+        'average_estimated_loss': str(average_loss),
+        'by_status': by_status,
+        'by_disaster_type': by_disaster_type,
+        'by_property_type': by_property_type,
+        'monthly': [
+            {'month': month, 'count': count, 'estimated_loss': str(loss.quantize(Decimal('0.01')))}
+            for month, (count, loss) in sorted(monthly.items())
+        ],
+    }
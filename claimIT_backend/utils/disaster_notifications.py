@@ -0,0 +1,85 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+from ..models import DisasterUpdate, Notification, UserProfile
+from .notification_counts import recount_unread
+from .notification_jobs import publish_new_notifications
+
+# One row per user in the declaration's state who has not heard of the disaster yet.
+# The profile state is the only location we match on; county or ZIP matching would
+# extend the join condition on `d`.
+INSERT_NOTIFICATIONS_SQL = """
+    INSERT INTO {notification} (user_id, title, message, type, read, created_at, disaster_update_id)
+    SELECT p.user_id,
+           %s || d.state,
+           d.declaration_display || ': ' || d.title || ' (' || d.location || %s,
+           CASE WHEN d.severity = 3 THEN 'warning' ELSE 'info' END,
+           %s, %s, d.id
+    FROM {profile} p
+    JOIN {user} u ON u.id = p.user_id
+    JOIN {disaster} d ON d.state = p.state
+    WHERE u.is_active AND d.id IN ({placeholders})
+      AND NOT EXISTS (
+          SELECT 1 FROM {notification} n
+          JOIN {disaster} nd ON nd.id = n.disaster_update_id
+          WHERE n.user_id = p.user_id AND nd.disaster_number = d.disaster_number
+      )
+    ON CONFLICT DO NOTHING
+"""
+
+def notify_new_declarations(fema_ids):
+    """
+    Notify every user living in the state of a newly inserted declaration.
+
+    FEMA sends one record per designated area, so each disaster is announced
+    once per state, from one of its records. Notifications are inserted by a
+    single INSERT ... SELECT joining profiles to declarations, so the cost does
+    not grow with a loop over users. Declarations older than
+    DISASTER_NOTIFICATION_MAX_AGE days, such as those of a first sync, are
+    stored without notifying anyone. Returns the number of notifications created.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.DISASTER_NOTIFICATION_MAX_AGE)
+    announced = list(
+        DisasterUpdate.objects.filter(
+            fema_id__in=fema_ids, disaster_number__isnull=False, declaration_date__gte=cutoff
+        ).exclude(state='').values('disaster_number', 'state').annotate(first=Min('id')).values_list('first', flat=True)
+    )
+    if not announced:
+        return 0
+
+    sql = INSERT_NOTIFICATIONS_SQL.format(
+        notification=connection.ops.quote_name(Notification._meta.db_table),
+        profile=connection.ops.quote_name(UserProfile._meta.db_table),
+        user=connection.ops.quote_name(User._meta.db_table),
+        disaster=connection.ops.quote_name(DisasterUpdate._meta.db_table),
+        placeholders=', '.join(['%s'] * len(announced)),
+    )
+    params = [
+        'New disaster declaration in ',
+        '). If your property was damaged, you can file a claim.',
+        False, timezone.now(), *announced,
+    ]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            created = cursor.rowcount
+        notified = Notification.objects.filter(disaster_update_id__in=announced)
+        if created:
+            recount_unread(notified.values('user_id'))
+    if created:
+        print(f"Notified {created} users of {len(announced)} new disaster declarations")
+        publish_notifications(notified)
+    return created
+
+def publish_notifications(notifications):
+    batch = []
+    for notification in notifications.iterator(chunk_size=settings.NOTIFICATION_JOB_BATCH_SIZE):
+        batch.append(notification)
+        if len(batch) == settings.NOTIFICATION_JOB_BATCH_SIZE:
+            publish_new_notifications(batch)
+            batch = []
+    if batch:
+        publish_new_notifications(batch)
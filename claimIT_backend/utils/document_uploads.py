@@ -0,0 +1,159 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from ..models import ClaimDocument, DocumentUpload, StoredBlob
+from ..storage import document_storage
+
+READ_CHUNK_SIZE = 64 * 1024
+PART_NAME = re.compile(r'^(\d+)\.part$')
+
+
+class UploadError(Exception):
+    """
+    Raised when an uploaded part or a committed file fails a check.
+    """
+
+
+def staging_dir(upload):
+    return os.path.join(settings.CLAIM_UPLOAD_TEMP_DIR, str(upload.id))
+
+def part_path(upload, index):
+    return os.path.join(staging_dir(upload), f'{index}.part')
+
+def received_parts(upload):
+    """
+    Return the sorted indexes of the parts already stored for `upload`.
+    Stored parts are the source of truth, so concurrent part uploads never race on a counter.
+    """
+    try:
+        names = os.listdir(staging_dir(upload))
+    except FileNotFoundError:
+        return []
+    return sorted(int(match.group(1)) for match in map(PART_NAME.match, names) if match)
+
+def write_part(upload, index, stream, expected_sha256=None, content_length=None):
+    """
+    Stream part `index` of `upload` from a file-like `stream` to disk.
+
+    The body is read in small chunks, so a part never sits in memory as a
+    whole. Reading stops as soon as the part grows past its expected length,
+    and the SHA-256 is checked before the part replaces any earlier copy.
+    Returns the hex digest of the part.
+    """
+    if not 0 <= index < upload.part_count:
+        raise UploadError(f"Part must be between 0 and {upload.part_count - 1}.")
+    expected_length = upload.part_length(index)
+    if content_length is not None and content_length != expected_length:
+        raise UploadError(f"Part {index} must be {expected_length} bytes, got {content_length}.")
+
+    directory = staging_dir(upload)
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    received = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(min(READ_CHUNK_SIZE, expected_length + 1 - received))
+                if not chunk:
+                    break
+                received += len(chunk)
+                if received > expected_length:
+                    raise UploadError(f"Part {index} is larger than {expected_length} bytes.")
+                digest.update(chunk)
+                out.write(chunk)
+        if received != expected_length:
+            raise UploadError(f"Part {index} must be {expected_length} bytes, got {received}.")
+        if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+            raise UploadError(f"Part {index} does not match its SHA-256.")
+        # Replace atomically, so a retried part never leaves a half-written file behind
+        os.replace(tmp_path, part_path(upload, index))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest.hexdigest()
+
+def commit_upload(upload):
+    """
+    Join the parts of `upload` into a ClaimDocument and remove the upload.
+
+    Parts are copied into one staged file while the whole-file SHA-256 is
+    computed, then handed to storage as a file on disk, so the document is
+    never loaded into memory. The upload row stays locked until the document
+    is saved, so concurrent commits of one upload create a single document.
+    """
+    with transaction.atomic():
+        if not DocumentUpload.objects.select_for_update().filter(pk=upload.pk).exists():
+            raise UploadError("Upload was already committed.")
+        missing = sorted(set(range(upload.part_count)) - set(received_parts(upload)))
+        if missing:
+            raise UploadError(f"Missing parts: {', '.join(map(str, missing))}.")
+
+        digest = hashlib.sha256()
+        with tempfile.TemporaryFile(dir=staging_dir(upload)) as joined:
+            for index in range(upload.part_count):
+                with open(part_path(upload, index), 'rb') as part:
+                    while chunk := part.read(READ_CHUNK_SIZE):
+                        digest.update(chunk)
+                        joined.write(chunk)
+            if upload.sha256 and digest.hexdigest() != upload.sha256.lower():
+                raise UploadError("File does not match its SHA-256.")
+
+            joined.seek(0)
+            document = ClaimDocument(
+                claim=upload.claim, file=File(joined, name=upload.filename), filename=upload.filename
+            )
+            try:
+                document.full_clean(exclude=['claim'])
+            except ValidationError as exc:
+                raise UploadError(' '.join(exc.messages))
+            document.save()
+
+        upload.delete()
+        # Parts are only removed once the document is committed
+        directory = staging_dir(upload)
+        transaction.on_commit(lambda: shutil.rmtree(directory, ignore_errors=True))
+    return document
+
+def attach_known_file(claim, filename, sha256):
+    """
+    Attach a file the claim's owner has uploaded before, identified by its SHA-256,
+    without transferring it again. Returns the new ClaimDocument, or None if the
+    owner has no document with that content.
+    """
+    # Only files the user already holds are reused, so a hash alone never grants access to a file
+    name = document_storage.blob_name(sha256.lower(), filename)
+    if not ClaimDocument.objects.filter(claim__user_id=claim.user_id, file=name).exists():
+        return None
+    with transaction.atomic():
+        referenced = StoredBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') + 1)
+        if not referenced:
+            return None
+        return ClaimDocument.objects.create(claim=claim, file=name, filename=filename)
+
+def discard_upload(upload):
+    shutil.rmtree(staging_dir(upload), ignore_errors=True)
+    upload.delete()
+
+def clean_expired_uploads(max_age=None):
+    """
+    Remove uploads that were started more than `max_age` seconds ago and never committed.
+    Returns the number of uploads removed.
+    """
+    max_age = settings.CLAIM_UPLOAD_EXPIRY if max_age is None else max_age
+    expired = DocumentUpload.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=max_age))
+    count = 0
+    for upload in expired.iterator():
+        discard_upload(upload)
+        count += 1
+    return count
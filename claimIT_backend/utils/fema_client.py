@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import OrderedDict
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .json_stream import iter_json_array
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Most ETag / Last-Modified pairs a client keeps, least recently used dropped first
+MAX_VALIDATORS = 256
+
+
+class FemaClientMetrics:
+    """
+    Thread-safe counters describing the traffic a FemaClient sent to FEMA.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.not_modified = 0
+            self.bytes_received = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+
+    def record(self, latency, nbytes=0, not_modified=False, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.not_modified += int(not_modified)
+            self.bytes_received += nbytes
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def add_bytes(self, nbytes):
+        with self._lock:
+            self.bytes_received += nbytes
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'cache_hits': self.not_modified,
+                'bytes_received': self.bytes_received,
+                'avg_latency_ms': round(1000 * self.total_latency / self.requests, 1) if self.requests else 0.0,
+                'max_latency_ms': round(1000 * self.max_latency, 1),
+            }
+
+
+class FemaClient:
+    """
+    HTTP client for the OpenFEMA API.
+
+    Keeps one pooled requests.Session so connections are reused across calls,
+    retries transient failures with jittered exponential backoff, and sends
+    If-None-Match / If-Modified-Since so an unchanged response costs a 304.
+
+    Validators are kept per `cache_key`, which defaults to the URL. Requests
+    whose URL changes every time but whose answer is comparable, such as a
+    sync from a moving watermark, should share a key.
+    """
+    def __init__(self, timeout=30, max_retries=3, backoff_factor=0.5, backoff_jitter=0.5, pool_maxsize=10):
+        self.timeout = timeout
+        self.metrics = FemaClientMetrics()
+        self._validators = OrderedDict()
+        self._validators_lock = threading.Lock()
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=['GET'],
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update({'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'})
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _conditional_headers(self, key):
+        with self._validators_lock:
+            etag, last_modified = self._validators.get(key, (None, None))
+            if key in self._validators:
+                self._validators.move_to_end(key)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def _remember_validators(self, key, resp):
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        if etag or last_modified:
+            with self._validators_lock:
+                self._validators[key] = (etag, last_modified)
+                self._validators.move_to_end(key)
+                while len(self._validators) > MAX_VALIDATORS:
+                    self._validators.popitem(last=False)
+
+    def forget_validators(self, key):
+        """
+        Drop the validators kept under `key`, so its next request is answered in full.
+        """
+        with self._validators_lock:
+            self._validators.pop(key, None)
+
+    def _get(self, url, stream=False, conditional=True, cache_key=None):
+        cache_key = cache_key or url
+        headers = self._conditional_headers(cache_key) if conditional else {}
+        start = time.perf_counter()
+        try:
+            resp = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+        except requests.RequestException:
+            self.metrics.record(time.perf_counter() - start, error=True)
+            raise
+        latency = time.perf_counter() - start
+        if resp.status_code == 304:
+            self.metrics.record(latency, not_modified=True)
+            resp.close()
+            return None
+        if not resp.ok:
+            self.metrics.record(latency, error=True)
+            resp.close()
+            resp.raise_for_status()
+        if stream:
+            self.metrics.record(latency)
+        else:
+            self.metrics.record(latency, nbytes=len(resp.content))
+        if conditional:
+            self._remember_validators(cache_key, resp)
+        return resp
+
+    def get_json(self, url, conditional=True, cache_key=None):
+        """
+        GET a JSON document. Returns None if the server answered 304 Not Modified.
+        """
+        resp = self._get(url, conditional=conditional, cache_key=cache_key)
+        return None if resp is None else resp.json()
+
+    def iter_records(self, url, key, chunk_size=64 * 1024):
+        """
+        Stream the items of the `key` array of a JSON response one at a time.
+        Pages are always fetched in full, so no conditional headers are sent.
+        """
+        resp = self._get(url, stream=True, conditional=False)
+        with resp:
+            yield from iter_json_array(self._count_bytes(resp.iter_content(chunk_size=chunk_size)), key)
+
+    def _count_bytes(self, chunks):
+        for chunk in chunks:
+            self.metrics.add_bytes(len(chunk))
+            yield chunk
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Return the process-wide FemaClient so every caller shares its connection pool.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Leave room in the pool for every concurrent fetch
+            _client = FemaClient(pool_maxsize=max(10, settings.FEMA_FETCH_CONCURRENCY))
+    return _client
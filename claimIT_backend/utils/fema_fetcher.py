@@ -0,0 +1,80 @@
+import asyncio
+import urllib.parse
+from django.conf import settings
+from .fema_client import get_client
+from .fema_scraper import RECORDS_KEY, sync_cache_key, sync_position, sync_query_url
+
+
+class HostRateLimiter:
+    """
+    Spaces out request starts so a host sees at most `rate` requests per second.
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def fetch_states(states, position_by_state=None, concurrency=None, rate_per_host=None, client=None):
+    """
+    Fetch every page of the sync query of every state concurrently, each from
+    its (lastRefresh, id) position in `position_by_state`.
+
+    At most `concurrency` requests are in flight and each host gets at most
+    `rate_per_host` requests per second. The blocking requests run on worker
+    threads and share the client's connection pool.
+    Returns a dict of state -> list of records, or the exception the fetch raised.
+    """
+    position_by_state = position_by_state or {}
+    concurrency = concurrency or settings.FEMA_FETCH_CONCURRENCY
+    rate_per_host = settings.FEMA_RATE_LIMIT if rate_per_host is None else rate_per_host
+    client = client or get_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    limiters = {}
+
+    async def get_page(url, conditional, cache_key):
+        host = urllib.parse.urlsplit(url).netloc
+        limiter = limiters.setdefault(host, HostRateLimiter(rate_per_host))
+        async with semaphore:
+            await limiter.wait()
+            return await asyncio.to_thread(client.get_json, url, conditional, cache_key)
+
+    async def fetch(state):
+        # Page until a short page; only the first page is conditional
+        since, after_id = position_by_state.get(state) or (None, None)
+        cache_key = sync_cache_key([state])
+        records = []
+        try:
+            while True:
+                url = sync_query_url([state], since=since, after_id=after_id)
+                data = await get_page(url, not records, cache_key)
+                if data is None:
+                    # 304 Not Modified: nothing new for the state
+                    break
+                page = data.get(RECORDS_KEY, [])
+                records.extend(page)
+                if len(page) < settings.FEMA_SYNC_PAGE_SIZE:
+                    break
+                since, after_id = sync_position(page[-1])
+        except Exception:
+            client.forget_validators(cache_key)
+            raise
+        return records
+
+    results = await asyncio.gather(*(fetch(state) for state in states), return_exceptions=True)
+    return dict(zip(states, results))
+
+def fetch_states_concurrently(states, position_by_state=None, **kwargs):
+    """
+    Synchronous entry point for fetch_states, for use from threads and commands.
+    """
+    return asyncio.run(fetch_states(list(states), position_by_state, **kwargs))
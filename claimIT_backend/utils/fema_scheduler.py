@@ -0,0 +1,141 @@
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from ..ml.features import refresh_declaration_features
+from ..models import DisasterSyncState, UserProfile
+from .fema_client import get_client
+from .fema_fetcher import fetch_states_concurrently
+from .fema_scraper import delete_legacy_updates, sync_cache_key, sync_positions_by_state, upsert_disaster_updates
+
+
+def tracked_states():
+    """
+    Return the state codes we keep disaster updates for, i.e. every state a user lives in.
+    """
+    states = UserProfile.objects.exclude(state='').values_list('state', flat=True).distinct()
+    return sorted({s.upper() for s in states})
+
+def claim_refresh(state, interval=None):
+    """
+    Mark a state as refreshed now if its data is older than `interval` seconds.
+
+    The check and the update happen in a single UPDATE statement, so when several
+    workers run the scheduler only one of them fetches a given state per interval.
+    Returns True if the caller should go ahead and fetch the state.
+    """
+    interval = settings.FEMA_REFRESH_INTERVAL if interval is None else interval
+    now = timezone.now()
+    DisasterSyncState.objects.get_or_create(state=state)
+    stale = Q(last_synced_at__isnull=True) | Q(last_synced_at__lte=now - timedelta(seconds=interval))
+    return DisasterSyncState.objects.filter(stale, state=state).update(last_synced_at=now) == 1
+
+def refresh_states(states=None, interval=None, force=False):
+    """
+    Refresh disaster updates from FEMA for every state that is due, and the
+    declaration features of the state's claims, which change as declarations
+    age out of the feature window. Returns the list of states that were fetched.
+    """
+    states = tracked_states() if states is None else [s.upper() for s in states]
+    due = []
+    for state in states:
+        if force:
+            DisasterSyncState.objects.update_or_create(state=state, defaults={'last_synced_at': timezone.now()})
+        elif not claim_refresh(state, interval):
+            continue
+        due.append(state)
+    if due:
+        sync_states(due)
+        refresh_declaration_features(due)
+    return due
+
+def sync_states(states):
+    """
+    Fetch every page of FEMA records refreshed since the last sync of each
+    state, write them in one bulk upsert and advance each state's watermark to
+    the (lastRefresh, id) position of the last record fetched.
+
+    States are fetched concurrently, so a nationwide refresh takes about as long
+    as the slowest single state. Returns the DisasterUpdate objects written.
+    """
+    DisasterSyncState.objects.bulk_create(
+        [DisasterSyncState(state=state) for state in states], ignore_conflicts=True
+    )
+    position_by_state = {
+        state: (last_refresh, last_refresh_id)
+        for state, last_refresh, last_refresh_id in DisasterSyncState.objects.filter(state__in=states)
+        .values_list('state', 'last_refresh', 'last_refresh_id')
+    }
+    results = fetch_states_concurrently(states, position_by_state)
+
+    records = []
+    fetched = []
+    for state, result in results.items():
+        if isinstance(result, Exception):
+            print(f"Error fetching FEMA data for {state}: {result}")
+            continue
+        records.extend(result)
+        fetched.append(state)
+    print(f"Fetched {len(records)} DisasterDeclarationsSummaries records for {len(fetched)} states")
+
+    try:
+        changed = upsert_disaster_updates(records, notify=True)
+    except Exception:
+        # Fetch the same records again next time rather than take a 304 for them
+        client = get_client()
+        for state in fetched:
+            client.forget_validators(sync_cache_key([state]))
+        raise
+    delete_legacy_updates(fetched)
+
+    # Every page was fetched, so the watermark can move past all of them,
+    # including records we already had
+    for state, (last_refresh, last_refresh_id) in sync_positions_by_state(records).items():
+        DisasterSyncState.objects.filter(state=state).filter(
+            Q(last_refresh__isnull=True) | Q(last_refresh__lte=last_refresh)
+        ).update(last_refresh=last_refresh, last_refresh_id=last_refresh_id)
+    return changed
+
+class FemaRefreshScheduler(threading.Thread):
+    """
+    Daemon thread that keeps DisasterUpdate fresh on a fixed interval.
+    """
+    def __init__(self, interval=None):
+        super().__init__(name='fema-refresh', daemon=True)
+        self.interval = settings.FEMA_REFRESH_INTERVAL if interval is None else interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            close_old_connections()
+            try:
+                refreshed = refresh_states(interval=self.interval)
+                if refreshed:
+                    print(f"Refreshed FEMA disaster updates for {', '.join(refreshed)}")
+            except Exception as e:
+                print(f"Error refreshing FEMA disaster updates: {e}")
+            finally:
+                close_old_connections()
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def start_scheduler():
+    """
+    Start the in-process refresh scheduler once per process, if enabled in settings.
+    """
+    global _scheduler
+    if not settings.FEMA_SCHEDULER_ENABLED:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = FemaRefreshScheduler()
+            _scheduler.start()
+    return _scheduler
@@ -1,7 +1,47 @@
-import requests
 import urllib.parse
-from datetime import datetime
-from ..models import DisasterUpdate
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from ..ml.features import refresh_declaration_features
+from ..models import DisasterUpdate, DisasterBackfill, DisasterSyncState
+from .disaster_notifications import notify_new_declarations
+from .fema_client import get_client
+
+RECORDS_KEY = 'DisasterDeclarationsSummaries'
+
+# Only the FEMA fields build_disaster_update reads, to keep responses small
+SELECT_FIELDS = [
+    'id',
+    'disasterNumber',
+    'declarationTitle',
+    'designatedArea',
+    'state',
+    'incidentType',
+    'declarationType',
+    'ihProgramDeclared',
+    'iaProgramDeclared',
+    'paProgramDeclared',
+    'hmProgramDeclared',
+    'lastRefresh',
+    'declarationDate',
+]
+
+# Columns rewritten when a FEMA record we already have is refreshed
+UPSERT_FIELDS = [
+    'disaster_number',
+    'title',
+    'location',
+    'state',
+    'disaster_type',
+    'severity',
+    'declaration_type',
+    'declaration_display',
+    'assistance_available',
+    'source',
+    'url',
+    'updated_at',
+    'declaration_date',
+]
 
 # Map FEMA disaster types to our internal types
 DISASTER_MAP = {
@@ -39,19 +79,128 @@ INCIDENT_TYPE_CODES = {
     'winter storm': 51091,
 }
 
-def scrape_fema_disasters(user_state=None, postal_code=None):
+def parse_fema_datetime(value):
+    """
+    Parse a FEMA timestamp such as '2025-05-01T12:00:00.000Z' into an aware datetime.
+    """
+    if not value:
+        return None
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ'):
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+def format_fema_datetime(value):
+    """
+    Format an aware datetime the way FEMA expects it in OData filters.
+    """
+    return value.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+def build_disaster_update(rec):
+    """
+    Map a FEMA DisasterDeclarationsSummaries record to an unsaved DisasterUpdate.
+    """
+    declaration_type = rec.get('declarationType', '')
+
+    # Check if any assistance programs are declared
+    assistance_available = any([
+        rec.get('ihProgramDeclared') == 1,
+        rec.get('iaProgramDeclared') == 1,
+        rec.get('paProgramDeclared') == 1,
+        rec.get('hmProgramDeclared') == 1
+    ])
+
+    # Construct URL for more information
+    disaster_number = rec.get('disasterNumber') or None
+    url_link = f"https://www.fema.gov/disaster/{disaster_number}" if disaster_number else ''
+
+    return DisasterUpdate(
+        fema_id=rec.get('id') or None,
+        disaster_number=disaster_number,
+        title=rec.get('declarationTitle', ''),
+        location=rec.get('designatedArea', ''),
+        state=rec.get('state', ''),
+        disaster_type=DISASTER_MAP.get(rec.get('incidentType'), 'other'),
+        severity=DECLARATION_SEVERITY.get(declaration_type, 4),
+        declaration_type=declaration_type,
+        declaration_display=DECLARATION_DISPLAY.get(declaration_type, 'Unknown'),
+        assistance_available=assistance_available,
+        source='FEMA',
+        url=url_link,
+        updated_at=parse_fema_datetime(rec.get('lastRefresh')) or timezone.now(),
+        declaration_date=parse_fema_datetime(rec.get('declarationDate')),
+    )
+
+def upsert_disaster_updates(records, notify=False):
+    """
+    Insert new FEMA records and update changed ones, keyed on FEMA's record id.
+
+    Records whose lastRefresh matches what we already stored are skipped, so the
+    cost is one SELECT plus one INSERT ... ON CONFLICT for the changed rows.
+    Callers refresh the declaration features of the states once they are done.
+    With `notify`, users in the area of newly inserted declarations are notified.
+    Returns the list of DisasterUpdate objects that were written.
+    """
+    updates = {}
+    for rec in records:
+        update = build_disaster_update(rec)
+        if update.fema_id:
+            updates[update.fema_id] = update
+    if not updates:
+        return []
+
+    stored = dict(
+        DisasterUpdate.objects.filter(fema_id__in=list(updates)).values_list('fema_id', 'updated_at')
+    )
+    changed = [u for fema_id, u in updates.items() if stored.get(fema_id) != u.updated_at]
+    if changed:
+        DisasterUpdate.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['fema_id'],
+            update_fields=UPSERT_FIELDS,
+        )
+        mark_states_changed({u.state for u in changed})
+        inserted = [u.fema_id for u in changed if u.fema_id not in stored]
+        if notify and inserted:
+            notify_new_declarations(inserted)
+    return changed
+
+def mark_states_changed(states):
+    """
+    Bump the dataset version of states whose disaster updates were written, which
+    invalidates cached disaster update lists for those states.
     """
-    Fetch disaster declarations from FEMA Open API and upsert to DisasterUpdate.
+    states = [s for s in states if s]
+    if not states:
+        return
+    DisasterSyncState.objects.bulk_create(
+        [DisasterSyncState(state=state) for state in states], ignore_conflicts=True
+    )
+    DisasterSyncState.objects.filter(state__in=states).update(changed_at=timezone.now())
+
+def build_query_url(states=None, since=None, after_id=None, top=10, skip=None, order_by='declarationDate desc'):
+    """
+    Build a DisasterDeclarationsSummaries query URL.
+    `since` restricts the query to records FEMA refreshed at or after that datetime;
+    with `after_id`, records refreshed exactly at `since` must also have a larger id.
     """
-    api_url = 'https://www.fema.gov/api/open/v2/DisasterDeclarationsSummaries'
     filters = []
-    order_by='declarationDate desc'
-    if user_state or postal_code:
-        sts = user_state if isinstance(user_state, list) else [user_state]
-        sf = " or ".join([f"state eq '{s}'" for s in sts])
+    if states:
+        sf = " or ".join([f"state eq '{s}'" for s in states])
         filters.append(f"({sf})")
+    if since:
+        refreshed = format_fema_datetime(since)
+        if after_id:
+            filters.append(f"(lastRefresh gt '{refreshed}' or (lastRefresh eq '{refreshed}' and id gt '{after_id}'))")
+        else:
+            filters.append(f"lastRefresh ge '{refreshed}'")
     # build OData query manually to preserve `$` in parameter names
-    query = [f'$top={10}']  # Limit to 10 most recent records
+    query = [f'$top={top}', f"$select={','.join(SELECT_FIELDS)}"]
+    if skip:
+        query.append(f'$skip={skip}')
     if filters:
         filter_str = ' and '.join(filters)
         filter_enc = urllib.parse.quote_plus(filter_str)
@@ -59,60 +208,113 @@ def scrape_fema_disasters(user_state=None, postal_code=None):
     if order_by:
         order_enc = urllib.parse.quote_plus(order_by)
         query.append(f'$orderby={order_enc}')
-    url = f"{api_url}?{'&'.join(query)}"
-    try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        records = resp.json().get('DisasterDeclarationsSummaries', [])
-        print(f"Fetched {len(records)} DisasterDeclarationsSummaries records")
-        
-        DisasterUpdate.objects.all().delete()
-        
-        # Process and save new disaster updates
-        for rec in records:
-            # Extract and map the fields from FEMA data
-            title = rec.get('declarationTitle', '')
-            location = rec.get('designatedArea', '')
-            d_type = DISASTER_MAP.get(rec.get('incidentType'), 'other')
-            declaration_type = rec.get('declarationType', '')
-            severity = DECLARATION_SEVERITY.get(declaration_type, 4)
-            declaration_display_name = DECLARATION_DISPLAY.get(declaration_type, 'Unknown')
-            
-            # Check if any assistance programs are declared
-            assistance_available = any([
-                rec.get('ihProgramDeclared') == 1,
-                rec.get('iaProgramDeclared') == 1,
-                rec.get('paProgramDeclared') == 1,
-                rec.get('hmProgramDeclared') == 1
-            ])
-            
-            # Get the last refresh date
-            last_refresh = rec.get('lastRefresh')
-            if last_refresh:
-                try:
-                    updated_at = datetime.strptime(last_refresh, '%Y-%m-%dT%H:%M:%S.%fZ')
-                except ValueError:
-                    updated_at = datetime.now()
-            else:
-                updated_at = datetime.now()
-                
-            # Construct URL for more information
-            disaster_number = rec.get('disasterNumber', '')
-            url_link = f"https://www.fema.gov/disaster/{disaster_number}" if disaster_number else ''
-            
-            DisasterUpdate.objects.update_or_create(
-                title=title,
-                location=location,
-                defaults={
-                    'disaster_type': d_type,
-                    'severity': severity,
-                    'declaration_type': declaration_type,
-                    'declaration_display': declaration_display_name,
-                    'assistance_available': assistance_available,
-                    'source': 'FEMA',
-                    'url': url_link,
-                    'updated_at': updated_at
-                }
-            )
-    except Exception as e:
-        print(f"Error fetching FEMA data: {e}")
\ No newline at end of file
+    return f"{settings.FEMA_API_URL}?{'&'.join(query)}"
+
+def sync_query_url(states=None, since=None, after_id=None):
+    """
+    Build the URL of one page of a state sync: every record after the
+    (`since`, `after_id`) position in (lastRefresh, id) order, oldest refresh first
+    (every record on the first sync). Page through it by passing the
+    sync_position() of each page's last record, until a page holds fewer than
+    FEMA_SYNC_PAGE_SIZE records.
+    """
+    # Keyset pages, unlike $skip, do not shift when FEMA refreshes a record we have paged past
+    return build_query_url(
+        states, since=since, after_id=after_id, top=settings.FEMA_SYNC_PAGE_SIZE, order_by='lastRefresh asc, id asc'
+    )
+
+def sync_cache_key(states=None):
+    """
+    Key the validators of a state sync's first page are kept under. It leaves
+    out the watermark, which changes with every sync that finds records.
+    """
+    return sync_query_url(states)
+
+def sync_position(rec):
+    """
+    Return the (lastRefresh, id) position of a FEMA record in a state sync.
+    """
+    refreshed = parse_fema_datetime(rec.get('lastRefresh'))
+    if refreshed is None or not rec.get('id'):
+        raise ValueError(f"FEMA record {rec.get('id')!r} has no lastRefresh or id to page from")
+    return refreshed, rec['id']
+
+def sync_positions_by_state(records):
+    """
+    Return {state: (lastRefresh, id)} of the last of each state's FEMA records,
+    in the order they were fetched: the position to sync each state from next.
+    """
+    positions = {}
+    for rec in records:
+        if rec.get('state') and rec.get('id') and parse_fema_datetime(rec.get('lastRefresh')):
+            positions[rec['state']] = sync_position(rec)
+    return positions
+
+def delete_legacy_updates(states=None):
+    """
+    Drop rows stored before records were keyed on FEMA's id. They can never be
+    matched again, so they are removed for the states being refreshed, whose
+    dataset version is bumped.
+    """
+    legacy = DisasterUpdate.objects.filter(fema_id__isnull=True)
+    if states:
+        legacy = legacy.filter(state__in=states)
+    deleted_states = set(legacy.values_list('state', flat=True).distinct())
+    if deleted_states:
+        legacy.delete()
+        # Cached lists of the states still hold the deleted rows
+        mark_states_changed(deleted_states)
+
+def iter_fema_records(url):
+    """
+    Stream the records of one FEMA page without loading the whole response.
+    """
+    return get_client().iter_records(url, RECORDS_KEY)
+
+def backfill_fema_disasters(page_size=1000, batch_size=500, max_pages=None, restart=False, name='default'):
+    """
+    Page through the full DisasterDeclarationsSummaries history into DisasterUpdate.
+
+    Pages are parsed as a stream and written in batches of `batch_size`, so memory
+    stays flat however long the history is. The offset of the next page is saved
+    after every page, and a later call resumes from it until the dataset is done.
+    The declaration features of claims in the states written are refreshed once, at the end.
+    Returns the DisasterBackfill checkpoint.
+    """
+    checkpoint, _ = DisasterBackfill.objects.get_or_create(name=name)
+    if restart:
+        checkpoint.next_skip = 0
+        checkpoint.records_synced = 0
+        checkpoint.completed_at = None
+        checkpoint.save()
+    elif checkpoint.completed_at:
+        return checkpoint
+
+    pages = 0
+    states = set()
+    while max_pages is None or pages < max_pages:
+        # Order by record id so pages stay stable while we walk through them
+        url = build_query_url(top=page_size, skip=checkpoint.next_skip, order_by='id')
+        fetched = 0
+        batch = []
+        for rec in iter_fema_records(url):
+            batch.append(rec)
+            fetched += 1
+            if len(batch) >= batch_size:
+                states.update(u.state for u in upsert_disaster_updates(batch))
+                batch = []
+        if batch:
+            states.update(u.state for u in upsert_disaster_updates(batch))
+        pages += 1
+
+        checkpoint.next_skip += fetched
+        checkpoint.records_synced += fetched
+        if fetched < page_size:
+            checkpoint.completed_at = timezone.now()
+        checkpoint.save()
+        print(f"Backfilled {checkpoint.records_synced} DisasterDeclarationsSummaries records")
+        if checkpoint.completed_at:
+            break
+    # Once for the whole run rather than per batch
+    refresh_declaration_features(states)
+    return checkpoint
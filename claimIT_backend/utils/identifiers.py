@@ -0,0 +1,162 @@
+import threading
+from datetime import date
+from django.conf import settings
+from django.db import IntegrityError, ProgrammingError, connection, transaction
+from django.db.models import F
+from ..models import ClaimNumberSequence
+
+
+def format_claim_number(year, number):
+    return f"CLM-{year}-{number:06d}"
+
+def format_policy_number(year, number):
+    return f"POL-{year}-{number:06d}"
+
+def allocate_sequence_range(count, year):
+    """
+    Reserve `count` consecutive sequence numbers for `year` and return them as a range.
+
+    The counter row is incremented with a single UPDATE, which locks it until
+    the surrounding transaction ends, so concurrent callers never get the same
+    numbers.
+    """
+    with transaction.atomic():
+        ClaimNumberSequence.objects.get_or_create(year=year)
+        ClaimNumberSequence.objects.filter(year=year).update(last_value=F('last_value') + count)
+        last_value = ClaimNumberSequence.objects.values_list('last_value', flat=True).get(year=year)
+    return range(last_value - count + 1, last_value + 1)
+
+
+class SequenceAllocator:
+    """
+    Hands out numbers from one Postgres sequence per year.
+
+    nextval() never blocks and is not rolled back, so concurrent workers do not
+    queue on a counter row for the length of their transactions. Numbers of a
+    rolled back transaction are skipped, which leaves gaps but no duplicates.
+    """
+    def __init__(self):
+        self._created = set()
+        self._lock = threading.Lock()
+
+    def sequence_name(self, year):
+        return f"claimit_claim_number_{year}_seq"
+
+    def ensure_sequence(self, cursor, year):
+        with self._lock:
+            if year in self._created:
+                return
+        # Continue from the counter table so numbers issued before the switch are not reused
+        start = ClaimNumberSequence.objects.filter(year=year).values_list('last_value', flat=True).first() or 0
+        try:
+            with transaction.atomic():
+                cursor.execute(
+                    f"CREATE SEQUENCE IF NOT EXISTS {self.sequence_name(year)} START WITH {start + 1}"
+                )
+        except (IntegrityError, ProgrammingError):
+            # Another worker created it between the existence check and the insert
+            pass
+        # The CREATE is part of the caller's transaction, so a rollback drops the sequence again
+        transaction.on_commit(lambda: self.remember(year))
+
+    def remember(self, year):
+        with self._lock:
+            self._created.add(year)
+
+    def forget(self, year):
+        with self._lock:
+            self._created.discard(year)
+
+    def next_values(self, cursor, count, year):
+        cursor.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            [self.sequence_name(year), count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def allocate(self, count, year):
+        with connection.cursor() as cursor:
+            self.ensure_sequence(cursor, year)
+            try:
+                with transaction.atomic():
+                    return self.next_values(cursor, count, year)
+            except ProgrammingError:
+                # The sequence is gone although it was created, e.g. dropped by hand: create it again
+                self.forget(year)
+                self.ensure_sequence(cursor, year)
+                return self.next_values(cursor, count, year)
+
+
+class BlockAllocator:
+    """
+    Hands out numbers from blocks reserved in the ClaimNumberSequence table.
+
+    Each process reserves `block_size` numbers at a time and serves later
+    requests from memory, so most allocations cost no query at all. Blocks of
+    different processes never overlap. A block only becomes shared once the
+    transaction that reserved it commits; if it rolls back, the reservation
+    and the rest of the block are dropped together.
+    """
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def take(self, count, year):
+        numbers = []
+        with self._lock:
+            blocks = self._blocks.get(year, [])
+            while blocks and len(numbers) < count:
+                block = blocks.pop()
+                needed = count - len(numbers)
+                numbers.extend(block[:needed])
+                if len(block) > needed:
+                    blocks.append(block[needed:])
+        return numbers
+
+    def release(self, block, year):
+        if block:
+            with self._lock:
+                self._blocks.setdefault(year, []).append(block)
+
+    def allocate(self, count, year):
+        numbers = self.take(count, year)
+        needed = count - len(numbers)
+        if needed:
+            block = allocate_sequence_range(max(needed, self.block_size), year)
+            numbers.extend(block[:needed])
+            rest = block[needed:]
+            transaction.on_commit(lambda: self.release(rest, year))
+        return numbers
+
+    def reset(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+def get_allocator():
+    """
+    Return the process-wide allocator: sequences on Postgres, blocks elsewhere.
+    """
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            if connection.vendor == 'postgresql':
+                _allocator = SequenceAllocator()
+            else:
+                _allocator = BlockAllocator(settings.CLAIM_NUMBER_BLOCK_SIZE)
+    return _allocator
+
+def allocate_claim_identifiers(count, year=None):
+    """
+    Return `count` (claim_number, insurance_policy_number) pairs, so claims can
+    be inserted with their identifiers instead of updated after the insert.
+    """
+    year = year or date.today().year
+    return [
+        (format_claim_number(year, number), format_policy_number(year, number))
+        for number in get_allocator().allocate(count, year)
+    ]
@@ -0,0 +1,100 @@
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+_decoder = json.JSONDecoder()
+
+
+class _ChunkReader:
+    """
+    Text buffer over an iterable of byte chunks that only keeps unparsed text in memory.
+    """
+    def __init__(self, chunks, encoding='utf-8'):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self):
+        """Read the next chunk; return False once the input is exhausted."""
+        if self.exhausted:
+            return False
+        # Drop what has already been parsed so the buffer stays bounded
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.text += self._decoder.decode(chunk)
+                return True
+        self.text += self._decoder.decode(b'', final=True)
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it, or '' at the end."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at position {self.pos} of JSON stream")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more chunks as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.text) and not self.exhausted and not isinstance(value, (dict, list, str)):
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks, key):
+    """
+    Yield the items of the array stored under `key` in a top-level JSON object.
+
+    `chunks` is an iterable of bytes, e.g. ``response.iter_content()``. Items are
+    decoded one at a time, so memory use depends on the size of one item rather
+    than the size of the whole document.
+    """
+    reader = _ChunkReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name != key:
+            reader.value()
+        else:
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.peek() == ',':
+                        reader.pos += 1
+                        continue
+                    reader.expect(']')
+                    break
+        if reader.peek() == ',':
+            reader.pos += 1
+            continue
+        reader.expect('}')
+        return
@@ -0,0 +1,167 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
+from ..models import Claim, ClaimDocument, UserProfile
+
+MEDIA_SIGNING_SALT = 'claimIT_backend.media'
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def signed_media_url(name, user_id, request=None):
+    """
+    Return a URL for the media file `name` that lets `user_id` fetch it
+    without an Authorization header, e.g. from an <img> tag, until it expires.
+    """
+    token = signing.dumps({'n': name, 'u': user_id}, salt=MEDIA_SIGNING_SALT, compress=True)
+    url = f"{reverse('media', kwargs={'name': name})}?token={token}"
+    return request.build_absolute_uri(url) if request else url
+
+def media_token_user(token, name):
+    """
+    Return the user id a media URL token was issued to, or None if the token
+    is invalid, expired or was issued for another file.
+    """
+    try:
+        data = signing.loads(token, salt=MEDIA_SIGNING_SALT, max_age=settings.MEDIA_URL_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return data.get('u') if data.get('n') == name else None
+
+def media_download_name(name, user_id):
+    """
+    Return the name to offer a download of media file `name` as, or None if
+    the file is not one of `user_id`'s claim documents, previews or profile picture.
+    """
+    documents = ClaimDocument.objects.filter(claim__user_id=user_id)
+    document = documents.filter(file=name).values_list('filename', flat=True).first()
+    if document is not None:
+        return document or os.path.basename(name)
+
+    # Previews are named <original without extension>_<size label>.jpg
+    for label in settings.DOCUMENT_PREVIEW_SIZES:
+        suffix = f'_{label}.jpg'
+        if name.endswith(suffix) and documents.filter(file__startswith=name[:-len(suffix)] + '.').exists():
+            return os.path.basename(name)
+
+    if UserProfile.objects.filter(user_id=user_id, profile_picture=name).exists():
+        return os.path.basename(name)
+    if Claim.objects.filter(user_id=user_id, documents=name).exists():
+        return os.path.basename(name)
+    return None
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header into (start, end) byte offsets, inclusive.
+
+    Returns None to serve the whole file, which RFC 9110 allows for ranges it
+    does not support, and raises ValueError if the range cannot be satisfied.
+    """
+    match = RANGE_HEADER.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class RangeFile:
+    """
+    File wrapper that reads `length` bytes starting at `start`.
+
+    It keeps fileno(), so a WSGI server with sendfile support (gunicorn's
+    wsgi.file_wrapper) sends the range straight from the page cache, using
+    the file position and the Content-Length header.
+    """
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def serve_media(request, storage, name, download_name):
+    """
+    Respond with the media file `name`.
+
+    With MEDIA_SERVE_BACKEND set to 'nginx' or 'sendfile', only headers are
+    returned and the front server sends the file, via X-Accel-Redirect or
+    X-Sendfile. Otherwise Django serves it with conditional GET and single
+    range support.
+    """
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    backend = settings.MEDIA_SERVE_BACKEND
+    if backend in ('nginx', 'sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(name)
+        else:
+            response['X-Sendfile'] = storage.path(name)
+        response['Content-Disposition'] = content_disposition_header(False, download_name)
+        return finish_media_response(response)
+
+    path = storage.path(name)
+    stat = os.stat(path)
+    etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:
+        return finish_media_response(response)
+
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and request.META.get('HTTP_IF_RANGE', etag) == etag:
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return finish_media_response(response)
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type, filename=download_name)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(file, start, end - start + 1), status=206,
+            content_type=content_type, filename=download_name,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return finish_media_response(response)
+
+def finish_media_response(response):
+    response['Accept-Ranges'] = 'bytes'
+    # Files are per user, and uploads must never be sniffed into HTML
+    response['Cache-Control'] = f'private, max-age={settings.MEDIA_URL_MAX_AGE}'
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
@@ -0,0 +1,43 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from ..models import Notification, UserProfile
+
+
+def get_unread_count(user_id):
+    """
+    Return the number of unread notifications of `user_id`.
+
+    Reads the counter kept on the user's profile, so the badge costs one
+    primary key lookup however many notifications the user has. Users without
+    a profile, such as admins created from the shell, are counted through the
+    partial index on unread notifications instead.
+    """
+    count = UserProfile.objects.filter(user_id=user_id).values_list('unread_notifications', flat=True).first()
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, read=False).count()
+    return count
+
+def add_unread_count(user_id, delta):
+    """
+    Change the unread counter of `user_id` by `delta` in a single UPDATE, so
+    concurrent changes never overwrite each other.
+    """
+    if delta:
+        UserProfile.objects.filter(user_id=user_id).update(
+            unread_notifications=Greatest(F('unread_notifications') + delta, Value(0))
+        )
+
+def recount_unread(user_ids=None):
+    """
+    Set the unread counters of `user_ids` (ids or a values queryset), or of every
+    user, from their notifications. Used after changes made with bulk queries,
+    which send no signals.
+    """
+    unread = (
+        Notification.objects.filter(user_id=OuterRef('user_id'), read=False)
+        .order_by().values('user_id').annotate(count=Count('pk')).values('count')
+    )
+    profiles = UserProfile.objects.all()
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+    return profiles.update(unread_notifications=Coalesce(Subquery(unread), Value(0)))
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from .notification_counts import get_unread_count
+
+REDIS_CHANNEL = 'claimit:notification-events'
+STREAM_SIGNING_SALT = 'claimIT_backend.notification-stream'
+
+
+class NotificationBroker:
+    """
+    Fans notification events out to the event streams open in this process.
+
+    Each stream gets a bounded asyncio queue on its own event loop, and events
+    can be dispatched from any thread. A stream that stops reading loses events
+    instead of growing without bound; it catches up on its next connection.
+    """
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        if settings.REDIS_URL:
+            self._ensure_listener()
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def dispatch(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    @staticmethod
+    def _put(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    def _ensure_listener(self):
+        # One Redis subscription per process, relaying events published by every worker
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._listener is None or self._listener.done() or self._listener.get_loop() is not loop:
+                self._listener = loop.create_task(self._listen_redis())
+
+    async def _listen_redis(self):
+        import redis.asyncio as redis
+
+        while True:
+            try:
+                client = redis.from_url(settings.REDIS_URL)
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(REDIS_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            data = json.loads(message['data'])
+                            self.dispatch(data['user'], data['event'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error listening for notification events: {e}")
+                await asyncio.sleep(5)
+
+
+broker = NotificationBroker()
+_redis = None
+
+def publish_event(user_id, event_type, data):
+    """
+    Send an event to every open stream of `user_id`, in all server processes
+    when Redis is configured and in this process otherwise.
+    """
+    publish_events([(user_id, event_type, data)])
+
+def publish_events(events):
+    """
+    Send many (user_id, event_type, data) events at once, in one Redis round trip.
+    """
+    global _redis
+    if not settings.REDIS_URL:
+        for user_id, event_type, data in events:
+            broker.dispatch(user_id, {'type': event_type, 'data': data})
+        return
+    try:
+        if _redis is None:
+            import redis
+            _redis = redis.Redis.from_url(settings.REDIS_URL)
+        pipeline = _redis.pipeline(transaction=False)
+        for user_id, event_type, data in events:
+            message = {'user': user_id, 'event': {'type': event_type, 'data': data}}
+            pipeline.publish(REDIS_CHANNEL, json.dumps(message, default=str))
+        pipeline.execute()
+    except Exception as e:
+        print(f"Error publishing notification events: {e}")
+
+def publish_unread_count(user_id):
+    publish_event(user_id, 'unread_count', {'count': get_unread_count(user_id)})
+
+def stream_token(user_id):
+    """
+    Return a short-lived token that opens the notification stream of `user_id`.
+    EventSource can only authenticate through the URL, where an access token would end up in logs.
+    """
+    return signing.dumps({'u': user_id}, salt=STREAM_SIGNING_SALT)
+
+def stream_token_user(token):
+    """
+    Return the user id a stream token was issued to, or None if it is invalid or expired.
+    """
+    try:
+        data = signing.loads(token, salt=STREAM_SIGNING_SALT, max_age=settings.NOTIFICATION_STREAM_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return data.get('u')
+
+def format_event(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def notification_event_stream(user_id, heartbeat=None):
+    """
+    Yield server-sent events for `user_id`: the unread count on connect, then
+    every new notification and unread count change as it happens. A comment
+    line is sent when idle so proxies keep the connection open.
+    """
+    heartbeat = settings.NOTIFICATION_STREAM_HEARTBEAT if heartbeat is None else heartbeat
+    # Subscribe before reading the count, so no change in between is missed
+    subscriber = broker.subscribe(user_id)
+    _, queue = subscriber
+    try:
+        yield f"retry: {settings.NOTIFICATION_STREAM_RETRY}\n"
+        yield format_event('unread_count', {'count': await sync_to_async(get_unread_count)(user_id)})
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event['type'], event['data'])
+    finally:
+        broker.unsubscribe(user_id, subscriber)
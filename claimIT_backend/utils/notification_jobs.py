@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from ..models import Claim, Notification, NotificationJob, UserProfile
+from ..serializers import NotificationSerializer
+from .notification_events import publish_events
+
+
+def job_recipients(filters):
+    """
+    Return the active users matching a notification job's `filters`.
+    """
+    users = User.objects.filter(is_active=True)
+    if filters.get('state'):
+        users = users.filter(userprofile__state=filters['state'])
+    if filters.get('postal_code_prefix'):
+        users = users.filter(userprofile__postal_code__startswith=filters['postal_code_prefix'])
+    if filters.get('has_open_claims'):
+        users = users.filter(Exists(Claim.objects.filter(user=OuterRef('pk'), status__in=Claim.OPEN_STATUSES)))
+    return users
+
+def publish_new_notifications(notifications):
+    """
+    Push notifications inserted with bulk queries, which send no signals,
+    along with their users' new unread counts.
+    """
+    user_ids = {notification.user_id for notification in notifications}
+    counts = dict(
+        UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'unread_notifications')
+    )
+    events = [
+        (notification.user_id, 'notification', NotificationSerializer(notification).data)
+        for notification in notifications
+    ]
+    events += [(user_id, 'unread_count', {'count': counts[user_id]}) for user_id in user_ids if user_id in counts]
+    publish_events(events)
+
+def send_batch(job, user_ids):
+    """
+    Create the job's notification for `user_ids`, the next recipients in id order.
+
+    The job row is advanced in the same transaction, and only if no other
+    runner has advanced it first, so a batch is never sent twice. Returns
+    False if another runner owns the job.
+    """
+    with transaction.atomic():
+        advanced = NotificationJob.objects.filter(pk=job.pk, last_user_id=job.last_user_id).update(
+            last_user_id=user_ids[-1], sent=F('sent') + len(user_ids)
+        )
+        if not advanced:
+            return False
+        notifications = Notification.objects.bulk_create([
+            Notification(user_id=user_id, title=job.title, message=job.message, type=job.type)
+            for user_id in user_ids
+        ])
+        UserProfile.objects.filter(user_id__in=user_ids).update(unread_notifications=F('unread_notifications') + 1)
+        transaction.on_commit(lambda: publish_new_notifications(notifications))
+    job.last_user_id = user_ids[-1]
+    job.sent += len(user_ids)
+    return True
+
+def run_notification_job(job_id, batch_size=None):
+    """
+    Send a notification job to all of its recipients, resuming after the last
+    user it reached if it was interrupted. Returns the job.
+
+    Recipient ids are streamed from a server-side cursor, and notifications are
+    inserted `batch_size` at a time, so the whole audience is never held in memory.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_JOB_BATCH_SIZE
+    job = NotificationJob.objects.get(pk=job_id)
+    if job.status == 'completed':
+        return job
+
+    recipients = job_recipients(job.filters)
+    NotificationJob.objects.filter(pk=job.pk).update(
+        status='running', error='', started_at=Coalesce(F('started_at'), Value(timezone.now())),
+        total=Coalesce(F('total'), Value(recipients.count())),
+    )
+    job.refresh_from_db()
+    try:
+        batch = []
+        user_ids = recipients.filter(pk__gt=job.last_user_id).order_by('pk').values_list('pk', flat=True)
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            batch.append(user_id)
+            if len(batch) == batch_size:
+                if not send_batch(job, batch):
+                    return job
+                batch = []
+        if batch and not send_batch(job, batch):
+            return job
+        NotificationJob.objects.filter(pk=job.pk).update(status='completed', completed_at=timezone.now())
+    except Exception as e:
+        print(f"Error sending notification job {job.pk}: {e}")
+        NotificationJob.objects.filter(pk=job.pk).update(status='failed', error=str(e))
+    job.refresh_from_db()
+    return job
@@ -0,0 +1,114 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from ..models import ClaimDocument
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif'}
+PDF_EXTENSIONS = {'.pdf'}
+
+
+def render_pdf_page(path, size):
+    """
+    Render the first page of the PDF at `path` so its longer side is `size` pixels.
+
+    Uses PyMuPDF if it is installed, otherwise pdftoppm from poppler-utils.
+    Returns None if neither is available.
+    """
+    try:
+        import pymupdf
+    except ImportError:
+        pymupdf = None
+
+    if pymupdf is not None:
+        with pymupdf.open(path) as pdf:
+            page = pdf[0]
+            zoom = size / max(page.rect.width, page.rect.height)
+            pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = os.path.join(tmp, 'page')
+        subprocess.run(
+            [pdftoppm, '-f', '1', '-l', '1', '-singlefile', '-png', '-scale-to', str(size), path, prefix],
+            check=True, timeout=30, capture_output=True,
+        )
+        with Image.open(f'{prefix}.png') as image:
+            image.load()
+            return image
+
+def open_preview_source(document, size):
+    """
+    Return the image to make previews of `document` from, at least `size`
+    pixels on its longer side where possible, or None for files without a preview.
+    """
+    extension = os.path.splitext(document.file.name)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        with document.file.open('rb') as f, Image.open(f) as image:
+            # Let JPEG decode at a reduced scale instead of full resolution
+            image.draft('RGB', (size, size))
+            image = ImageOps.exif_transpose(image)
+            image.load()
+            return image
+    if extension in PDF_EXTENSIONS:
+        return render_pdf_page(document.file.path, size)
+    return None
+
+def flatten(image):
+    """
+    Convert to RGB for JPEG, painting transparent areas white.
+    """
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+def generate_previews(document):
+    """
+    Create the preview images of `document` that do not exist yet, one per
+    DOCUMENT_PREVIEW_SIZES entry, and save their names on the document.
+
+    Previews are stored next to the original, so documents sharing a file
+    share its previews too. Returns the saved mapping of size label to name.
+    """
+    storage = document.file.storage
+    sizes = sorted(settings.DOCUMENT_PREVIEW_SIZES.items(), key=lambda item: item[1], reverse=True)
+    names = {label: storage.derivative_name(document.file.name, label) for label, _ in sizes}
+    missing = [(label, size) for label, size in sizes if not storage.exists(names[label])]
+
+    if missing:
+        try:
+            image = open_preview_source(document, missing[0][1])
+        except (OSError, ValueError, Image.DecompressionBombError, subprocess.SubprocessError) as e:
+            print(f"Error opening document {document.pk} for previews: {e}")
+            image = None
+        if image is None:
+            return {}
+        image = flatten(image)
+        # Largest first, so each smaller size is scaled down from the previous one
+        for label, size in missing:
+            image.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=80, optimize=True, progressive=True)
+            storage.save_derivative(names[label], ContentFile(buffer.getvalue()))
+
+    ClaimDocument.objects.filter(pk=document.pk).update(previews=names)
+    document.previews = names
+    return names
+
+def generate_document_previews(document_id):
+    """
+    Background task wrapper for generate_previews.
+    """
+    document = ClaimDocument.objects.filter(pk=document_id).first()
+    if document is not None and document.file:
+        generate_previews(document)
@@ -1,20 +1,66 @@
+import hashlib
+import io
+import json
+from datetime import datetime, time
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.generics import RetrieveUpdateDestroyAPIView
-from .models import Claim, UserProfile, DisasterUpdate, ClaimDocument, Notification
-from .serializers import UserSerializer, UserProfileSerializer, DisasterUpdateSerializer, ClaimSerializer, ClaimDocumentSerializer, NotificationSerializer
+from .pagination import KeysetPagination
+from .utils.background import run_in_background
+from .utils.claim_intake import PartialIntakeError
+from .utils.claim_stats import claim_stats_cache_key, compute_claim_stats
+from .utils.document_uploads import UploadError, attach_known_file, commit_upload, discard_upload, write_part
+from .utils.media import media_download_name, media_token_user, serve_media
+from .utils.notification_counts import add_unread_count, get_unread_count, recount_unread
+from .utils.notification_events import notification_event_stream, publish_unread_count, stream_token, stream_token_user
+from .utils.notification_jobs import run_notification_job
+from .storage import document_storage
+from .models import Claim, UserProfile, DisasterUpdate, DisasterSyncState, ClaimDocument, DocumentUpload, Notification, NotificationJob
+from .serializers import UserSerializer, UserProfileSerializer, DisasterUpdateSerializer, ClaimSerializer, ClaimBulkSerializer, ClaimDocumentSerializer, DocumentUploadSerializer, NotificationSerializer, NotificationJobSerializer
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated
-from rest_framework import viewsets, permissions, status
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework.authentication import SessionAuthentication
 from django.contrib.auth.models import User
-from .utils.fema_scraper import scrape_fema_disasters
-from drf_yasg.utils import swagger_auto_schema
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Upper
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
+from drf_yasg.utils import no_body, swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.decorators import action
-from rest_framework.exceptions import NotAuthenticated, PermissionDenied, NotFound, APIException, ValidationError
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, PermissionDenied, NotFound, APIException, ValidationError
+
+def parse_filter_datetime(value):
+    """
+    Parse an ISO 8601 date or datetime query parameter into an aware datetime.
+    Returns None if the value is not a valid date.
+    """
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
 
 class RegisterView(viewsets.ViewSet):
     """
@@ -152,9 +198,9 @@ class UserProfileViewSet(viewsets.ModelViewSet):
             try:
                 # If admin user, allow access to all profiles
                 if self.request.user.is_staff or self.request.user.is_superuser:
-                    return UserProfile.objects.all()
+                    return UserProfile.objects.select_related('user')
                 # Regular users can only see their own profile
-                return UserProfile.objects.filter(user=self.request.user)
+                return UserProfile.objects.filter(user=self.request.user).select_related('user')
             except Exception as e:
                 # Log the error for debugging
                 print(f"Error in get_queryset: {str(e)}")
@@ -218,18 +264,50 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data)
     
+def filter_claims(queryset, params):
+    """
+    Apply the `status`, `disaster_type` and `property_type` list filters.
+    Each is backed by a (user, field, created_at) index on Claim.
+    """
+    for field in ('status', 'disaster_type', 'property_type'):
+        if params.get(field):
+            queryset = queryset.filter(**{field: params[field]})
+    return queryset
+
+def bulk_created_data(claims):
+    return {
+        'created': len(claims),
+        'claims': [
+            {
+                'id': claim.id,
+                'claim_number': claim.claim_number,
+                'insurance_policy_number': claim.insurance_policy_number,
+            }
+            for claim in claims
+        ],
+    }
+
 class ClaimViewSet(viewsets.ModelViewSet):
     """
     API endpoints for managing insurance claims.
+
+    Lists are cursor paginated, newest first, and can be filtered by
+    `status`, `disaster_type` and `property_type`.
     """
     queryset = Claim.objects.all()
     serializer_class = ClaimSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         # Check if user is authenticated before filtering
         if self.request.user.is_authenticated:
-            return Claim.objects.filter(user=self.request.user)
+            # Load every claim's documents in one query instead of one per claim
+            queryset = Claim.objects.filter(user=self.request.user).prefetch_related('claim_documents')
+            if self.action == 'list':
+                queryset = filter_claims(queryset, self.request.query_params)
+            return queryset
         # Return empty queryset for anonymous users (for Swagger)
         return Claim.objects.none()
 
@@ -244,14 +322,103 @@ class ClaimViewSet(viewsets.ModelViewSet):
     )
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Create many claims in one request. Send JSON {\"claims\": [...]}, or multipart "
+            "with a JSON 'claims' field and each claim's files under 'documents.<index>'."
+        ),
+        request_body=ClaimBulkSerializer,
+        responses={
+            201: openapi.Response(
+                description="Claims created",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'created': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'claims': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    }
+                )
+            ),
+            207: "Claims up to failed.start were created; claims from failed.start to failed.end (exclusive) were not",
+            400: "Bad Request",
+            401: "Unauthorized"
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create many claims, committed in batches"""
+        data = request.data
+        if isinstance(data, list):
+            data = {'claims': data}
+        claims = data.get('claims')
+        if isinstance(claims, str):
+            # Multipart requests carry the claims as a JSON string
+            try:
+                claims = json.loads(claims)
+            except ValueError:
+                raise ValidationError({"claims": "Must be a JSON list of claims"})
+            if not isinstance(claims, list):
+                raise ValidationError({"claims": "Must be a JSON list of claims"})
+            for index, claim in enumerate(claims):
+                files = request.FILES.getlist(f'documents.{index}')
+                if files and isinstance(claim, dict):
+                    claim['documents'] = files
+        serializer = ClaimBulkSerializer(data={'claims': claims}, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        try:
+            created = serializer.save()
+        except PartialIntakeError as exc:
+            # Earlier batches are committed: report them, so the client only retries the rest
+            return Response({
+                **bulk_created_data(exc.created),
+                'failed': {'start': exc.failed.start, 'end': exc.failed.stop},
+                'detail': str(exc),
+            }, status=status.HTTP_207_MULTI_STATUS)
+        return Response(bulk_created_data(created), status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(
+        operation_description="Get aggregate statistics of the current user's claims",
+        responses={
+            200: openapi.Response(
+                description="Claim statistics",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'total_claims': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'total_estimated_loss': openapi.Schema(type=openapi.TYPE_STRING),
+                        'average_estimated_loss': openapi.Schema(type=openapi.TYPE_STRING),
+                        'by_status': openapi.Schema(type=openapi.TYPE_OBJECT),
+                        'by_disaster_type': openapi.Schema(type=openapi.TYPE_OBJECT),
+                        'by_property_type': openapi.Schema(type=openapi.TYPE_OBJECT),
+                        'monthly': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    }
+                )
+            ),
+            401: "Unauthorized"
+        }
+    )
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Get claim counts, loss totals and a monthly series for the current user"""
+        cache_key = claim_stats_cache_key(request.user.id)
+        data = cache.get(cache_key)
+        if data is None:
+            data = compute_claim_stats(Claim.objects.filter(user=request.user))
+            cache.set(cache_key, data, settings.CLAIM_STATS_CACHE_TIMEOUT)
+        return Response(data)
              
 class ClaimListCreateView(APIView):
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
     
     def get(self, request):
-        claims = Claim.objects.filter(user=request.user)
-        serializer = ClaimSerializer(claims, many=True)
-        return Response(serializer.data)
+        claims = Claim.objects.filter(user=request.user).prefetch_related('claim_documents')
+        claims = filter_claims(claims, request.query_params)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(claims, request, view=self)
+        serializer = ClaimSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
     
     def post(self, request):
         serializer = ClaimSerializer(data=request.data)
@@ -263,7 +430,7 @@ class ClaimListCreateView(APIView):
 class ClaimDetailView(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ClaimSerializer
-    queryset = Claim.objects.all()
+    queryset = Claim.objects.prefetch_related('claim_documents')
     
     def get_queryset(self):
         # Ensure users access only their own claims
@@ -272,19 +439,247 @@ class ClaimDetailView(RetrieveUpdateDestroyAPIView):
 class DisasterUpdateViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for viewing disaster updates.
+
+    Lists default to the user's state and support the filters `state`,
+    `disaster_type`, `severity`, `declaration_type`, `updated_after` and
+    `updated_before`. Results are cursor paginated, newest first.
     """
-    queryset = DisasterUpdate.objects.all().order_by('-updated_at')[:10]
+    queryset = DisasterUpdate.objects.all()
     serializer_class = DisasterUpdateSerializer
     permission_classes = [permissions.IsAuthenticated]
-    
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-updated_at', '-id')
+
+    def get_queryset(self):
+        queryset = DisasterUpdate.objects.all()
+        if self.action != 'list' or not self.request.user.is_authenticated:
+            return queryset
+        # Updates are refreshed in the background, so listing only reads the DB
+        params = self.request.query_params
+        state, _ = self.get_dataset_version()
+        if state:
+            queryset = queryset.filter(state=state)
+        if params.get('disaster_type'):
+            queryset = queryset.filter(disaster_type=params['disaster_type'])
+        if params.get('severity'):
+            try:
+                queryset = queryset.filter(severity=int(params['severity']))
+            except ValueError:
+                raise ValidationError({"severity": "Severity must be an integer"})
+        if params.get('declaration_type'):
+            queryset = queryset.filter(declaration_type=params['declaration_type'].upper())
+        for param, lookup in (('updated_after', 'updated_at__gte'), ('updated_before', 'updated_at__lt')):
+            if params.get(param):
+                value = parse_filter_datetime(params[param])
+                if value is None:
+                    raise ValidationError({param: "Use an ISO 8601 date or datetime"})
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+    def get_dataset_version(self):
+        """
+        Return the state being listed and when disaster updates for it last changed.
+        The state defaults to the user's; the sync bumps the change time whenever
+        it writes rows for a state.
+        """
+        if not hasattr(self, '_dataset_version'):
+            state = self.request.query_params.get('state', '').upper()
+            if state:
+                changed_at = DisasterSyncState.objects.filter(state=state).values_list('changed_at', flat=True).first()
+                self._dataset_version = (state, changed_at)
+                return self._dataset_version
+
+            # Sync states are upper case; profiles saved outside the serializer may not be
+            changed_at = DisasterSyncState.objects.filter(state=Upper(OuterRef('state'))).values('changed_at')[:1]
+            row = (
+                UserProfile.objects.filter(user=self.request.user)
+                .annotate(changed_at=Subquery(changed_at))
+                .values_list('state', 'changed_at')
+                .first()
+            )
+            state = (row[0] or '').upper() if row else ''
+            if state:
+                self._dataset_version = (state, row[1])
+            else:
+                # Users without a state see updates for every state
+                self._dataset_version = ('', DisasterSyncState.objects.aggregate(changed_at=Max('changed_at'))['changed_at'])
+        return self._dataset_version
+
     def list(self, request, *args, **kwargs):
-        # refresh DB before returning
-        user_profile = UserProfile.objects.get(user=self.request.user)
+        state, changed_at = self.get_dataset_version()
+        version = int(changed_at.timestamp() * 1000000) if changed_at else 0
+        etag = f'"disaster-updates-{state or "all"}-{version}"'
+        last_modified = int(changed_at.timestamp()) if changed_at else None
+
+        # Answer 304 Not Modified if the client already has this version
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            # Filters and cursor are part of the key, so each page is cached separately
+            query = hashlib.md5(f"{request.get_host()}?{request.query_params.urlencode()}".encode()).hexdigest()
+            cache_key = f"disaster_updates:{state or 'all'}:{version}:{query}"
+            data = cache.get(cache_key)
+            if data is None:
+                page = self.paginate_queryset(self.get_queryset())
+                data = self.get_paginated_response(self.get_serializer(page, many=True).data).data
+                cache.set(cache_key, data, settings.DISASTER_UPDATES_CACHE_TIMEOUT)
+            response = Response(data)
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        # Let browsers keep the response but revalidate it on every load
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+class DocumentUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                            mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    API endpoints for resumable, chunked claim document uploads.
+
+    Start an upload with the file's name, size and optional SHA-256, PUT each
+    part as the raw request body, then commit to create the ClaimDocument.
+    Retrieving an upload lists the parts received so far, so an interrupted
+    upload can resume with the missing ones.
+    """
+    serializer_class = DocumentUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.is_authenticated:
+            return DocumentUpload.objects.filter(user=self.request.user).select_related('claim')
+        # Return empty queryset for anonymous users (for Swagger)
+        return DocumentUpload.objects.none()
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Start a chunked upload. If the SHA-256 matches a file the user has already "
+            "uploaded, the document is attached at once and returned under 'document'."
+        ),
+        request_body=DocumentUploadSerializer,
+        responses={
+            201: DocumentUploadSerializer(),
+            400: "Bad Request",
+            401: "Unauthorized"
+        }
+    )
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if data.get('sha256'):
+            document = attach_known_file(data['claim'], data['filename'], data['sha256'])
+            if document is not None:
+                document_data = ClaimDocumentSerializer(document, context={'request': request}).data
+                return Response({'document': document_data}, status=status.HTTP_201_CREATED)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Upload one part as the raw request body. Every part but the last must be "
+            "exactly part_size bytes. Send X-Part-SHA256 to have the part checked."
+        ),
+        request_body=no_body,
+        manual_parameters=[
+            openapi.Parameter('X-Part-SHA256', openapi.IN_HEADER, type=openapi.TYPE_STRING,
+                              description="Hex encoded SHA-256 of the part"),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Part stored",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'part': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'sha256': openapi.Schema(type=openapi.TYPE_STRING),
+                    }
+                )
+            ),
+            400: "Bad Request",
+            404: "Not Found"
+        }
+    )
+    @action(detail=True, methods=['put'], url_path=r'parts/(?P<index>\d+)', parser_classes=[])
+    def parts(self, request, pk=None, index=None):
+        """Store one part of the upload, streamed from the request body"""
+        upload = self.get_object()
         try:
-            scrape_fema_disasters(user_state=user_profile.state, postal_code=user_profile.postal_code)
-        except Exception:
-            pass  # swallow scraper errors
-        return super().list(request, *args, **kwargs)
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            raise ValidationError({"detail": "Invalid Content-Length."})
+        # Read the body straight from the request stream instead of request.data,
+        # so the part is written to disk as it arrives. The stream is None for an empty body.
+        stream = request.stream or io.BytesIO()
+        try:
+            digest = write_part(upload, int(index), stream,
+                                expected_sha256=request.META.get('HTTP_X_PART_SHA256'),
+                                content_length=content_length)
+        except UploadError as exc:
+            raise ValidationError({"detail": str(exc)})
+        return Response({'part': int(index), 'sha256': digest})
+
+    @swagger_auto_schema(
+        operation_description="Join the uploaded parts into a claim document",
+        request_body=no_body,
+        responses={
+            201: ClaimDocumentSerializer(),
+            400: "Bad Request",
+            404: "Not Found"
+        }
+    )
+    @action(detail=True, methods=['post'])
+    def commit(self, request, pk=None):
+        """Create the claim document once every part has been uploaded"""
+        upload = self.get_object()
+        try:
+            document = commit_upload(upload)
+        except UploadError as exc:
+            raise ValidationError({"detail": str(exc)})
+        serializer = ClaimDocumentSerializer(document, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class MediaView(APIView):
+    """
+    Serve an uploaded file to its owner.
+
+    The caller is identified by a JWT or admin session, or by the token of a
+    signed URL from the API, and must own the claim document, preview or
+    profile picture; staff may fetch any file. The transfer itself is handed
+    to the front server when MEDIA_SERVE_BACKEND allows it.
+    """
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Download an uploaded file you own. Supports Range and conditional requests.",
+        manual_parameters=[
+            openapi.Parameter('token', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Token of a signed media URL, instead of an Authorization header"),
+        ],
+        responses={200: "File", 206: "Partial content", 304: "Not Modified", 404: "Not Found"}
+    )
+    def get(self, request, name):
+        token = request.query_params.get('token')
+        if token:
+            user_id = media_token_user(token, name)
+        elif request.user.is_authenticated:
+            user_id = request.user.id
+        else:
+            raise NotAuthenticated()
+
+        # Unknown and forbidden files both answer 404, so file names cannot be probed
+        download_name = media_download_name(name, user_id) if user_id is not None else None
+        if download_name is None and request.user.is_authenticated and request.user.is_staff:
+            download_name = name.rsplit('/', 1)[-1]
+        try:
+            if download_name is None or not document_storage.exists(name):
+                raise NotFound()
+        except SuspiciousFileOperation:
+            raise NotFound()
+        return serve_media(request, document_storage, name, download_name)
 
 class NotificationViewSet(viewsets.ModelViewSet):
     """
@@ -323,16 +718,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         When admin creates a notification, ensure it's properly saved
         """
         try:
-            # Validate that the user exists
-            user_id = self.request.data.get('user')
-            if not user_id:
-                raise ValidationError({"user": "User ID is required"})
-                
-            try:
-                user = User.objects.get(id=user_id)
-            except User.DoesNotExist:
-                raise ValidationError({"user": f"User with ID {user_id} does not exist"})
-                
+            # The serializer has already checked that the user exists
             serializer.save()
             
         except ValidationError as ve:
@@ -394,8 +780,12 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def mark_as_read(self, request, pk=None):
         """Mark a notification as read"""
         notification = self.get_object()
+        # Only the request that flips the flag adjusts the counter, so double clicks count once
+        with transaction.atomic():
+            if Notification.objects.filter(pk=notification.pk, read=False).update(read=True):
+                add_unread_count(notification.user_id, -1)
+                transaction.on_commit(lambda: publish_unread_count(notification.user_id))
         notification.read = True
-        notification.save()
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
     
@@ -409,8 +799,19 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
         """Mark all notifications as read"""
-        notifications = self.get_queryset()
-        notifications.update(read=True)
+        unread = self.get_queryset().filter(read=False)
+        user_ids = {request.user.id}
+        with transaction.atomic():
+            if request.user.is_staff or request.user.is_superuser:
+                # Admins mark every user's notifications, so count the affected users again
+                user_ids = set(unread.values_list('user_id', flat=True))
+                unread.filter(user_id__in=user_ids).update(read=True)
+                recount_unread(user_ids)
+            else:
+                add_unread_count(request.user.id, -unread.update(read=True))
+        # update() sends no signals, so push the new counts here
+        for user_id in user_ids:
+            publish_unread_count(user_id)
         return Response({'status': 'All notifications marked as read'}, status=status.HTTP_200_OK)
     
     @swagger_auto_schema(
@@ -431,5 +832,97 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread notifications"""
-        count = self.get_queryset().filter(read=False).count()
+        if request.user.is_staff or request.user.is_superuser:
+            count = self.get_queryset().filter(read=False).count()
+        else:
+            count = get_unread_count(request.user.id)
         return Response({'count': count})
+
+    @swagger_auto_schema(
+        operation_description="Get a short-lived token to open the notification stream with",
+        request_body=no_body,
+        responses={
+            200: openapi.Response(
+                description="Stream token",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'token': openapi.Schema(type=openapi.TYPE_STRING),
+                        'expires_in': openapi.Schema(type=openapi.TYPE_INTEGER, description='Seconds the token can open a stream'),
+                    }
+                )
+            ),
+            401: "Authentication credentials were not provided"
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def stream_token(self, request):
+        """Sign a token for /api/notifications/stream/?token=..., so the access token stays out of URLs"""
+        return Response({
+            'token': stream_token(request.user.id),
+            'expires_in': settings.NOTIFICATION_STREAM_TOKEN_MAX_AGE,
+        })
+
+class NotificationJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                             mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    API endpoints for sending a notification to many users at once (Admin only).
+
+    Creating a job returns at once; the notifications are inserted in batches
+    in the background, and the job reports its progress.
+    """
+    serializer_class = NotificationJobSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = NotificationJob.objects.all()
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Send a notification to every active user matching the filters, e.g. all "
+            "policyholders in a state after a disaster declaration. Poll the job for progress."
+        ),
+        request_body=NotificationJobSerializer,
+        responses={
+            202: NotificationJobSerializer(),
+            400: "Bad request - Invalid data",
+            403: "Permission denied - Admin access required"
+        }
+    )
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(created_by=request.user)
+        run_in_background(run_notification_job, job.pk)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+def authenticate_stream_user(request):
+    """
+    Return the user of the stream token in the `token` query parameter, since
+    EventSource cannot send an Authorization header, or of the Authorization header itself.
+    """
+    token = request.GET.get('token')
+    if token:
+        user_id = stream_token_user(token)
+        return User.objects.filter(pk=user_id).first() if user_id else None
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+async def notification_stream(request):
+    """
+    Server-sent event stream of the current user's notifications.
+
+    Sends the unread count on connect, then `notification` events for new
+    notifications and `unread_count` events whenever the count changes, so
+    clients no longer poll. Served from the ASGI application, where an idle
+    stream costs no worker and no database query.
+    """
+    user = await sync_to_async(authenticate_stream_user)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    response = StreamingHttpResponse(notification_event_stream(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
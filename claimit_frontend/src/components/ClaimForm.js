@@ -5,6 +5,41 @@ import { FaUpload, FaFile, FaTimes, FaCheck } from 'react-icons/fa';
 import { AuthContext } from '../context/AuthContext';
 import '../styles/claims.css';
 
+const sha256Hex = async (buffer) => {
+  // crypto.subtle is only available on secure origins; the server then skips the part check
+  if (!window.crypto?.subtle) return null;
+  const digest = await window.crypto.subtle.digest('SHA-256', buffer);
+  return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+};
+
+// Upload a claim document in fixed-size parts, resuming with the parts the server is missing
+const uploadDocument = async (claimId, file, authToken) => {
+  const baseUrl = `${process.env.REACT_APP_API_BASE_URL}/api/document-uploads/`;
+  const headers = { Authorization: `Bearer ${authToken}` };
+  const { data: upload } = await axios.post(
+    baseUrl,
+    { claim: claimId, filename: file.name, size: file.size, sha256: await sha256Hex(await file.arrayBuffer()) || '' },
+    { headers }
+  );
+  // A file the user has uploaded before is attached without sending it again
+  if (upload.document) return upload.document;
+
+  for (let index = 0; index < upload.part_count; index++) {
+    if (upload.received_parts.includes(index)) continue;
+    const part = file.slice(index * upload.part_size, (index + 1) * upload.part_size);
+    const partHash = await sha256Hex(await part.arrayBuffer());
+    await axios.put(`${baseUrl}${upload.id}/parts/${index}/`, part, {
+      headers: {
+        ...headers,
+        'Content-Type': 'application/octet-stream',
+        ...(partHash && { 'X-Part-SHA256': partHash })
+      }
+    });
+  }
+
+  return axios.post(`${baseUrl}${upload.id}/commit/`, null, { headers });
+};
+
 const ClaimForm = () => {
   const { authToken } = useContext(AuthContext);
   const [currentStep, setCurrentStep] = useState(1);
@@ -90,27 +125,22 @@ const ClaimForm = () => {
     }
     setLoading(true);
     try {
-      const formData = new FormData();
-      formData.append('disaster_type', disasterType);
-      formData.append('property_type', propertyType);
-      formData.append('description', description);
-      formData.append('estimated_loss', estimatedLoss);
-      
-      files.forEach((file) => {
-        formData.append('documents', file);
-      });
-
       const response = await axios.post(
         `${process.env.REACT_APP_API_BASE_URL}/api/claims/`,
-        formData,
         {
-          headers: {
-            "Content-Type": "multipart/form-data",
-            "Authorization": `Bearer ${authToken}`
-          }
-        }
+          disaster_type: disasterType,
+          property_type: propertyType,
+          description: description,
+          estimated_loss: estimatedLoss
+        },
+        { headers: { "Authorization": `Bearer ${authToken}` } }
       );
 
+      // Documents are sent in parts after the claim exists
+      for (const file of files) {
+        await uploadDocument(response.data.id, file, authToken);
+      }
+
       setFeedback({
         type: 'success',
         predictedApproval: response.data.predicted_approval,
@@ -347,8 +377,9 @@ const ClaimForm = () => {
                     Claim Submitted Successfully
                   </Alert.Heading>
                   <p className="mb-0">Status: {feedback.status}</p>
-                  <p className="mb-0">Predicted Approval: {feedback.predictedApproval}</p>
-                  <p className="mb-0">Predicted Limit: ${feedback.predictedLimit}</p>
+                  {/* Claims are scored just after they are saved, so predictions may not be in the response yet */}
+                  <p className="mb-0">Predicted Approval: {feedback.predictedApproval ?? 'Pending'}</p>
+                  <p className="mb-0">Predicted Limit: {feedback.predictedLimit != null ? `$${feedback.predictedLimit}` : 'Pending'}</p>
                 </>
               ) : (
                 <>
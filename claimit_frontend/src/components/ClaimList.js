@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useContext, useCallback } from 'react';
 import axios from 'axios';
-import { Container, Row, Col, Card } from 'react-bootstrap';
+import { Container, Row, Col, Card, Button } from 'react-bootstrap';
 import { FaExclamationTriangle, FaCheckCircle, FaClock, FaBan } from 'react-icons/fa';
 import { AuthContext } from '../context/AuthContext';
 import '../styles/claims.css';
@@ -10,6 +10,8 @@ const ClaimList = () => {
   const [claims, setClaims] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const fetchClaims = useCallback(async () => {
     try {
@@ -17,7 +19,8 @@ const ClaimList = () => {
         `${process.env.REACT_APP_API_BASE_URL}/api/claims/`,
         { headers: { Authorization: `Bearer ${authToken}` } }
       );
-      setClaims(response.data);
+      setClaims(response.data.results);
+      setNextPage(response.data.next);
       setError(null);
     } catch (err) {
       console.error("Error fetching claims", err);
@@ -27,6 +30,22 @@ const ClaimList = () => {
     }
   }, [authToken]);
 
+  const loadMoreClaims = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(nextPage, {
+        headers: { Authorization: `Bearer ${authToken}` }
+      });
+      setClaims(prevClaims => [...prevClaims, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (err) {
+      console.error("Error fetching more claims", err);
+      setError("Failed to load claims. Please try again later.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (authToken) fetchClaims();
   }, [authToken, fetchClaims]);
@@ -152,6 +171,14 @@ const ClaimList = () => {
           </Card>
         ))
       )}
+
+      {!error && nextPage && (
+        <div className="text-center mt-3">
+          <Button variant="outline-primary" onClick={loadMoreClaims} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more claims'}
+          </Button>
+        </div>
+      )}
     </Container>
   );
 };
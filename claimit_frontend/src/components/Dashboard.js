@@ -31,39 +31,24 @@ const Dashboard = () => {
           return;
         }
 
-        // Fetch claims from backend
-        const response = await axios.get(
-          `${process.env.REACT_APP_API_BASE_URL}/api/claims/`,
-          {
-            headers: {
-              'Authorization': `Bearer ${token}`
-            }
+        const config = {
+          headers: {
+            'Authorization': `Bearer ${token}`
           }
-        );
+        };
 
-        // Process the data to calculate the stats
-        const claims = response.data;
-        
-        // Calculate total claims
-        const totalClaims = claims.length;
-        
-        // Count claims by status
-        const pendingClaims = claims.filter(
-          claim => claim.status === 'pending' || claim.status === 'under_review'
-        ).length;
-        
-        const approvedClaims = claims.filter(
-          claim => claim.status === 'approved' || claim.status === 'settled'
-        ).length;
-        
-        // Sum up the estimated losses for all claims
-        const totalAmount = claims.reduce(
-          (sum, claim) => sum + parseFloat(claim.estimated_loss), 
-          0
-        );
-        
-        // Get recent claims (sorted by created_at, which should come from the API already sorted)
-        const recentClaimsData = claims.slice(0, 5);
+        // Aggregates are computed by the backend; only the 5 newest claims are fetched
+        const [statsResponse, recentResponse] = await Promise.all([
+          axios.get(`${process.env.REACT_APP_API_BASE_URL}/api/claims/stats/`, config),
+          axios.get(`${process.env.REACT_APP_API_BASE_URL}/api/claims/?page_size=5`, config)
+        ]);
+        const claimStats = statsResponse.data;
+
+        const totalClaims = claimStats.total_claims;
+        const pendingClaims = claimStats.by_status.pending + claimStats.by_status.under_review;
+        const approvedClaims = claimStats.by_status.approved + claimStats.by_status.settled;
+        const totalAmount = parseFloat(claimStats.total_estimated_loss);
+        const recentClaimsData = recentResponse.data.results;
 
         // Update state with real data
         setStats({
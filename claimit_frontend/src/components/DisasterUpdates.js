@@ -19,7 +19,7 @@ const DisasterUpdates = () => {
         `${process.env.REACT_APP_API_BASE_URL}/api/disaster-updates/`,
         { headers: { Authorization: `Bearer ${authToken}` } }
       );
-      setUpdates(response.data);
+      setUpdates(response.data.results);
       setLoading(false);
     } catch (err) {
       setError('Failed to fetch disaster updates');
@@ -3,6 +3,7 @@ import { Card, Badge, Button, ListGroup, Toast } from 'react-bootstrap';
 import { FaBell, FaCheck, FaTrash, FaSpinner } from 'react-icons/fa';
 import axios from 'axios';
 import { AuthContext } from '../context/AuthContext';
+import { subscribeToNotifications } from '../services/notificationStream';
 import moment from 'moment';
 
 const Notifications = () => {
@@ -38,11 +39,13 @@ const Notifications = () => {
     if (authToken) {
       fetchNotifications();
       
-      // Set up polling to refresh notifications every minute
-      const intervalId = setInterval(fetchNotifications, 60000);
-      
-      // Clean up interval on component unmount
-      return () => clearInterval(intervalId);
+      // New notifications are pushed by the server instead of polled for
+      return subscribeToNotifications(authToken, (type, data) => {
+        if (type !== 'notification') return;
+        setNotifications(prev => (
+          prev.some(notif => notif.id === data.id) ? prev : [data, ...prev]
+        ));
+      });
     }
   }, [authToken, fetchNotifications]);
 
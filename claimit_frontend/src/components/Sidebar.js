@@ -15,7 +15,7 @@ import {
   FaQuestionCircle,
   FaBars,
 } from 'react-icons/fa';
-import axios from 'axios';
+import { subscribeToNotifications } from '../services/notificationStream';
 import '../styles/Sidebar.css';
 
 const Sidebar = () => {
@@ -26,32 +26,12 @@ const Sidebar = () => {
   const [expandedMenus, setExpandedMenus] = useState({});
   const [unreadCount, setUnreadCount] = useState(0);
 
-  // Fetch unread notification count
+  // The server pushes the unread count on connect and whenever it changes
   useEffect(() => {
-    const fetchUnreadCount = async () => {
-      if (!authToken) return;
-      
-      try {
-        const response = await axios.get(
-          `${process.env.REACT_APP_API_BASE_URL}/api/notifications/unread_count/`,
-          {
-            headers: {
-              'Authorization': `Bearer ${authToken}`
-            }
-          }
-        );
-        setUnreadCount(response.data.count);
-      } catch (error) {
-        console.error('Error fetching unread count:', error);
-      }
-    };
-
-    fetchUnreadCount();
-    
-    // Set up polling to refresh count every minute
-    const intervalId = setInterval(fetchUnreadCount, 60000);
-    
-    return () => clearInterval(intervalId);
+    if (!authToken) return;
+    return subscribeToNotifications(authToken, (type, data) => {
+      if (type === 'unread_count') setUnreadCount(data.count);
+    });
   }, [authToken]);
 
   const menuGroups = [
@@ -0,0 +1,91 @@
+import axios from 'axios';
+
+// One server-sent event stream per tab, shared by every component that listens
+const EVENT_TYPES = ['notification', 'unread_count'];
+const FIRST_RETRY_DELAY = 1000;
+const MAX_RETRY_DELAY = 30000;
+
+let source = null;
+// Access token the stream is open for, null when nobody listens
+let sourceToken = null;
+// Bumped on every close, so a connect still waiting for its stream token gives up
+let generation = 0;
+let retryDelay = FIRST_RETRY_DELAY;
+let retryTimer = null;
+// The server only sends unread_count when the stream connects, so later subscribers get the last one replayed
+let lastUnreadCount = null;
+const listeners = new Set();
+
+const close = () => {
+  generation += 1;
+  clearTimeout(retryTimer);
+  retryTimer = null;
+  if (source) source.close();
+  source = null;
+};
+
+const reconnect = (authToken) => {
+  close();
+  retryTimer = setTimeout(() => open(authToken), retryDelay);
+  retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+};
+
+const open = async (authToken) => {
+  close();
+  const current = generation;
+  let token;
+  try {
+    // EventSource cannot send headers, so the stream is opened with a short-lived
+    // token in the query string instead of the access token, which would end up in logs
+    const response = await axios.post(
+      `${process.env.REACT_APP_API_BASE_URL}/api/notifications/stream_token/`,
+      {},
+      { headers: { 'Authorization': `Bearer ${authToken}` } }
+    );
+    token = response.data.token;
+  } catch (err) {
+    if (current === generation) reconnect(authToken);
+    return;
+  }
+  if (current !== generation) return;
+
+  source = new EventSource(
+    `${process.env.REACT_APP_API_BASE_URL}/api/notifications/stream/?token=${encodeURIComponent(token)}`
+  );
+  source.addEventListener('open', () => {
+    retryDelay = FIRST_RETRY_DELAY;
+  });
+  // The browser would retry with the same token, which expires: reconnect with a new one instead
+  source.addEventListener('error', () => {
+    if (current === generation) reconnect(authToken);
+  });
+  EVENT_TYPES.forEach((type) => {
+    source.addEventListener(type, (event) => {
+      const data = JSON.parse(event.data);
+      if (type === 'unread_count') lastUnreadCount = data;
+      listeners.forEach((listener) => listener(type, data));
+    });
+  });
+};
+
+// Call listener(type, data) for every event; returns a function that stops listening
+export const subscribeToNotifications = (authToken, listener) => {
+  listeners.add(listener);
+  if (sourceToken !== authToken) {
+    sourceToken = authToken;
+    lastUnreadCount = null;
+    retryDelay = FIRST_RETRY_DELAY;
+    open(authToken);
+  } else if (lastUnreadCount) {
+    listener('unread_count', lastUnreadCount);
+  }
+
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0) {
+      close();
+      sourceToken = null;
+      lastUnreadCount = null;
+    }
+  };
+};